@@ -2,15 +2,20 @@
 AI助手相关API：获取游戏日志和玩家信息
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Dict, Optional
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.api.auth import get_current_user
-from app.models.user import User
+from app.core.token_cache import UserProjection
 from app.models.game import Game, GamePlayer, GameStatus
 from app.services.game_engine import GameEngine, Role
+from app.services.game_events import DEFAULT_LOCALE, normalize_locale
+from app.services.journal_store import journal_store
+from app.services.phase_driver import phase_driver
+from app.services.state_flusher import state_flusher
 
 router = APIRouter()
 
@@ -19,6 +24,8 @@ class GameLogResponse(BaseModel):
     """游戏日志响应"""
     logs: List[Dict]
     total_count: int
+    next_cursor: int  # 下次增量拉取时传入的 cursor（已返回的最大序号）
+    has_more: bool
 
 
 class PlayerInfoResponse(BaseModel):
@@ -42,23 +49,65 @@ class GameContextResponse(BaseModel):
     dead_players: List[int]
 
 
+# 增量拉取日志时的默认分页大小
+LOG_PAGE_SIZE = 100
+
 # 游戏引擎实例存储（实际项目中应该使用Redis或数据库存储）
 _game_engines: Dict[str, GameEngine] = {}
 
 
-def get_or_create_game_engine(room_code: str, db: Session) -> Optional[GameEngine]:
-    """获取或创建游戏引擎实例"""
-    # 从数据库加载游戏信息
-    game = db.query(Game).filter(Game.room_code == room_code).first()
-    if not game:
-        return None
-    
-    # 如果已有引擎实例，直接返回
+async def evict_game_engine(room_code: str) -> bool:
+    """保存快照后从内存中移除游戏引擎（快照保存失败时保留在内存中）"""
+    engine = _game_engines.get(room_code)
+    if engine is None:
+        return True
+    if phase_driver.is_running(room_code):
+        # 正在被阶段驱动器推进的游戏不驱逐
+        return False
+    action_count = engine.action_count
+    if not await journal_store.save(room_code, engine):
+        return False
+    if engine.action_count != action_count or phase_driver.is_running(room_code):
+        # 写入快照期间引擎又被使用，继续留在内存中
+        journal_store.track(room_code, engine)
+        return False
+    _game_engines.pop(room_code, None)
+    state_flusher.forget(room_code)
+    return True
+
+
+def register_game_engine(room_code: str, engine: GameEngine):
+    """登记新开始的游戏引擎"""
+    _game_engines[room_code] = engine
+    journal_store.track(room_code, engine)
+
+
+def get_loaded_game_engine(room_code: str) -> Optional[GameEngine]:
+    """获取已在内存中的游戏引擎（不查库、不从快照恢复）"""
+    return _game_engines.get(room_code)
+
+
+async def _restore_game_engine(room_code: str, game: Game) -> Optional[GameEngine]:
+    """优先从快照恢复（重启或驱逐后可还原轮次、阶段、投票、行动和日志）"""
+    engine = await journal_store.load(room_code)
     if room_code in _game_engines:
+        # 等待 Redis 期间其他请求已加载了引擎
+        return _game_engines[room_code]
+    if engine and engine.game_id == game.id:
+        _game_engines[room_code] = engine
+        journal_store.track(room_code, engine, restored=True)
+        if game.status == GameStatus.PLAYING:
+            # 进行中的对局交回阶段驱动器，重新安排当前阶段的截止时间
+            await phase_driver.resume_game(room_code, engine)
+        return engine
+    return None
+
+
+def _create_game_engine(room_code: str, game: Game, players: List[GamePlayer]) -> Optional[GameEngine]:
+    """按数据库中的玩家创建游戏引擎实例"""
+    if room_code in _game_engines:
+        # 查询期间其他请求已加载了引擎
         return _game_engines[room_code]
-    
-    # 创建新的游戏引擎实例
-    players = db.query(GamePlayer).filter(GamePlayer.game_id == game.id).all()
     player_ids = [p.user_id for p in players]
     
     if not player_ids:
@@ -66,75 +115,110 @@ def get_or_create_game_engine(room_code: str, db: Session) -> Optional[GameEngin
     
     engine = GameEngine(game.id, len(player_ids))
     
-    # 分配角色（如果游戏已开始）
+    # 按数据库中的角色和存活状态开始游戏（如果游戏已开始）
     if game.status == GameStatus.PLAYING:
-        roles = engine.assign_roles(player_ids)
-        # 设置玩家存活状态
-        for player in players:
-            engine.roles[player.user_id] = Role(player.role) if player.role else Role.VILLAGER
-            if not player.is_alive:
-                engine.alive_players.discard(player.user_id)
-                engine.dead_players.add(player.user_id)
+        engine.load_roles(
+            player_ids,
+            [(p.user_id, p.role or Role.VILLAGER.value) for p in players],
+            [p.user_id for p in players if not p.is_alive]
+        )
     
     _game_engines[room_code] = engine
+    journal_store.track(room_code, engine)
     return engine
 
 
+async def get_or_create_game_engine_async(room_code: str, db: AsyncSession,
+                                          game: Optional[Game] = None) -> Optional[GameEngine]:
+    """获取或创建游戏引擎实例（REST 接口与 WebSocket 消息处理共用，game 为调用方已查询到的房间）"""
+    if room_code in _game_engines:
+        return _game_engines[room_code]
+    
+    if game is None:
+        game = await db.scalar(select(Game).where(Game.room_code == room_code))
+        if not game:
+            return None
+    
+    engine = await _restore_game_engine(room_code, game)
+    if engine:
+        return engine
+    
+    players = (await db.scalars(select(GamePlayer).where(GamePlayer.game_id == game.id))).all()
+    return _create_game_engine(room_code, game, players)
+
+
 @router.get("/game/{room_code}/logs", response_model=GameLogResponse)
 async def get_game_logs(
     room_code: str,
     limit: Optional[int] = None,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    cursor: Optional[int] = None,
+    locale: str = DEFAULT_LOCALE,
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """获取游戏日志（包含玩家发言）"""
+    """获取游戏日志（包含玩家发言）
+
+    传入 cursor 时只返回序号大于 cursor 的日志（最多 limit 条），用于轮询增量拉取；
+    locale 指定日志消息语言（zh/en）。
+    """
     # 验证用户是否在游戏中
-    game = db.query(Game).filter(Game.room_code == room_code).first()
+    game = await db.scalar(select(Game).where(Game.room_code == room_code))
     if not game:
         raise HTTPException(status_code=404, detail="房间不存在")
     
-    player = db.query(GamePlayer).filter(
+    player = await db.scalar(select(GamePlayer).where(
         GamePlayer.game_id == game.id,
         GamePlayer.user_id == current_user.id
-    ).first()
+    ))
     
     if not player:
         raise HTTPException(status_code=403, detail="您不在此游戏中")
     
     # 获取游戏引擎
-    engine = get_or_create_game_engine(room_code, db)
+    engine = await get_or_create_game_engine_async(room_code, db, game)
     if not engine:
         raise HTTPException(status_code=400, detail="游戏尚未开始")
     
-    logs = engine.get_all_logs() if limit is None else engine.get_recent_logs(limit)
+    locale = normalize_locale(locale)
+    if cursor is not None:
+        logs = engine.get_logs_since(cursor, limit or LOG_PAGE_SIZE, locale)
+    elif limit is not None:
+        logs = engine.get_recent_logs(limit, locale)
+    else:
+        logs = engine.get_all_logs(locale)
+    
+    last_seq = engine.game_log.last_seq
+    next_cursor = logs[-1]["seq"] if logs else (cursor if cursor is not None else last_seq)
     
     return {
         "logs": logs,
-        "total_count": len(engine.get_all_logs())
+        "total_count": len(engine.game_log),
+        "next_cursor": next_cursor,
+        "has_more": next_cursor < last_seq
     }
 
 
 @router.get("/game/{room_code}/player-info", response_model=PlayerInfoResponse)
 async def get_player_info(
     room_code: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取当前玩家的角色信息"""
-    game = db.query(Game).filter(Game.room_code == room_code).first()
+    game = await db.scalar(select(Game).where(Game.room_code == room_code))
     if not game:
         raise HTTPException(status_code=404, detail="房间不存在")
     
-    player = db.query(GamePlayer).filter(
+    player = await db.scalar(select(GamePlayer).where(
         GamePlayer.game_id == game.id,
         GamePlayer.user_id == current_user.id
-    ).first()
+    ))
     
     if not player:
         raise HTTPException(status_code=403, detail="您不在此游戏中")
     
     # 获取游戏引擎
-    engine = get_or_create_game_engine(room_code, db)
+    engine = await get_or_create_game_engine_async(room_code, db, game)
     if not engine:
         raise HTTPException(status_code=400, detail="游戏尚未开始")
     
@@ -154,24 +238,24 @@ async def get_player_info(
 @router.get("/game/{room_code}/context", response_model=GameContextResponse)
 async def get_game_context(
     room_code: str,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取完整游戏上下文（供AI助手使用）"""
-    game = db.query(Game).filter(Game.room_code == room_code).first()
+    game = await db.scalar(select(Game).where(Game.room_code == room_code))
     if not game:
         raise HTTPException(status_code=404, detail="房间不存在")
     
-    player = db.query(GamePlayer).filter(
+    player = await db.scalar(select(GamePlayer).where(
         GamePlayer.game_id == game.id,
         GamePlayer.user_id == current_user.id
-    ).first()
+    ))
     
     if not player:
         raise HTTPException(status_code=403, detail="您不在此游戏中")
     
     # 获取游戏引擎
-    engine = get_or_create_game_engine(room_code, db)
+    engine = await get_or_create_game_engine_async(room_code, db, game)
     if not engine:
         raise HTTPException(status_code=400, detail="游戏尚未开始")
     
@@ -3,20 +3,32 @@
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, EmailStr
 from typing import Optional
 from datetime import timedelta
 
-from app.core.database import get_db
-from app.core.security import verify_password, get_password_hash, create_access_token
+from app.core.database import get_async_db
+from app.core.security import create_access_token
+from app.core.password_hasher import PasswordHasherBusy, password_hasher
 from app.core.config import settings
+from app.core.token_cache import UserProjection, token_cache
 from app.models.user import User
 
 router = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
 
+def server_busy() -> HTTPException:
+    """密码任务排队已满时的响应"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="服务器繁忙，请稍后重试",
+        headers={"Retry-After": "1"},
+    )
+
+
 class UserRegister(BaseModel):
     username: str
     email: EmailStr
@@ -46,24 +58,27 @@ class UserResponse(BaseModel):
 
 
 @router.post("/register", response_model=UserResponse)
-async def register(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register(user_data: UserRegister, db: AsyncSession = Depends(get_async_db)):
     """用户注册"""
     # 检查用户名是否已存在
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await db.scalar(select(User.id).where(User.username == user_data.username)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="用户名已存在"
         )
     
     # 检查邮箱是否已存在
-    if db.query(User).filter(User.email == user_data.email).first():
+    if await db.scalar(select(User.id).where(User.email == user_data.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="邮箱已被注册"
         )
     
     # 创建新用户
-    hashed_password = get_password_hash(user_data.password)
+    try:
+        hashed_password = await password_hasher.hash(user_data.password)
+    except PasswordHasherBusy:
+        raise server_busy()
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -71,18 +86,25 @@ async def register(user_data: UserRegister, db: Session = Depends(get_db)):
         nickname=user_data.nickname or user_data.username
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return db_user
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """用户登录"""
-    user = db.query(User).filter(User.username == form_data.username).first()
+    user = await db.scalar(select(User).where(User.username == form_data.username))
     
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    matched = False
+    if user:
+        try:
+            matched = await password_hasher.verify(form_data.password, user.hashed_password)
+        except PasswordHasherBusy:
+            raise server_busy()
+    
+    if not matched:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="用户名或密码错误",
@@ -98,18 +120,22 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """获取当前登录用户"""
+    db: AsyncSession = Depends(get_async_db)
+) -> UserProjection:
+    """获取当前登录用户（token 已缓存时不解码、不查库）"""
     from app.core.security import decode_access_token
     
+    cached = token_cache.get(token)
+    if cached is not None and cached.user is not None:
+        return cached.user
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="无效的认证凭据",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    payload = decode_access_token(token)
+    payload = cached.claims if cached is not None else decode_access_token(token)
     if payload is None:
         raise credentials_exception
     
@@ -117,9 +143,11 @@ async def get_current_user(
     if username is None:
         raise credentials_exception
     
-    user = db.query(User).filter(User.username == username).first()
+    user = await db.scalar(select(User).where(User.username == username))
     if user is None:
         raise credentials_exception
     
-    return user
+    projection = UserProjection.from_user(user)
+    token_cache.put(token, payload, projection)
+    return projection
 
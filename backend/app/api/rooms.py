@@ -2,19 +2,30 @@
 房间相关API
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import List, Optional
+from sqlalchemy.sql import func
 import random
 import string
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.api.auth import get_current_user
-from app.models.user import User
+from app.api.ai_assistant import register_game_engine
+from app.core.token_cache import UserProjection
 from app.models.game import Game, GamePlayer, GameStatus
+from app.services.game_engine import GameEngine
+from app.services.phase_driver import phase_driver
+from app.services.role_config import RoleConfigError, normalize_roles_config, required_players
+from app.services.roster import roster_cache
+from app.websocket.manager import manager
 
 router = APIRouter()
 
+# 开始游戏所需的最少玩家数
+MIN_PLAYERS = 6
+
 
 class RoomCreate(BaseModel):
     room_name: str
@@ -47,13 +58,21 @@ def generate_room_code(length: int = 6) -> str:
 @router.post("/", response_model=RoomResponse)
 async def create_room(
     room_data: RoomCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """创建房间"""
+    # 校验角色配置（开始游戏时按人数从缓存模板分配）
+    try:
+        config = normalize_roles_config(room_data.roles_config)
+    except RoleConfigError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if required_players(config) > room_data.max_players:
+        raise HTTPException(status_code=400, detail=f"该角色配置至少需要{required_players(config)}名玩家，超过房间人数上限")
+    
     # 生成唯一房间号
     room_code = generate_room_code()
-    while db.query(Game).filter(Game.room_code == room_code).first():
+    while await db.scalar(select(Game.id).where(Game.room_code == room_code)):
         room_code = generate_room_code()
     
     # 创建房间
@@ -66,8 +85,8 @@ async def create_room(
         status=GameStatus.WAITING
     )
     db.add(game)
-    db.commit()
-    db.refresh(game)
+    await db.commit()
+    await db.refresh(game)
     
     # 房主自动加入
     player = GamePlayer(
@@ -76,7 +95,7 @@ async def create_room(
         seat_number=1
     )
     db.add(player)
-    db.commit()
+    await db.commit()
     
     return game
 
@@ -84,11 +103,11 @@ async def create_room(
 @router.post("/join", response_model=RoomResponse)
 async def join_room(
     join_data: RoomJoin,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """加入房间"""
-    game = db.query(Game).filter(Game.room_code == join_data.room_code).first()
+    game = await db.scalar(select(Game).where(Game.room_code == join_data.room_code))
     
     if not game:
         raise HTTPException(status_code=404, detail="房间不存在")
@@ -97,16 +116,16 @@ async def join_room(
         raise HTTPException(status_code=400, detail="游戏已开始或已结束")
     
     # 检查是否已在房间中
-    existing_player = db.query(GamePlayer).filter(
+    existing_player = await db.scalar(select(GamePlayer.id).where(
         GamePlayer.game_id == game.id,
         GamePlayer.user_id == current_user.id
-    ).first()
+    ))
     
     if existing_player:
         return game
     
     # 检查房间人数
-    current_players = db.query(GamePlayer).filter(GamePlayer.game_id == game.id).count()
+    current_players = await db.scalar(select(func.count(GamePlayer.id)).where(GamePlayer.game_id == game.id))
     if current_players >= game.max_players:
         raise HTTPException(status_code=400, detail="房间已满")
     
@@ -117,15 +136,62 @@ async def join_room(
         seat_number=current_players + 1
     )
     db.add(player)
-    db.commit()
+    await db.commit()
+    roster_cache.invalidate(game.room_code)
+    
+    return game
+
+
+@router.post("/{room_code}/start", response_model=RoomResponse)
+async def start_game(
+    room_code: str,
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """开始游戏：分配角色并交给阶段驱动器推进"""
+    game = await db.scalar(select(Game).where(Game.room_code == room_code))
+    if not game:
+        raise HTTPException(status_code=404, detail="房间不存在")
+    
+    if game.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="只有房主可以开始游戏")
+    
+    if game.status != GameStatus.WAITING:
+        raise HTTPException(status_code=400, detail="游戏已开始或已结束")
+    
+    players = (await db.scalars(select(GamePlayer).where(GamePlayer.game_id == game.id))).all()
+    if len(players) < MIN_PLAYERS:
+        raise HTTPException(status_code=400, detail=f"至少需要{MIN_PLAYERS}名玩家才能开始游戏")
+    
+    # 分配角色并写入数据库
+    engine = GameEngine(game.id, len(players))
+    try:
+        roles = engine.assign_roles([p.user_id for p in players], game.roles_config)
+    except RoleConfigError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    for player in players:
+        player.role = roles[player.user_id].value
+        player.is_alive = True
+    
+    game.status = GameStatus.PLAYING
+    game.started_at = func.now()
+    game.current_round = 1
+    game.current_phase = "night"
+    await db.commit()
+    await db.refresh(game)
+    roster_cache.invalidate(room_code)
+    
+    register_game_engine(room_code, engine)
+    await manager.broadcast(room_code, {"type": "game_started", "room_code": room_code})
+    await phase_driver.start_game(room_code, engine)
     
     return game
 
 
 @router.get("/{room_code}", response_model=RoomResponse)
-async def get_room(room_code: str, db: Session = Depends(get_db)):
+async def get_room(room_code: str, db: AsyncSession = Depends(get_async_db)):
     """获取房间信息"""
-    game = db.query(Game).filter(Game.room_code == room_code).first()
+    game = await db.scalar(select(Game).where(Game.room_code == room_code))
     if not game:
         raise HTTPException(status_code=404, detail="房间不存在")
     return game
@@ -134,12 +200,12 @@ async def get_room(room_code: str, db: Session = Depends(get_db)):
 @router.get("/", response_model=List[RoomResponse])
 async def list_rooms(
     status: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """获取房间列表"""
-    query = db.query(Game)
+    query = select(Game)
     if status:
-        query = query.filter(Game.status == GameStatus[status.upper()])
-    games = query.order_by(Game.created_at.desc()).limit(50).all()
+        query = query.where(Game.status == GameStatus[status.upper()])
+    games = (await db.scalars(query.order_by(Game.created_at.desc()).limit(50))).all()
     return games
 
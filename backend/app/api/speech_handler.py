@@ -1,37 +1,28 @@
 """
 处理玩家发言的服务函数
 """
-from sqlalchemy.orm import Session
-from app.models.game import Game, GamePlayer, GameStatus
-from app.api.ai_assistant import get_or_create_game_engine
+from typing import Optional
 
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.api.ai_assistant import get_or_create_game_engine_async
+from app.services.game_engine import GameEngine
+from app.services.roster import roster_cache
 
-def handle_player_speech(room_code: str, user_id: int, speech_content: str, db: Session):
-    """处理玩家发言并记录到游戏日志"""
+
+async def handle_player_speech(room_code: str, user_id: int, speech_content: str,
+                               db: AsyncSession) -> Optional[GameEngine]:
+    """处理玩家发言并记录到游戏日志，成功时返回游戏引擎（名单与引擎已缓存时不访问数据库）"""
     # 获取游戏引擎
-    engine = get_or_create_game_engine(room_code, db)
+    engine = await get_or_create_game_engine_async(room_code, db)
     if not engine:
-        return False
+        return None
     
     # 获取玩家信息
-    game = db.query(Game).filter(Game.room_code == room_code).first()
-    if not game:
-        return False
-    
-    player = db.query(GamePlayer).filter(
-        GamePlayer.game_id == game.id,
-        GamePlayer.user_id == user_id
-    ).first()
-    
-    if not player:
-        return False
-    
-    # 获取玩家名称
-    from app.models.user import User
-    user = db.query(User).filter(User.id == user_id).first()
-    player_name = user.nickname if user and user.nickname else (user.username if user else f"玩家{user_id}")
+    roster = await roster_cache.get(room_code, db)
+    if roster is None or roster.get(user_id) is None:
+        return None
     
     # 记录发言
-    success = engine.record_speech(user_id, player_name, speech_content)
-    return success
-
+    if not engine.record_speech(user_id, roster.name_of(user_id), speech_content):
+        return None
+    return engine
@@ -2,12 +2,14 @@
 用户相关API
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from typing import Optional
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.api.auth import get_current_user
+from app.core.token_cache import UserProjection, token_cache
 from app.models.user import User
+from app.services.roster import display_name, roster_cache
 
 router = APIRouter()
 
@@ -32,7 +34,7 @@ class UserUpdate(BaseModel):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: UserProjection = Depends(get_current_user)):
     """获取当前用户信息"""
     return current_user
 
@@ -40,24 +42,31 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
 @router.put("/me", response_model=UserResponse)
 async def update_current_user(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: UserProjection = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """更新当前用户信息"""
+    user = await db.get(User, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="用户不存在")
     if user_update.nickname is not None:
-        current_user.nickname = user_update.nickname
+        user.nickname = user_update.nickname
     if user_update.avatar is not None:
-        current_user.avatar = user_update.avatar
+        user.avatar = user_update.avatar
     
-    db.commit()
-    db.refresh(current_user)
-    return current_user
+    await db.commit()
+    await db.refresh(user)
+    # 缓存中的用户信息已过期
+    token_cache.invalidate_user(user.id)
+    if user_update.nickname is not None:
+        roster_cache.rename(user.id, display_name(user.username, user.nickname))
+    return user
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: Session = Depends(get_db)):
+async def get_user(user_id: int, db: AsyncSession = Depends(get_async_db)):
     """获取指定用户信息"""
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="用户不存在")
     return user
@@ -22,6 +22,30 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "your-secret-key-please-change-in-production"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_SIZE: int = 10000  # token 解析缓存的最大条目数
+    AUTH_CACHE_TTL_SECONDS: int = 300  # token 解析缓存的有效期（不超过 token 自身的过期时间）
+    PASSWORD_HASH_WORKERS: int = 4  # 密码加密/验证（bcrypt）的工作线程数
+    PASSWORD_HASH_MAX_PENDING: int = 64  # 排队与执行中的密码任务上限，超出时返回 503
+    
+    # 游戏阶段调度配置
+    SCHEDULER_TICK_MS: int = 100  # 时间轮 tick 间隔（毫秒）
+    NIGHT_PHASE_SECONDS: int = 60  # 夜晚行动时限
+    DAY_PHASE_SECONDS: int = 180  # 白天发言与投票时限
+    VOTE_TALLY_INTERVAL_MS: int = 500  # 实时计票推送的最小间隔
+    STATE_FLUSH_INTERVAL_MS: int = 1000  # 引擎状态（轮次、阶段、存活）批量写回数据库的间隔
+    STATE_FLUSH_MAX_PENDING: int = 500  # 待写回房间数达到该值时提前写回
+    FINALIZE_INTERVAL_MS: int = 1000  # 已结束对局分批结算（GameRecord 与玩家战绩）的间隔
+    FINALIZE_BATCH_SIZE: int = 200  # 每个结算事务最多处理的对局数（排队达到该值时提前结算）
+    FINALIZE_MAX_ATTEMPTS: int = 3  # 结算失败的对局最多重试次数
+    JOURNAL_FLUSH_INTERVAL_MS: int = 200  # 行动日志与检查点批量写入 Redis 的间隔（崩溃时最多丢失该间隔内的行动）
+    
+    # WebSocket 配置
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0  # 单个连接发送超时，超时即断开
+    WS_QUEUE_SIZE: int = 256  # 单个连接出站队列上限，溢出即断开
+    WS_BATCH_TICK_MS: int = 15  # 合并帧 tick（毫秒），0 表示不合并
+    WS_BACKPLANE: str = "none"  # 跨进程广播背板：none（单进程）、local（进程内，测试用）、redis
+    WS_REPLAY_BUFFER: int = 128  # 每个房间保留的可补发广播条数（断线重连续传）
+    WS_REPLAY_TTL_SECONDS: int = 120  # 房间无连接后补发缓冲区的保留时间
     
     # CORS配置
     CORS_ORIGINS: List[str] = ["http://localhost:5173", "http://localhost:3000"]
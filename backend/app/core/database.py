@@ -2,6 +2,7 @@
 数据库连接配置
 """
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
@@ -26,6 +27,32 @@ engine = create_engine(
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# 异步驱动（REST 接口使用，数据库往返期间不阻塞事件循环上的 WebSocket）
+ASYNC_DRIVERS = (
+    ("sqlite://", "sqlite+aiosqlite://"),
+    ("postgresql+psycopg2://", "postgresql+asyncpg://"),
+    ("postgresql://", "postgresql+asyncpg://"),
+    ("mysql+pymysql://", "mysql+aiomysql://"),  # MySQL 需要另行安装 aiomysql
+    ("mysql://", "mysql+aiomysql://"),
+)
+
+
+def to_async_url(url: str) -> str:
+    """把同步驱动的连接字符串转换为对应的异步驱动"""
+    for prefix, async_prefix in ASYNC_DRIVERS:
+        if url.startswith(prefix):
+            return async_prefix + url[len(prefix):]
+    return url
+
+
+async_engine = create_async_engine(
+    to_async_url(database_url),
+    pool_pre_ping=True,
+    echo=False
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -37,3 +64,9 @@ def get_db():
     finally:
         db.close()
 
+
+async def get_async_db():
+    """获取异步数据库会话"""
+    async with AsyncSessionLocal() as db:
+        yield db
+
@@ -0,0 +1,78 @@
+"""
+密码加密/验证线程池：bcrypt 在有界的工作线程中执行，不占用事件循环
+
+bcrypt 计算期间释放 GIL，事件循环线程在此期间照常处理其他请求与 WebSocket 消息。
+排队与执行中的任务数超过上限时立即拒绝（PasswordHasherBusy），避免登录洪峰堆积出无界队列。
+"""
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.core.config import settings
+from app.core.security import get_password_hash, verify_password
+
+
+class PasswordHasherBusy(Exception):
+    """密码任务已达排队上限"""
+
+
+class PasswordHasher:
+    """有界的 bcrypt 执行器（计数只在事件循环线程上修改）"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self.pending = 0
+        self.peak_pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0  # 任务在队列中等待的累计时间（秒）
+        self.run_total = 0.0  # 任务执行的累计时间（秒）
+
+    @staticmethod
+    def _timed(submitted: float, fn, *args):
+        """工作线程中执行，返回 (结果, 排队时间, 执行时间)"""
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, started - submitted, time.perf_counter() - started
+
+    async def run(self, fn, *args):
+        """在工作线程中执行 fn(*args)；已达上限时抛出 PasswordHasherBusy"""
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy()
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+        try:
+            loop = asyncio.get_event_loop()
+            result, waited, ran = await loop.run_in_executor(
+                self.executor, self._timed, time.perf_counter(), fn, *args
+            )
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        self.wait_total += waited
+        self.run_total += ran
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def metrics(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "peak_pending": self.peak_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_total / self.completed * 1000, 2) if self.completed else None,
+            "avg_run_ms": round(self.run_total / self.completed * 1000, 2) if self.completed else None,
+        }
+
+
+password_hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
@@ -2,6 +2,7 @@
 Redis客户端连接
 """
 import redis
+import redis.asyncio
 from app.core.config import settings
 import json
 
@@ -19,8 +20,39 @@ class RedisClient:
                 db=settings.REDIS_DB,
                 decode_responses=True
             )
+            # 二进制数据（如游戏引擎快照）使用不解码的连接
+            cls._instance.raw_client = redis.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                decode_responses=False
+            )
         return cls._instance
     
+    @property
+    def async_client(self) -> redis.asyncio.Redis:
+        """异步客户端（用于 pub/sub 背板等事件循环内的操作）"""
+        if getattr(self, "_async_client", None) is None:
+            self._async_client = redis.asyncio.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                decode_responses=True
+            )
+        return self._async_client
+
+    @property
+    def async_raw_client(self) -> redis.asyncio.Redis:
+        """不解码的异步客户端（用于二进制数据，如引擎检查点与行动日志）"""
+        if getattr(self, "_async_raw_client", None) is None:
+            self._async_raw_client = redis.asyncio.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                decode_responses=False
+            )
+        return self._async_raw_client
+    
     def get(self, key: str):
         """获取值"""
         value = self.client.get(key)
@@ -37,6 +69,14 @@ class RedisClient:
             value = json.dumps(value, ensure_ascii=False)
         return self.client.set(key, value, ex=ex)
     
+    def get_bytes(self, key: str):
+        """获取二进制值"""
+        return self.raw_client.get(key)
+    
+    def set_bytes(self, key: str, value: bytes, ex: int = None):
+        """设置二进制值"""
+        return self.raw_client.set(key, value, ex=ex)
+    
     def delete(self, key: str):
         """删除键"""
         return self.client.delete(key)
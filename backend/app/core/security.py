@@ -10,33 +10,25 @@ from app.core.config import settings
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """验证密码"""
+def _prehash(password: str) -> str:
+    """bcrypt 限制密码长度最多72字节，超过部分会被截断；为了安全，超长密码先进行SHA256哈希"""
     import hashlib
-    # 如果密码超过72字节，使用相同的哈希处理
-    original_password = plain_password
-    if len(plain_password.encode('utf-8')) > 72:
-        plain_password = hashlib.sha256(plain_password.encode('utf-8')).hexdigest()
-    
+    if len(password.encode('utf-8')) > 72:
+        return hashlib.sha256(password.encode('utf-8')).hexdigest()
+    return password
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """验证密码（get_password_hash 一直对超长密码做预哈希，只需验证一次 bcrypt）"""
     try:
-        result = pwd_context.verify(plain_password, hashed_password)
-        # 如果失败，尝试使用原始密码（向后兼容）
-        if not result and original_password != plain_password:
-            result = pwd_context.verify(original_password, hashed_password)
-        return result
-    except:
+        return pwd_context.verify(_prehash(plain_password), hashed_password)
+    except Exception:
         return False
 
 
 def get_password_hash(password: str) -> str:
     """加密密码"""
-    # bcrypt 限制密码长度最多72字节，超过部分会被截断
-    # 为了安全，我们在加密前先进行哈希处理
-    import hashlib
-    if len(password.encode('utf-8')) > 72:
-        # 如果密码超过72字节，先进行SHA256哈希
-        password = hashlib.sha256(password.encode('utf-8')).hexdigest()
-    return pwd_context.hash(password)
+    return pwd_context.hash(_prehash(password))
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
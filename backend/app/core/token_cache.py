@@ -0,0 +1,124 @@
+"""
+Token 解析缓存：已验证的 JWT 声明及其对应的用户信息，认证时不必每次解码并查库
+
+按 token 的 SHA-256 摘要索引（不保存原始 token），LRU 淘汰，过期时间取 TTL 与 token 自身 exp 的较早者。
+用户资料变更时按用户ID失效。
+"""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from app.core.config import settings
+
+
+class UserProjection:
+    """认证用户的只读快照（接口响应需要的字段）"""
+    __slots__ = ("id", "username", "email", "nickname", "avatar", "total_games", "win_games", "win_rate")
+
+    def __init__(self, id: int, username: str, email: str, nickname: Optional[str], avatar: Optional[str],
+                 total_games: int, win_games: int, win_rate: float):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.nickname = nickname
+        self.avatar = avatar
+        self.total_games = total_games
+        self.win_games = win_games
+        self.win_rate = win_rate
+
+    @classmethod
+    def from_user(cls, user) -> "UserProjection":
+        return cls(user.id, user.username, user.email, user.nickname, user.avatar,
+                   user.total_games or 0, user.win_games or 0, user.win_rate or 0.0)
+
+
+class _TokenEntry:
+    __slots__ = ("claims", "user", "expires_at")
+
+    def __init__(self, claims: dict, user: Optional[UserProjection], expires_at: float):
+        self.claims = claims
+        self.user = user
+        self.expires_at = expires_at  # 墙上时间（与 JWT exp 一致）
+
+
+def token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+class TokenCache:
+    """有界的 token -> (声明, 用户) 缓存"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries: "OrderedDict[bytes, _TokenEntry]" = OrderedDict()
+        self.by_user: Dict[int, Set[bytes]] = {}  # {user_id: {token 摘要}}，用于按用户失效
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[_TokenEntry]:
+        """查找未过期的缓存项（命中后移到 LRU 末尾）"""
+        key = token_digest(token)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.time():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, token: str, claims: dict, user: Optional[UserProjection] = None):
+        """缓存已验证的声明（及其解析出的用户）"""
+        expires_at = time.time() + self.ttl
+        exp = claims.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        key = token_digest(token)
+        if key in self.entries:
+            self._remove(key)
+        self.entries[key] = _TokenEntry(claims, user, expires_at)
+        user_id = user.id if user is not None else claims.get("user_id")
+        if user_id is not None:
+            self.by_user.setdefault(user_id, set()).add(key)
+        while len(self.entries) > self.max_size:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: int):
+        """用户资料变更后调用：丢弃该用户所有 token 的缓存"""
+        for key in self.by_user.pop(user_id, ()):
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def _remove(self, key: bytes):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        user_id = entry.user.id if entry.user is not None else entry.claims.get("user_id")
+        keys = self.by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self.by_user[user_id]
+
+    def metrics(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+token_cache = TokenCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL_SECONDS)
@@ -5,7 +5,17 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import auth, rooms, users, ai_assistant
 from app.websocket import router as websocket_router
+from app.websocket.backplane import create_backplane
+from app.websocket.manager import manager
 from app.core.config import settings
+from app.core.database import async_engine
+from app.core.password_hasher import password_hasher
+from app.core.token_cache import token_cache
+from app.services.phase_driver import phase_driver, timing_wheel
+from app.services.game_finalizer import game_finalizer
+from app.services.journal_store import journal_store
+from app.services.roster import roster_cache
+from app.services.state_flusher import state_flusher
 
 app = FastAPI(
     title="狼人杀游戏系统",
@@ -30,6 +40,34 @@ app.include_router(ai_assistant.router, prefix="/api/ai", tags=["AI助手"])
 app.include_router(websocket_router.router, tags=["WebSocket"])
 
 
+@app.on_event("startup")
+async def startup():
+    # 启动阶段调度时间轮
+    timing_wheel.start()
+    manager.start_watchdog(timing_wheel)
+    
+    # 引擎状态批量写回数据库，已结束对局分批结算
+    state_flusher.start()
+    game_finalizer.start()
+    # 行动日志与检查点批量写入 Redis（重启后可恢复进行中的对局）
+    journal_store.start()
+    
+    # 多 worker 部署时启用跨进程广播背板
+    backplane = create_backplane(settings.WS_BACKPLANE)
+    if backplane is not None:
+        await manager.start_backplane(backplane)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await manager.stop_backplane()
+    await timing_wheel.stop()
+    await state_flusher.stop()
+    await game_finalizer.stop()
+    await journal_store.stop()
+    await async_engine.dispose()
+
+
 @app.get("/")
 async def root():
     return {"message": "狼人杀游戏系统API", "version": "1.0.0"}
@@ -39,3 +77,19 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+
+@app.get("/metrics")
+async def metrics():
+    """运行指标"""
+    return {
+        "scheduler": timing_wheel.metrics(),
+        "active_games": len(phase_driver.engines),
+        "websocket": manager.metrics(),
+        "roster_cache": roster_cache.metrics(),
+        "auth_cache": token_cache.metrics(),
+        "password_hasher": password_hasher.metrics(),
+        "state_flusher": state_flusher.metrics(),
+        "game_finalizer": game_finalizer.metrics(),
+        "journal_store": journal_store.metrics(),
+    }
+
@@ -0,0 +1,260 @@
+"""
+批量游戏引擎：用 NumPy 数组同时推进 N 局游戏（GameEngine 的向量化版本）
+
+玩家编号固定为 1..P，第 j 列对应玩家 j+1；目标编号 0 表示“无目标”，投票 -1 表示弃权。
+结算规则与 GameEngine 完全一致，同一种子下角色分配也一致。
+"""
+import random
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from app.services.game_engine import Role
+from app.services.role_config import generate_role_config
+
+# 角色编码（-1 表示未分配角色，视为好人阵营）
+ROLE_CODES: Dict[Role, int] = {role: code for code, role in enumerate(Role)}
+NO_ROLE = -1
+
+# 夜晚行动类型编码
+ACTION_NONE = 0
+ACTION_KILL = 1
+ACTION_CHECK = 2
+ACTION_GUARD = 3
+ACTION_SAVE = 4
+ACTION_POISON = 5
+
+ACTION_TYPES: Dict[str, int] = {
+    "kill": ACTION_KILL,
+    "check": ACTION_CHECK,
+    "guard": ACTION_GUARD,
+    "save": ACTION_SAVE,
+    "poison": ACTION_POISON,
+}
+
+# 胜负编码
+WINNER_NONE = 0
+WINNER_WEREWOLVES = 1
+WINNER_VILLAGERS = 2
+
+WINNER_NAMES = {WINNER_NONE: None, WINNER_WEREWOLVES: "werewolves", WINNER_VILLAGERS: "villagers"}
+
+
+class BatchGameEngine:
+    """批量游戏引擎：角色矩阵 + 存活掩码 + 计票矩阵"""
+
+    def __init__(self, game_count: int, player_count: int):
+        self.game_count = game_count
+        self.player_count = player_count
+        self.player_ids = np.arange(1, player_count + 1, dtype=np.int32)
+        self.roles = np.full((game_count, player_count), NO_ROLE, dtype=np.int8)
+        # 角色分配顺序（对应 GameEngine.roles 的插入顺序，决定多名狼人时取谁的行动）
+        self.role_order = np.zeros((game_count, player_count), dtype=np.int16)
+        self.alive = np.ones((game_count, player_count), dtype=bool)
+        self.current_round = 0
+        self._rows = np.arange(game_count)
+
+    def assign_roles(self, seeds: List[int]) -> np.ndarray:
+        """按种子为每局分配角色（与 GameEngine(rng=random.Random(seed)) 结果一致）"""
+        player_ids = self.player_ids.tolist()
+        for game, seed in enumerate(seeds):
+            roles = generate_role_config(player_ids, random.Random(seed))
+            for order, (pid, role) in enumerate(roles.items()):
+                self.roles[game, pid - 1] = ROLE_CODES[role]
+                self.role_order[game, pid - 1] = order
+        self.alive[:] = True
+        return self.roles
+
+    def start_night(self):
+        """开始夜晚阶段"""
+        self.current_round += 1
+
+    def _first_actor(self, role: Role, acted: np.ndarray) -> np.ndarray:
+        """每局中按分配顺序第一个存活且已行动的该角色玩家列号，-1 表示无"""
+        mask = (self.roles == ROLE_CODES[role]) & self.alive & acted
+        order = np.where(mask, self.role_order, np.iinfo(np.int16).max)
+        column = order.argmin(axis=1)
+        return np.where(mask[self._rows, column], column, -1)
+
+    def _pick(self, matrix: np.ndarray, column: np.ndarray) -> np.ndarray:
+        return np.where(column >= 0, matrix[self._rows, np.maximum(column, 0)], 0)
+
+    def process_night_actions(self, action_types: np.ndarray, targets: np.ndarray,
+                              use_antidote: Optional[np.ndarray] = None) -> dict:
+        """处理夜晚行动（按顺序：守卫->狼人->预言家->女巫）
+
+        action_types/targets 为 (N, P) 矩阵，分别是每名玩家的行动类型编码和目标编号。
+        """
+        if use_antidote is None:
+            use_antidote = action_types == ACTION_SAVE
+        acted = (action_types != ACTION_NONE) & self.alive
+
+        # 1. 守卫
+        guard = self._first_actor(Role.GUARD, np.ones_like(acted))
+        guard_acted = self._pick(acted, guard).astype(bool)
+        guard_type = self._pick(action_types, guard)
+        protected = np.where(guard_acted & (guard_type == ACTION_GUARD), self._pick(targets, guard), 0)
+
+        # 2. 狼人：取第一个已行动狼人的目标
+        werewolf = self._first_actor(Role.WEREWOLF, acted)
+        werewolf_target = self._pick(targets, werewolf)
+
+        # 3. 预言家
+        seer = self._first_actor(Role.SEER, np.ones_like(acted))
+        seer_checked = self._pick(acted, seer).astype(bool) & (self._pick(action_types, seer) == ACTION_CHECK)
+        seer_target = np.where(seer_checked, self._pick(targets, seer), 0)
+        seer_is_werewolf = np.zeros(self.game_count, dtype=bool)
+        checked_rows = seer_target > 0
+        seer_is_werewolf[checked_rows] = (
+            self.roles[checked_rows, seer_target[checked_rows] - 1] == ROLE_CODES[Role.WEREWOLF]
+        )
+
+        # 4. 女巫
+        witch = self._first_actor(Role.WITCH, np.ones_like(acted))
+        witch_acted = self._pick(acted, witch).astype(bool)
+        witch_type = self._pick(action_types, witch)
+        saved = witch_acted & (witch_type == ACTION_SAVE) & self._pick(use_antidote, witch).astype(bool)
+        poisoned = np.where(witch_acted & (witch_type == ACTION_POISON), self._pick(targets, witch), 0)
+
+        # 结算
+        killed = np.zeros_like(self.alive)
+        bitten = (werewolf_target > 0) & (werewolf_target != protected) & ~saved
+        killed[self._rows[bitten], werewolf_target[bitten] - 1] = True
+        poison_rows = poisoned > 0
+        poison_rows[poison_rows] = self.alive[poison_rows, poisoned[poison_rows] - 1]
+        killed[self._rows[poison_rows], poisoned[poison_rows] - 1] = True
+
+        killed &= self.alive
+        self.alive &= ~killed
+
+        return {
+            "killed": killed,
+            "protected": protected,
+            "seer_target": seer_target,
+            "seer_is_werewolf": seer_is_werewolf,
+            "saved": saved & (werewolf_target > 0),
+        }
+
+    def process_voting(self, votes: np.ndarray) -> np.ndarray:
+        """处理投票结果
+
+        votes 为 (N, P) 矩阵：0 表示未投票，-1 表示弃权，其余为目标玩家编号。
+        返回每局被投出的玩家编号（0 表示无人出局）。
+        """
+        valid = self.alive & (votes != 0)
+        target_alive = np.ones_like(valid)
+        voted_player = valid & (votes > 0)
+        target_alive[voted_player] = self.alive[np.nonzero(voted_player)[0], votes[voted_player] - 1]
+        valid &= target_alive
+
+        # 计票矩阵：第 0 列为弃权，第 k 列为玩家 k
+        width = self.player_count + 1
+        columns = np.where(votes < 0, 0, votes)
+        flat = (self._rows[:, None] * width + columns)[valid]
+        tally = np.bincount(flat, minlength=self.game_count * width).reshape(self.game_count, width)
+
+        max_votes = tally.max(axis=1)
+        leaders = (tally == max_votes[:, None]).sum(axis=1)
+        top = tally.argmax(axis=1)
+        eliminated = np.where((max_votes > 0) & (leaders == 1) & (top != 0), top, 0)
+
+        out = eliminated > 0
+        self.alive[self._rows[out], eliminated[out] - 1] = False
+        return eliminated
+
+    def check_winner(self) -> np.ndarray:
+        """检查胜负条件，返回每局的胜负编码"""
+        alive_werewolves = (self.alive & (self.roles == ROLE_CODES[Role.WEREWOLF])).sum(axis=1)
+        alive_villagers = self.alive.sum(axis=1) - alive_werewolves
+        return np.select(
+            [alive_werewolves >= alive_villagers, alive_werewolves == 0],
+            [WINNER_WEREWOLVES, WINNER_VILLAGERS],
+            WINNER_NONE
+        ).astype(np.int8)
+
+    def alive_bitmask(self) -> np.ndarray:
+        """每局存活玩家的位掩码（第 j 位对应玩家 j+1）"""
+        return np.packbits(self.alive, axis=1, bitorder="little")
+
+
+def _random_choice(candidates: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """在最后一维的候选掩码中随机选一个，返回玩家编号（无候选时为 0）"""
+    scores = np.where(candidates, rng.random(candidates.shape), -1.0)
+    column = scores.argmax(axis=-1)
+    return np.where(candidates.any(axis=-1), column + 1, 0)
+
+
+def random_night_actions(engine: BatchGameEngine, rng: np.random.Generator):
+    """向量化随机策略：生成全部对局的夜晚行动矩阵 (action_types, targets)"""
+    roles, alive = engine.roles, engine.alive
+    action_types = np.zeros(roles.shape, dtype=np.int8)
+    targets = np.zeros(roles.shape, dtype=np.int32)
+
+    werewolf = roles == ROLE_CODES[Role.WEREWOLF]
+    prey = _random_choice(alive & ~werewolf, rng)
+    has_prey = (werewolf & alive) & (prey > 0)[:, None]
+    action_types[has_prey] = ACTION_KILL
+    targets[has_prey] = np.broadcast_to(prey[:, None], roles.shape)[has_prey]
+
+    anyone = _random_choice(alive, rng)
+    for role, action in ((Role.SEER, ACTION_CHECK), (Role.GUARD, ACTION_GUARD)):
+        actor = (roles == ROLE_CODES[role]) & alive
+        action_types[actor] = action
+        targets[actor] = np.broadcast_to(anyone[:, None], roles.shape)[actor]
+
+    witch = (roles == ROLE_CODES[Role.WITCH]) & alive
+    draw = rng.random(engine.game_count)
+    save = witch & (draw < 0.5)[:, None]
+    poison = witch & ((draw >= 0.5) & (draw < 0.6))[:, None]
+    action_types[save] = ACTION_SAVE
+    action_types[poison] = ACTION_POISON
+    targets[poison] = np.broadcast_to(anyone[:, None], roles.shape)[poison]
+    return action_types, targets
+
+
+def random_votes(engine: BatchGameEngine, rng: np.random.Generator) -> np.ndarray:
+    """向量化随机策略：每名存活玩家随机投一名其他存活玩家（狼人不投狼人）"""
+    werewolf = engine.roles == ROLE_CODES[Role.WEREWOLF]
+    candidates = np.broadcast_to(engine.alive[:, None, :], engine.alive.shape + (engine.player_count,)).copy()
+    candidates &= ~np.eye(engine.player_count, dtype=bool)[None, :, :]
+    candidates &= ~(werewolf[:, :, None] & werewolf[:, None, :])
+    votes = _random_choice(candidates, rng)
+    votes = np.where(votes > 0, votes, -1)
+    return np.where(engine.alive, votes, 0)
+
+
+def simulate_batch(seeds: List[int], player_count: int, max_rounds: int = 50) -> dict:
+    """按步调一致推进一批对局直到全部结束，返回胜负与轮数统计"""
+    engine = BatchGameEngine(len(seeds), player_count)
+    engine.assign_roles(seeds)
+    rng = np.random.default_rng(seeds[0] if seeds else 0)
+
+    winners = np.zeros(len(seeds), dtype=np.int8)
+    rounds = np.zeros(len(seeds), dtype=np.int32)
+    while engine.current_round < max_rounds:
+        running = winners == WINNER_NONE
+        if not running.any():
+            break
+        engine.start_night()
+        rounds[running] = engine.current_round
+
+        action_types, targets = random_night_actions(engine, rng)
+        action_types[~running] = ACTION_NONE
+        engine.process_night_actions(action_types, targets)
+        winners = np.where(running, engine.check_winner(), winners)
+
+        running = winners == WINNER_NONE
+        votes = random_votes(engine, rng)
+        votes[~running] = 0
+        engine.process_voting(votes)
+        winners = np.where(running, engine.check_winner(), winners)
+
+    return {
+        "games": len(seeds),
+        "wins": {
+            "werewolves": int((winners == WINNER_WEREWOLVES).sum()),
+            "villagers": int((winners == WINNER_VILLAGERS).sum()),
+            "draw": int((winners == WINNER_NONE).sum()),
+        },
+        "rounds": int(rounds.sum()),
+    }
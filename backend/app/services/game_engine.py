@@ -1,10 +1,16 @@
 """
 游戏逻辑引擎：角色分配、状态机、回合控制、胜负判定
 """
+import functools
 import random
-from typing import List, Dict, Optional
+import time
+from collections import deque
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from enum import Enum
-from datetime import datetime
+
+from app.services.game_events import DEFAULT_LOCALE, EventType, GameEvent, from_wall_time, to_wall_time
+from app.services.game_log import GameLog
+from app.services.vote_tally import VoteTally
 
 
 class Role(Enum):
@@ -25,89 +31,224 @@ class GamePhase(Enum):
     RESULT = "result"  # 结果
 
 
+# 夜晚需要行动的角色
+NIGHT_ROLES = (Role.WEREWOLF, Role.SEER, Role.WITCH, Role.GUARD)
+
+# 各角色默认的夜晚行动类型（女巫救人需显式提交 save）
+DEFAULT_NIGHT_ACTIONS = {
+    Role.WEREWOLF: "kill",
+    Role.SEER: "check",
+    Role.WITCH: "poison",
+    Role.GUARD: "guard",
+}
+
+# 各角色允许提交的夜晚行动类型
+ROLE_NIGHT_ACTIONS = {
+    Role.WEREWOLF: ("kill",),
+    Role.SEER: ("check",),
+    Role.WITCH: ("save", "poison"),
+    Role.GUARD: ("guard",),
+}
+
+
+class GameState:
+    """游戏状态：角色 -> 存活玩家索引与阵营计数，死亡/复活时增量维护"""
+    __slots__ = ("roles", "alive_players", "dead_players", "alive_by_role",
+                 "alive_werewolf_count", "alive_villager_count", "version")
+    
+    def __init__(self):
+        self.roles: Dict[int, Role] = {}  # {player_id: role}
+        self.alive_players: set = set()
+        self.dead_players: set = set()
+        # {role: {player_id: None}}，用dict保持分配顺序
+        self.alive_by_role: Dict[Role, Dict[int, None]] = {role: {} for role in Role}
+        self.alive_werewolf_count = 0
+        self.alive_villager_count = 0  # 非狼人阵营（含未分配角色的玩家）
+        self.version = 0  # 阵营计数每次变化（死亡、复活、重置、改角色）时递增
+    
+    def reset(self, player_ids: List[int], roles: Dict[int, Role]):
+        """按分配结果重建状态"""
+        self.roles = dict(roles)
+        self.alive_players = set()
+        self.dead_players = set()
+        self.alive_by_role = {role: {} for role in Role}
+        self.alive_werewolf_count = 0
+        self.alive_villager_count = 0
+        self.version += 1
+        for pid in roles:
+            self._add_alive(pid)
+        for pid in player_ids:
+            if pid not in self.alive_players:
+                self._add_alive(pid)
+    
+    def set_role(self, player_id: int, role: Role):
+        """修改玩家角色（保持索引与计数一致）"""
+        alive = player_id in self.alive_players
+        if alive:
+            self._remove_alive(player_id)
+        self.roles[player_id] = role
+        if alive:
+            self._add_alive(player_id)
+        self.version += 1
+    
+    def kill(self, player_id: int) -> bool:
+        """玩家死亡"""
+        if player_id not in self.alive_players:
+            return False
+        self._remove_alive(player_id)
+        self.dead_players.add(player_id)
+        self.version += 1
+        return True
+    
+    def revive(self, player_id: int) -> bool:
+        """玩家复活"""
+        if player_id not in self.dead_players:
+            return False
+        self.dead_players.discard(player_id)
+        self._add_alive(player_id)
+        self.version += 1
+        return True
+    
+    def first_alive(self, role: Role) -> Optional[int]:
+        """获取该角色的第一个存活玩家"""
+        return next(iter(self.alive_by_role[role]), None)
+    
+    def alive_with_role(self, role: Role) -> Dict[int, None]:
+        """获取该角色的全部存活玩家"""
+        return self.alive_by_role[role]
+    
+    def _add_alive(self, player_id: int):
+        self.alive_players.add(player_id)
+        role = self.roles.get(player_id)
+        if role is not None:
+            self.alive_by_role[role][player_id] = None
+        if role == Role.WEREWOLF:
+            self.alive_werewolf_count += 1
+        else:
+            self.alive_villager_count += 1
+    
+    def _remove_alive(self, player_id: int):
+        self.alive_players.discard(player_id)
+        role = self.roles.get(player_id)
+        if role is not None:
+            self.alive_by_role[role].pop(player_id, None)
+        if role == Role.WEREWOLF:
+            self.alive_werewolf_count -= 1
+        else:
+            self.alive_villager_count -= 1
+
+
+def _journaled(when: Callable[[Any], bool] = lambda result: result is not False):
+    """状态变更方法装饰器：执行成功（when(result) 为真）后追加到行动日志"""
+    def decorator(method):
+        op = method.__name__
+        
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._replaying or not self.journaling:
+                return method(self, *args, **kwargs)
+            
+            # 同一行动产生的事件与行动日志使用同一时间
+            self._action_ts = time.monotonic()
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                ts, self._action_ts = self._action_ts, None
+            if when(result):
+                self._journal_append(op, args, kwargs, ts)
+            return result
+        return wrapper
+    return decorator
+
+
+# 行动日志条目：(序号, Unix 时间戳, 方法名, 位置参数, 关键字参数)
+JournalEntry = Tuple[int, float, str, tuple, dict]
+
+
 class GameEngine:
     """游戏引擎"""
     
-    def __init__(self, game_id: int, player_count: int):
+    CHECKPOINT_INTERVAL = 64  # 每 K 个行动生成一次检查点
+    CHECKPOINT_KEEP = 2  # 保留的检查点数量（行动日志只保留最旧检查点之后的部分）
+    
+    def __init__(self, game_id: int, player_count: int, rng: Optional[random.Random] = None,
+                 journaling: bool = True):
         self.game_id = game_id
         self.player_count = player_count
-        self.roles: Dict[int, Role] = {}  # {player_id: role}
-        self.alive_players: set = set()
-        self.dead_players: set = set()
+        self.rng = rng or random.Random()  # 随机源（传入带种子的实例可复现对局）
+        self.state = GameState()
         self.current_round = 0
         self.current_phase = GamePhase.NIGHT
         self.night_actions = {}  # 夜晚行动记录
-        self.votes = {}  # 投票记录
-        self.game_log = []  # 游戏日志（包含系统日志和玩家发言）
-        self.speeches = []  # 玩家发言记录
-    
-    def assign_roles(self, player_ids: List[int]) -> Dict[int, Role]:
-        """分配角色"""
-        roles = self._generate_role_config(player_ids)
-        self.roles = roles
-        self.alive_players = set(player_ids)
-        
-        self.game_log.append({
-            "type": "game_log",
-            "round": 0,
-            "message": "游戏开始，角色已分配",
-            "timestamp": None
-        })
-        
-        return roles
+        self.tally = VoteTally()  # 投票记录与增量计票
+        self.winner: Optional[str] = None  # 已宣布的胜利方（结果事件只记录一次）
+        self._winner_cache: Tuple[int, Optional[str]] = (-1, None)  # (state.version, 胜利方)
+        self.game_log = GameLog()  # 游戏日志（结构化事件，包含系统日志和玩家发言）
+        self.journaling = journaling  # 是否记录行动日志与检查点（离线模拟可关闭）
+        self.action_count = 0  # 已执行的状态变更行动数
+        self.journal: List[JournalEntry] = []  # 行动日志（事件溯源）
+        self.checkpoints: deque = deque(maxlen=self.CHECKPOINT_KEEP)  # [(action_count, 快照)]
+        self._action_ts: Optional[float] = None  # 当前行动的时间（单调时钟）
+        self._replaying = False
     
-    def _generate_role_config(self, player_ids: List[int]) -> Dict[int, Role]:
-        """根据玩家人数生成角色配置"""
-        count = len(player_ids)
-        roles = {}
-        shuffled_ids = player_ids.copy()
-        random.shuffle(shuffled_ids)
-        
-        # 基础配置：根据人数分配角色
-        if count >= 6:
-            # 至少1个狼人，1个预言家，其余村民
-            roles[shuffled_ids[0]] = Role.WEREWOLF
-            roles[shuffled_ids[1]] = Role.SEER
-            
-            if count >= 8:
-                roles[shuffled_ids[2]] = Role.WITCH
-            if count >= 10:
-                roles[shuffled_ids[3]] = Role.HUNTER
-            if count >= 12:
-                roles[shuffled_ids[4]] = Role.GUARD
-            
-            # 其余为村民
-            assigned_count = len(roles)
-            for i in range(assigned_count, count):
-                roles[shuffled_ids[i]] = Role.VILLAGER
-            
-            # 确保至少2个狼人（8人以上）
-            if count >= 8:
-                villager_indices = [i for i, role in roles.items() if role == Role.VILLAGER]
-                if villager_indices:
-                    roles[random.choice(villager_indices)] = Role.WEREWOLF
-        
+    @property
+    def roles(self) -> Dict[int, Role]:
+        """{player_id: role}（只读，修改请使用 state.set_role）"""
+        return self.state.roles
+    
+    @property
+    def alive_players(self) -> set:
+        """存活玩家（只读，修改请使用 state.kill / state.revive）"""
+        return self.state.alive_players
+    
+    @property
+    def dead_players(self) -> set:
+        """死亡玩家（只读）"""
+        return self.state.dead_players
+    
+    @property
+    def votes(self) -> Dict[int, int]:
+        """{voter_id: target_id}（只读，修改请使用 record_vote）"""
+        return self.tally.votes
+    
+    def assign_roles(self, player_ids: List[int], roles_config: Optional[dict] = None) -> Dict[int, Role]:
+        """分配角色（roles_config 为房间的角色配置，为空时使用默认规则）"""
+        roles = self._generate_role_config(player_ids, roles_config)
+        self.load_roles(player_ids, [(pid, role.value) for pid, role in roles.items()])
         return roles
     
+    @_journaled()
+    def load_roles(self, player_ids: List[int], roles: List[Tuple[int, str]], dead_players: List[int] = ()):
+        """按确定的角色表开始游戏（行动日志中记录的是分配结果而非随机过程）"""
+        self.state.reset(player_ids, {pid: Role(role) for pid, role in roles})
+        for pid in dead_players:
+            self.state.kill(pid)
+        
+        self._emit(EventType.GAME_STARTED)
+    
+    def _generate_role_config(self, player_ids: List[int], roles_config: Optional[dict] = None) -> Dict[int, Role]:
+        """根据角色配置模板生成分配结果（见 app.services.role_config）"""
+        from app.services.role_config import generate_role_config
+        return generate_role_config(player_ids, self.rng, roles_config)
+    
+    @_journaled()
     def start_night(self):
         """开始夜晚阶段"""
         self.current_round += 1
         self.current_phase = GamePhase.NIGHT
         self.night_actions = {}
         
-        from datetime import datetime
-        self.game_log.append({
-            "type": "game_log",
-            "round": self.current_round,
-            "phase": "night",
-            "message": f"🌙 第 {self.current_round} 夜开始，请各位玩家进行行动",
-            "timestamp": datetime.now().isoformat()
-        })
+        self._emit(EventType.NIGHT_STARTED)
     
+    @_journaled()
     def record_night_action(self, player_id: int, action_type: str, target_id: Optional[int] = None, data: dict = None):
-        """记录夜晚行动"""
+        """记录夜晚行动（行动类型须属于玩家角色，目标须为存活玩家）"""
         if player_id not in self.alive_players:
             return False
+        if action_type not in ROLE_NIGHT_ACTIONS.get(self.roles.get(player_id), ()):
+            return False
+        if target_id is not None and not self.is_alive_target(target_id):
+            return False
         
         self.night_actions[player_id] = {
             "type": action_type,
@@ -116,28 +257,30 @@ class GameEngine:
         }
         return True
     
+    @_journaled()
     def process_night_actions(self):
         """处理夜晚行动（按顺序：守卫->狼人->预言家->女巫）"""
         killed_targets = []
         protected_target = None
         
         # 1. 守卫行动
-        guard_id = next((pid for pid, role in self.roles.items() if role == Role.GUARD and pid in self.alive_players), None)
+        guard_id = self.state.first_alive(Role.GUARD)
         if guard_id and guard_id in self.night_actions:
             action = self.night_actions[guard_id]
             if action["type"] == "guard" and action["target_id"]:
                 protected_target = action["target_id"]
         
         # 2. 狼人行动
-        werewolves = [pid for pid, role in self.roles.items() if role == Role.WEREWOLF and pid in self.alive_players]
         werewolf_target = None
-        if werewolves:
-            werewolf_actions = [self.night_actions.get(wid) for wid in werewolves if wid in self.night_actions]
-            if werewolf_actions and werewolf_actions[0]:
-                werewolf_target = werewolf_actions[0].get("target_id")
+        werewolf_action = next(
+            (self.night_actions[wid] for wid in self.state.alive_with_role(Role.WEREWOLF) if wid in self.night_actions),
+            None
+        )
+        if werewolf_action:
+            werewolf_target = werewolf_action.get("target_id")
         
         # 3. 预言家查验
-        seer_id = next((pid for pid, role in self.roles.items() if role == Role.SEER and pid in self.alive_players), None)
+        seer_id = self.state.first_alive(Role.SEER)
         seer_result = None
         if seer_id and seer_id in self.night_actions:
             action = self.night_actions[seer_id]
@@ -149,7 +292,7 @@ class GameEngine:
                 }
         
         # 4. 女巫行动
-        witch_id = next((pid for pid, role in self.roles.items() if role == Role.WITCH and pid in self.alive_players), None)
+        witch_id = self.state.first_alive(Role.WITCH)
         saved_target = None
         poisoned_target = None
         
@@ -171,189 +314,220 @@ class GameEngine:
         
         # 更新存活状态
         for target_id in killed_targets:
-            if target_id in self.alive_players:
-                self.alive_players.remove(target_id)
-                self.dead_players.add(target_id)
+            self.state.kill(target_id)
         
         night_result = {
             "killed": killed_targets,
             "protected": protected_target,
             "seer_result": seer_result,
+            "seer_id": seer_id if seer_result else None,  # 查验结果只发给该玩家
             "saved": saved_target is not None
         }
         
-        from datetime import datetime
-        
-        # 生成夜晚结果的日志消息
-        log_messages = []
+        # 记录夜晚结果事件
         if killed_targets:
-            log_messages.append(f"💀 夜晚结束，{len(killed_targets)} 名玩家死亡")
+            self._emit(EventType.NIGHT_DEATHS, payload=len(killed_targets))
         else:
-            log_messages.append("✅ 夜晚结束，无人死亡")
+            self._emit(EventType.NIGHT_PEACEFUL)
         
         if protected_target:
-            log_messages.append(f"🛡️ 守卫保护了一名玩家")
+            self._emit(EventType.GUARD_PROTECTED, target_id=protected_target)
         
         if saved_target:
-            log_messages.append(f"💊 女巫使用解药救活了一名玩家")
-        
-        for msg in log_messages:
-            self.game_log.append({
-                "type": "game_log",
-                "round": self.current_round,
-                "phase": "night",
-                "message": msg,
-                "timestamp": datetime.now().isoformat()
-            })
+            self._emit(EventType.WITCH_SAVED, target_id=saved_target)
         
         return night_result
     
+    @_journaled()
     def start_day(self):
         """开始白天阶段"""
         self.current_phase = GamePhase.DAY
-        self.votes = {}
+        self.tally.clear()
         
-        from datetime import datetime
-        self.game_log.append({
-            "type": "game_log",
-            "round": self.current_round,
-            "phase": "day",
-            "message": f"☀️ 第 {self.current_round} 天开始，请各位玩家发言讨论",
-            "timestamp": datetime.now().isoformat()
-        })
+        self._emit(EventType.DAY_STARTED)
+    
+    def night_actions_complete(self) -> bool:
+        """所有存活的夜晚行动角色是否都已提交行动"""
+        return all(
+            pid in self.night_actions
+            for role in NIGHT_ROLES
+            for pid in self.state.alive_with_role(role)
+        )
     
+    @_journaled()
     def record_speech(self, player_id: int, player_name: str, speech_content: str) -> bool:
         """记录玩家发言"""
         if player_id not in self.alive_players:
             return False
         
-        from datetime import datetime
-        speech_record = {
-            "type": "speech",
-            "player_id": player_id,
-            "player_name": player_name,
-            "content": speech_content,
-            "round": self.current_round,
-            "phase": "day",
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        self.speeches.append(speech_record)
-        
-        # 同时记录到游戏日志
-        self.game_log.append({
-            "type": "game_log",
-            "round": self.current_round,
-            "phase": "day",
-            "message": f"💬 {player_name}: {speech_content}",
-            "timestamp": datetime.now().isoformat(),
-            "player_id": player_id,
-            "player_name": player_name
-        })
-        
+        self._emit(EventType.SPEECH, actor_id=player_id, payload=(player_name, speech_content))
         return True
     
+    @_journaled()
     def record_vote(self, voter_id: int, target_id: int) -> bool:
         """记录投票"""
         if voter_id not in self.alive_players:
             return False
-        if target_id not in self.alive_players and target_id != -1:  # -1表示弃权
+        if type(target_id) is not int or (target_id != -1 and target_id not in self.alive_players):  # -1表示弃权
             return False
         
-        self.votes[voter_id] = target_id
+        self.tally.cast(voter_id, target_id)
         return True
     
+    def is_alive_target(self, target_id) -> bool:
+        """目标是否为存活玩家（只接受 int：2.0、True 等与ID相等的值会被拒绝，否则快照编码会失败）"""
+        return type(target_id) is int and target_id in self.alive_players
+    
+    def votes_complete(self) -> bool:
+        """所有存活玩家是否都已投票"""
+        return len(self.tally) >= len(self.alive_players)
+    
+    @_journaled()
     def process_voting(self):
         """处理投票结果"""
-        if not self.votes:
+        if not self.tally:
             return None
         
-        # 统计票数
-        vote_count = {}
-        for target_id in self.votes.values():
-            vote_count[target_id] = vote_count.get(target_id, 0) + 1
-        
-        # 找出得票最多的（可能多个）
-        max_votes = max(vote_count.values()) if vote_count else 0
-        candidates = [tid for tid, count in vote_count.items() if count == max_votes]
-        
-        from datetime import datetime
+        # 得票最多的（可能多个），计票在 record_vote 时已增量完成
+        max_votes = self.tally.max_votes
+        candidates = self.tally.leaders()
         
         # 如果只有一个得票最多，则被投票出局
         if len(candidates) == 1 and candidates[0] != -1:
             eliminated = candidates[0]
-            if eliminated in self.alive_players:
-                self.alive_players.remove(eliminated)
-                self.dead_players.add(eliminated)
+            self.state.kill(eliminated)
             
-            self.game_log.append({
-                "type": "game_log",
-                "round": self.current_round,
-                "phase": "day",
-                "message": f"🗳️ 投票结束，玩家 {eliminated} 被投票出局（{max_votes} 票）",
-                "timestamp": datetime.now().isoformat()
-            })
+            self._emit(EventType.VOTE_ELIMINATED, target_id=eliminated, payload=max_votes)
             
             return eliminated
         
         # 平票或无人被投出
         if len(candidates) > 1:
-            self.game_log.append({
-                "type": "game_log",
-                "round": self.current_round,
-                "phase": "day",
-                "message": f"⚖️ 投票平票，无人被投票出局",
-                "timestamp": datetime.now().isoformat()
-            })
+            self._emit(EventType.VOTE_TIED)
         else:
-            self.game_log.append({
-                "type": "game_log",
-                "round": self.current_round,
-                "phase": "day",
-                "message": f"❌ 投票失败，无人被投票出局",
-                "timestamp": datetime.now().isoformat()
-            })
+            self._emit(EventType.VOTE_FAILED)
         
         return None
     
+    def compute_winner(self) -> Optional[str]:
+        """计算胜负（无副作用，按状态版本缓存，只有死亡/复活后才重新计算）"""
+        version, winner = self._winner_cache
+        if version == self.state.version:
+            return winner
+        
+        alive_werewolves = self.state.alive_werewolf_count
+        alive_villagers = self.state.alive_villager_count
+        winner = None
+        if alive_werewolves >= alive_villagers:
+            # 狼人胜利：狼人数量 >= 村民数量
+            winner = "werewolves"
+        elif alive_werewolves == 0:
+            # 村民胜利：所有狼人出局
+            winner = "villagers"
+        
+        self._winner_cache = (self.state.version, winner)
+        return winner
+    
     def check_winner(self) -> Optional[str]:
-        """检查胜负条件"""
-        alive_werewolves = [pid for pid in self.alive_players if self.roles.get(pid) == Role.WEREWOLF]
-        alive_villagers = [pid for pid in self.alive_players if self.roles.get(pid) != Role.WEREWOLF]
-        
-        from datetime import datetime
-        
-        # 狼人胜利：狼人数量 >= 村民数量
-        if len(alive_werewolves) >= len(alive_villagers):
-            self.game_log.append({
-                "type": "game_log",
-                "round": self.current_round,
-                "phase": "result",
-                "message": f"🐺 游戏结束！狼人获胜！",
-                "timestamp": datetime.now().isoformat()
-            })
-            return "werewolves"
-        
-        # 村民胜利：所有狼人出局
-        if len(alive_werewolves) == 0:
-            self.game_log.append({
-                "type": "game_log",
-                "round": self.current_round,
-                "phase": "result",
-                "message": f"👨‍🌾 游戏结束！村民获胜！",
-                "timestamp": datetime.now().isoformat()
-            })
-            return "villagers"
-        
-        return None
+        """检查胜负条件，首次分出胜负时结束游戏"""
+        winner = self.compute_winner()
+        if winner is not None and self.winner is None:
+            self.finish_game(winner)
+        return winner
+    
+    @_journaled()
+    def finish_game(self, winner: str):
+        """宣布胜利方并进入结果阶段"""
+        self.winner = winner
+        self.current_phase = GamePhase.RESULT
+        self._emit(EventType.WEREWOLVES_WIN if winner == "werewolves" else EventType.VILLAGERS_WIN)
+    
+    def _emit(self, code: EventType, actor_id: Optional[int] = None, target_id: Optional[int] = None,
+              payload=None) -> GameEvent:
+        """记录一条结构化事件（不在热路径上渲染消息）"""
+        event = GameEvent(code, self.current_round, actor_id, target_id, payload, ts=self._action_ts)
+        self.game_log.append(event)
+        return event
     
-    def get_recent_logs(self, limit: int = 20) -> List[dict]:
+    @property
+    def speeches(self) -> List[dict]:
+        """玩家发言记录（从事件日志中渲染）"""
+        return [event.render_speech() for event in self.game_log.all() if event.code == EventType.SPEECH]
+    
+    def get_recent_logs(self, limit: int = 20, locale: str = DEFAULT_LOCALE) -> List[dict]:
         """获取最近的游戏日志"""
-        return self.game_log[-limit:]
+        return [event.render(locale) for event in self.game_log.tail(limit)]
+    
+    def get_logs_since(self, seq: int, limit: Optional[int] = None, locale: str = DEFAULT_LOCALE) -> List[dict]:
+        """获取序号大于 seq 的游戏日志（增量拉取）"""
+        return [event.render(locale) for event in self.game_log.since(seq, limit)]
     
-    def get_all_logs(self) -> List[dict]:
+    def get_all_logs(self, locale: str = DEFAULT_LOCALE) -> List[dict]:
         """获取所有游戏日志（包含发言）"""
-        return self.game_log
+        return [event.render(locale) for event in self.game_log.all()]
+    
+    def _journal_append(self, op: str, args: tuple, kwargs: dict, ts: float):
+        """追加行动日志，每 CHECKPOINT_INTERVAL 个行动生成一次检查点"""
+        self.action_count += 1
+        self.journal.append((self.action_count, to_wall_time(ts), op, args, kwargs))
+        if self.action_count % self.CHECKPOINT_INTERVAL == 0:
+            # 行动已经生效，检查点失败不影响行动本身（下一个间隔再生成，期间行动日志不截断）
+            try:
+                self.checkpoint()
+            except Exception as exc:
+                print(f"[WARNING] 游戏 {self.game_id} 生成检查点失败: {exc!r}")
+    
+    def checkpoint(self) -> bytes:
+        """生成检查点，并截掉最旧检查点之前的行动日志"""
+        data = self.snapshot()
+        self.checkpoints.append((self.action_count, data))
+        oldest = self.checkpoints[0][0]
+        if self.journal and self.journal[0][0] <= oldest:
+            self.journal = [entry for entry in self.journal if entry[0] > oldest]
+        return data
+    
+    def journal_since(self, action_index: int) -> List[JournalEntry]:
+        """获取序号大于 action_index 的行动（日志已截断时从最早保留的行动开始）"""
+        if not self.journal or action_index < self.journal[0][0] - 1:
+            return list(self.journal)
+        return self.journal[action_index - self.journal[0][0] + 1:]
+    
+    def latest_checkpoint(self) -> Optional[Tuple[int, bytes]]:
+        """最近的检查点 (action_count, 快照)"""
+        return self.checkpoints[-1] if self.checkpoints else None
+    
+    def replay(self, entries: List[JournalEntry]):
+        """按顺序重放行动（跳过已包含在当前状态中的行动）"""
+        for index, ts, op, args, kwargs in entries:
+            if index <= self.action_count:
+                continue
+            if index != self.action_count + 1:
+                raise ValueError(f"行动日志不连续：期望 {self.action_count + 1}，实际 {index}")
+            self._action_ts, self._replaying = from_wall_time(ts), True
+            try:
+                getattr(self, op)(*args, **kwargs)
+            finally:
+                self._action_ts, self._replaying = None, False
+            self.action_count = index
+            self.journal.append((index, ts, op, args, kwargs))
+    
+    @classmethod
+    def recover(cls, checkpoint: bytes, entries: List[JournalEntry]) -> "GameEngine":
+        """从检查点加尾部行动重建游戏状态（代价为 O(尾部长度)）"""
+        engine = cls.restore(checkpoint)
+        engine.replay(entries)
+        return engine
+    
+    def snapshot(self) -> bytes:
+        """导出二进制快照（见 app.services.snapshot）"""
+        from app.services.snapshot import encode_engine
+        return encode_engine(self)
+    
+    @classmethod
+    def restore(cls, data: bytes) -> "GameEngine":
+        """从二进制快照恢复游戏引擎"""
+        from app.services.snapshot import decode_engine
+        return decode_engine(data)
     
     def get_player_role(self, player_id: int) -> Optional[Role]:
         """获取玩家角色"""
@@ -367,6 +541,6 @@ class GameEngine:
             "phase": self.current_phase.value,
             "alive_players": list(self.alive_players),
             "dead_players": list(self.dead_players),
-            "winner": self.check_winner()
+            "winner": self.compute_winner()
         }
 
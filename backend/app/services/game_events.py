@@ -0,0 +1,161 @@
+"""
+结构化游戏事件：热路径只记录紧凑事件，读取或广播时才渲染为可读消息
+"""
+import time
+from datetime import datetime
+from enum import IntEnum
+from typing import Any, Dict, Optional
+
+
+class EventType(IntEnum):
+    """事件类型编码"""
+    GAME_STARTED = 1  # 游戏开始
+    NIGHT_STARTED = 2  # 夜晚开始
+    NIGHT_DEATHS = 3  # 夜晚有人死亡（payload: 死亡人数）
+    NIGHT_PEACEFUL = 4  # 平安夜
+    GUARD_PROTECTED = 5  # 守卫保护
+    WITCH_SAVED = 6  # 女巫救人
+    DAY_STARTED = 7  # 白天开始
+    SPEECH = 8  # 玩家发言（payload: (玩家名称, 发言内容)）
+    VOTE_ELIMINATED = 9  # 投票出局（payload: 票数）
+    VOTE_TIED = 10  # 平票
+    VOTE_FAILED = 11  # 无人出局
+    WEREWOLVES_WIN = 12  # 狼人获胜
+    VILLAGERS_WIN = 13  # 村民获胜
+
+
+# 事件所属阶段
+EVENT_PHASES: Dict[EventType, Optional[str]] = {
+    EventType.GAME_STARTED: None,
+    EventType.NIGHT_STARTED: "night",
+    EventType.NIGHT_DEATHS: "night",
+    EventType.NIGHT_PEACEFUL: "night",
+    EventType.GUARD_PROTECTED: "night",
+    EventType.WITCH_SAVED: "night",
+    EventType.DAY_STARTED: "day",
+    EventType.SPEECH: "day",
+    EventType.VOTE_ELIMINATED: "day",
+    EventType.VOTE_TIED: "day",
+    EventType.VOTE_FAILED: "day",
+    EventType.WEREWOLVES_WIN: "result",
+    EventType.VILLAGERS_WIN: "result",
+}
+
+# 各语言的消息模板，可用字段：round, actor_id, target_id, count, player_name, content
+MESSAGE_TEMPLATES: Dict[str, Dict[EventType, str]] = {
+    "zh": {
+        EventType.GAME_STARTED: "游戏开始，角色已分配",
+        EventType.NIGHT_STARTED: "🌙 第 {round} 夜开始，请各位玩家进行行动",
+        EventType.NIGHT_DEATHS: "💀 夜晚结束，{count} 名玩家死亡",
+        EventType.NIGHT_PEACEFUL: "✅ 夜晚结束，无人死亡",
+        EventType.GUARD_PROTECTED: "🛡️ 守卫保护了一名玩家",
+        EventType.WITCH_SAVED: "💊 女巫使用解药救活了一名玩家",
+        EventType.DAY_STARTED: "☀️ 第 {round} 天开始，请各位玩家发言讨论",
+        EventType.SPEECH: "💬 {player_name}: {content}",
+        EventType.VOTE_ELIMINATED: "🗳️ 投票结束，玩家 {target_id} 被投票出局（{count} 票）",
+        EventType.VOTE_TIED: "⚖️ 投票平票，无人被投票出局",
+        EventType.VOTE_FAILED: "❌ 投票失败，无人被投票出局",
+        EventType.WEREWOLVES_WIN: "🐺 游戏结束！狼人获胜！",
+        EventType.VILLAGERS_WIN: "👨‍🌾 游戏结束！村民获胜！",
+    },
+    "en": {
+        EventType.GAME_STARTED: "Game started, roles assigned",
+        EventType.NIGHT_STARTED: "🌙 Night {round} begins, please take your actions",
+        EventType.NIGHT_DEATHS: "💀 Night is over, {count} player(s) died",
+        EventType.NIGHT_PEACEFUL: "✅ Night is over, nobody died",
+        EventType.GUARD_PROTECTED: "🛡️ The guard protected a player",
+        EventType.WITCH_SAVED: "💊 The witch used the antidote to save a player",
+        EventType.DAY_STARTED: "☀️ Day {round} begins, please discuss",
+        EventType.SPEECH: "💬 {player_name}: {content}",
+        EventType.VOTE_ELIMINATED: "🗳️ Voting is over, player {target_id} is eliminated ({count} votes)",
+        EventType.VOTE_TIED: "⚖️ The vote is tied, nobody is eliminated",
+        EventType.VOTE_FAILED: "❌ The vote failed, nobody is eliminated",
+        EventType.WEREWOLVES_WIN: "🐺 Game over! Werewolves win!",
+        EventType.VILLAGERS_WIN: "👨‍🌾 Game over! Villagers win!",
+    },
+}
+
+DEFAULT_LOCALE = "zh"
+
+
+def normalize_locale(locale: Optional[str]) -> str:
+    """客户端传入的语言 -> 支持的语言（不支持时回退到默认语言，避免按任意字符串缓存）"""
+    return locale if locale in MESSAGE_TEMPLATES else DEFAULT_LOCALE
+
+# 单调时钟到墙上时间的换算基准（渲染时才转换为 ISO 时间）
+_WALL_CLOCK_OFFSET = time.time() - time.monotonic()
+
+
+def to_wall_time(ts: float) -> float:
+    """单调时钟时间 -> Unix 时间戳（用于跨进程持久化）"""
+    return _WALL_CLOCK_OFFSET + ts
+
+
+def from_wall_time(wall: float) -> float:
+    """Unix 时间戳 -> 当前进程的单调时钟时间"""
+    return wall - _WALL_CLOCK_OFFSET
+
+
+class GameEvent:
+    """紧凑的游戏事件"""
+    __slots__ = ("seq", "code", "round", "actor_id", "target_id", "ts", "payload", "_rendered")
+
+    def __init__(self, code: EventType, round_num: int, actor_id: Optional[int] = None,
+                 target_id: Optional[int] = None, payload: Any = None, ts: Optional[float] = None):
+        self.seq = 0
+        self.code = code
+        self.round = round_num
+        self.actor_id = actor_id
+        self.target_id = target_id
+        self.payload = payload
+        self.ts = time.monotonic() if ts is None else ts
+        self._rendered: Optional[Dict[str, dict]] = None  # {locale: 渲染结果}
+
+    @property
+    def timestamp(self) -> str:
+        """ISO 格式的墙上时间"""
+        return datetime.fromtimestamp(to_wall_time(self.ts)).isoformat()
+
+    def render(self, locale: str = DEFAULT_LOCALE) -> dict:
+        """渲染为日志字典（按语言缓存）"""
+        locale = normalize_locale(locale)
+        if self._rendered is None:
+            self._rendered = {}
+        cached = self._rendered.get(locale)
+        if cached is not None:
+            return cached
+
+        templates = MESSAGE_TEMPLATES[locale]
+        fields = {"round": self.round, "actor_id": self.actor_id, "target_id": self.target_id}
+        if self.code == EventType.SPEECH:
+            fields["player_name"], fields["content"] = self.payload
+        elif self.payload is not None:
+            fields["count"] = self.payload
+
+        entry = {
+            "type": "game_log",
+            "round": self.round,
+            "phase": EVENT_PHASES[self.code],
+            "message": templates[self.code].format(**fields),
+            "timestamp": self.timestamp,
+            "seq": self.seq,
+        }
+        if self.code == EventType.SPEECH:
+            entry["player_id"] = self.actor_id
+            entry["player_name"] = fields["player_name"]
+
+        self._rendered[locale] = entry
+        return entry
+
+    def render_speech(self) -> dict:
+        """渲染为发言记录"""
+        player_name, content = self.payload
+        return {
+            "type": "speech",
+            "player_id": self.actor_id,
+            "player_name": player_name,
+            "content": content,
+            "round": self.round,
+            "phase": "day",
+            "timestamp": self.timestamp,
+        }
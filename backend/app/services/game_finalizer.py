@@ -0,0 +1,213 @@
+"""
+对局结算队列：结束的对局先入队，由后台任务分批写入 GameRecord 并更新玩家战绩
+
+每批在一个事务中完成：一次查询对局开始时间、批量插入 game_records、批量把对局标记为已结束，
+战绩按 (局数增量, 胜局增量) 分组，每组一条 UPDATE ... WHERE id IN (...)（通常只有“胜”“负”两组）。
+每隔 FINALIZE_INTERVAL_MS 或排队数达到 FINALIZE_BATCH_SIZE 时处理；写入失败的批次重试
+FINALIZE_MAX_ATTEMPTS 次后丢弃。已结束的对局不会重复结算。关闭时处理完剩余队列。
+"""
+import asyncio
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.token_cache import token_cache
+from app.models.game import Game, GameRecord, GameStatus
+from app.models.user import User
+from app.services.game_engine import GameEngine, Role
+
+_games = Game.__table__
+_users = User.__table__
+
+_FINISH_GAME = update(_games).where(_games.c.id == bindparam("b_game_id")).values(
+    status=GameStatus.FINISHED, finished_at=bindparam("b_finished_at")
+)
+
+
+def winning_players(engine: GameEngine) -> List[int]:
+    """胜利方阵营的玩家（狼人胜利时为狼人，村民胜利时为其余角色，未分胜负时为空）"""
+    if engine.winner is None:
+        return []
+    werewolves_won = engine.winner == "werewolves"
+    return [player_id for player_id, role in engine.roles.items() if (role == Role.WEREWOLF) == werewolves_won]
+
+
+def stats_update(games: int, wins: int):
+    """给一组玩家加 games 局、wins 胜并重算胜率
+
+    win_rate 放在最前：MySQL 按顺序求值 SET 子句，其余数据库总是使用更新前的值。
+    """
+    total_games = func.coalesce(_users.c.total_games, 0)
+    win_games = func.coalesce(_users.c.win_games, 0)
+    return update(_users).where(_users.c.id.in_(bindparam("b_user_ids", expanding=True))).ordered_values(
+        (_users.c.win_rate, (win_games + wins) * 1.0 / (total_games + games)),
+        (_users.c.win_games, win_games + wins),
+        (_users.c.total_games, total_games + games),
+    )
+
+
+class FinishedGame:
+    """等待结算的对局"""
+    __slots__ = ("room_code", "engine", "finished_at", "attempts")
+
+    def __init__(self, room_code: str, engine: GameEngine):
+        self.room_code = room_code
+        self.engine = engine
+        self.finished_at = datetime.now(timezone.utc)
+        self.attempts = 0
+
+
+def _duration(started_at: Optional[datetime], finished_at: datetime) -> Optional[int]:
+    if started_at is None:
+        return None
+    if started_at.tzinfo is None:
+        # SQLite 返回不带时区的 UTC 时间
+        finished_at = finished_at.replace(tzinfo=None)
+    return max(0, int((finished_at - started_at).total_seconds()))
+
+
+class GameFinalizer:
+    """分批结算已结束的对局"""
+
+    def __init__(self, interval: float, batch_size: int, max_attempts: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.queue: Deque[FinishedGame] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.finalized = 0
+        self.skipped = 0
+        self.batches = 0
+        self.failures = 0
+        self.dropped = 0
+        self.busy = 0.0  # 结算批次的累计耗时（秒）
+        self.last_batch = 0.0
+
+    def submit(self, room_code: str, engine: GameEngine):
+        """对局结束时调用（只入队，不访问数据库）"""
+        self.queue.append(FinishedGame(room_code, engine))
+        if len(self.queue) >= self.batch_size and self._wake is not None:
+            self._wake.set()
+
+    async def finalize_batch(self, batch: List[FinishedGame]) -> int:
+        """在一个事务中结算一批对局，返回实际结算的局数"""
+        by_id: Dict[int, FinishedGame] = {item.engine.game_id: item for item in batch}
+        async with AsyncSessionLocal() as db:
+            rows = await db.execute(
+                select(Game.id, Game.started_at).where(Game.id.in_(by_id), Game.status != GameStatus.FINISHED)
+            )
+            started = dict(rows.all())
+            if not started:
+                return 0
+
+            records = []
+            finished = []
+            deltas: Dict[int, List[int]] = {}  # {user_id: [局数, 胜局数]}
+            for game_id, started_at in started.items():
+                item = by_id[game_id]
+                engine = item.engine
+                records.append({
+                    "game_id": game_id,
+                    "winner": engine.winner,
+                    "duration": _duration(started_at, item.finished_at),
+                    "rounds": engine.current_round,
+                    "game_log": engine.get_all_logs(),
+                    "finished_at": item.finished_at,
+                })
+                finished.append({"b_game_id": game_id, "b_finished_at": item.finished_at})
+                for player_id in engine.roles:
+                    deltas.setdefault(player_id, [0, 0])[0] += 1
+                for player_id in winning_players(engine):
+                    deltas[player_id][1] += 1
+
+            groups: Dict[Tuple[int, int], List[int]] = {}
+            for user_id, (games, wins) in deltas.items():
+                groups.setdefault((games, wins), []).append(user_id)
+
+            await db.execute(insert(GameRecord.__table__), records)
+            await db.execute(_FINISH_GAME, finished)
+            for (games, wins), user_ids in groups.items():
+                await db.execute(stats_update(games, wins), {"b_user_ids": user_ids})
+            await db.commit()
+
+        # 认证缓存中的用户信息包含战绩
+        for user_id in deltas:
+            token_cache.invalidate_user(user_id)
+        return len(started)
+
+    async def drain(self) -> int:
+        """结算当前队列中的所有对局，返回结算的局数"""
+        total = 0
+        while self.queue:
+            batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+            started = time.perf_counter()
+            try:
+                count = await self.finalize_batch(batch)
+            except Exception as exc:
+                self.failures += 1
+                retry = []
+                for item in batch:
+                    item.attempts += 1
+                    if item.attempts < self.max_attempts:
+                        retry.append(item)
+                    else:
+                        self.dropped += 1
+                        print(f"[WARNING] 对局 {item.room_code} 结算失败 {item.attempts} 次，已放弃")
+                print(f"[WARNING] 对局结算失败（{len(batch)} 局）: {exc!r}")
+                self.queue.extendleft(reversed(retry))
+                break
+            self.last_batch = time.perf_counter() - started
+            self.busy += self.last_batch
+            self.batches += 1
+            self.finalized += count
+            self.skipped += len(batch) - count
+            total += count
+        return total
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.drain()
+
+    def start(self):
+        """在当前事件循环中启动后台结算"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """停止后台结算并处理完剩余队列"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.drain()
+
+    def metrics(self) -> dict:
+        return {
+            "queued": len(self.queue),
+            "finalized": self.finalized,
+            "skipped": self.skipped,
+            "batches": self.batches,
+            "failures": self.failures,
+            "dropped": self.dropped,
+            "last_batch_ms": round(self.last_batch * 1000, 3),
+            "games_per_sec": round(self.finalized / self.busy, 1) if self.busy else None,
+        }
+
+
+game_finalizer = GameFinalizer(settings.FINALIZE_INTERVAL_MS / 1000, settings.FINALIZE_BATCH_SIZE,
+                               settings.FINALIZE_MAX_ATTEMPTS)
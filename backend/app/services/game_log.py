@@ -0,0 +1,111 @@
+"""
+游戏日志存储：带递增序号的环形缓冲区（保存 GameEvent），旧日志溢出到冷存储
+
+默认冷存储最多保留 MemorySpill.DEFAULT_MAX_ENTRIES 条，加上热区共约 4600 条（正常对局远低于此）；
+超出时丢弃最旧的日志（如恶意刷屏），since/all 从仍保留的最旧一条（first_seq）开始返回，序号不变。
+"""
+from collections import deque
+from itertools import islice
+from typing import Deque, Optional
+
+
+class MemorySpill:
+    """默认冷存储：按序追加到内存队列，最多保留 max_entries 条（超出时丢弃最旧的）
+
+    可替换为 Redis/数据库实现，只需提供 write(entry)、read(after_index, limit) 与 dropped（已丢弃的条数）。
+    """
+
+    DEFAULT_MAX_ENTRIES = 4096
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries: Deque = deque()
+        self.dropped = 0  # 已丢弃的最旧日志条数
+
+    def write(self, entry):
+        if len(self.entries) >= self.max_entries:
+            self.entries.popleft()
+            self.dropped += 1
+        self.entries.append(entry)
+
+    def read(self, after_index: int, limit: Optional[int]) -> list:
+        """读取写入顺序（从 1 开始）大于 after_index 的日志（after_index 不小于 dropped）"""
+        start = after_index - self.dropped
+        end = len(self.entries) if limit is None else start + limit
+        return list(islice(self.entries, start, end))
+
+
+class GameLog:
+    """游戏日志：热区为固定容量的环形缓冲区，按序号 O(1) 定位、O(k) 读取"""
+
+    DEFAULT_CAPACITY = 512
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spill=None):
+        self.capacity = capacity
+        self.spill = spill or MemorySpill()
+        self._buffer: list = [None] * capacity
+        self._base = 0  # 第一条日志之前的序号（从快照恢复且最旧的日志已丢弃时不为 0）
+        self._next_seq = 1
+
+    def __len__(self) -> int:
+        return self._next_seq - 1
+
+    @property
+    def last_seq(self) -> int:
+        """最新一条日志的序号（无日志时为 0）"""
+        return self._next_seq - 1
+
+    @property
+    def first_seq(self) -> int:
+        """仍可读取的最旧一条日志的序号"""
+        return self._base + 1 + self.spill.dropped
+
+    @property
+    def first_hot_seq(self) -> int:
+        """热区中最旧一条日志的序号"""
+        return max(self._base + 1, self._next_seq - self.capacity)
+
+    def start_after(self, seq: int):
+        """让空日志从 seq + 1 开始编号（恢复最旧日志已丢弃的快照时使用）"""
+        if self._next_seq != 1:
+            raise ValueError("只能对空日志设置起始序号")
+        self._base = seq
+        self._next_seq = seq + 1
+
+    def append(self, entry) -> int:
+        """追加日志事件并分配序号"""
+        seq = self._next_seq
+        slot = (seq - 1) % self.capacity
+        evicted = self._buffer[slot]
+        if evicted is not None:
+            self.spill.write(evicted)
+
+        entry.seq = seq
+        self._buffer[slot] = entry
+        self._next_seq += 1
+        return seq
+
+    def _hot(self, from_seq: int, to_seq: int) -> list:
+        return [self._buffer[(seq - 1) % self.capacity] for seq in range(from_seq, to_seq)]
+
+    def tail(self, limit: int) -> list:
+        """最近 limit 条日志"""
+        return self.since(max(0, self.last_seq - limit), limit)
+
+    def since(self, seq: int, limit: Optional[int] = None) -> list:
+        """序号大于 seq 的日志，最多 limit 条"""
+        start = max(seq + 1, self.first_seq)
+        end = self._next_seq if limit is None else min(self._next_seq, start + max(limit, 0))
+        if start >= end:
+            return []
+
+        hot_start = self.first_hot_seq
+        if start >= hot_start:
+            return self._hot(start, end)
+
+        cold = self.spill.read(start - 1 - self._base, min(end, hot_start) - start)
+        return cold + self._hot(hot_start, end) if end > hot_start else cold
+
+    def all(self) -> list:
+        """全部日志（冷存储 + 热区）"""
+        return self.since(0)
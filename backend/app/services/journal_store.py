@@ -0,0 +1,219 @@
+"""
+行动日志持久化：最近的检查点与其后的行动日志写入 Redis，重启或驱逐后用 GameEngine.recover 重建
+
+每个房间两个键：ENGINE_SNAPSHOT_KEY 保存最近的检查点（驱逐时为完整快照），ENGINE_JOURNAL_KEY 列表保存检查点之后的行动。
+行动只在内存中追加；后台任务每隔 JOURNAL_FLUSH_INTERVAL_MS 用一个 pipeline 写入各房间新增的行动
+（引擎生成了新检查点时改写检查点并重建列表），行动处理的热路径上没有 Redis 往返。
+进程崩溃时最多丢失一个间隔内的行动；写入失败的房间下次重试（恢复时会跳过重复的行动）。
+所有读写都使用异步客户端；批量写入与驱逐时的快照写入互斥，旧检查点不会覆盖驱逐时写入的快照。
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import msgpack
+import redis
+
+from app.core.config import settings
+from app.core.redis_client import redis_client
+from app.services.game_engine import GameEngine, JournalEntry
+from app.services.snapshot import SnapshotError
+
+# 游戏引擎检查点（快照）与行动日志在 Redis 中的键与过期时间
+ENGINE_SNAPSHOT_KEY = "game:engine:{room_code}"
+ENGINE_JOURNAL_KEY = "game:engine:{room_code}:journal"
+ENGINE_SNAPSHOT_TTL = 24 * 3600
+
+
+def encode_entry(entry: JournalEntry) -> bytes:
+    return msgpack.packb(entry, use_bin_type=True)
+
+
+def decode_entry(data: bytes) -> JournalEntry:
+    index, ts, op, args, kwargs = msgpack.unpackb(data, raw=False)
+    return index, ts, op, tuple(args), kwargs
+
+
+class _Tracked:
+    """登记的引擎与已写入 Redis 的进度"""
+    __slots__ = ("engine", "persisted", "checkpoint")
+
+    def __init__(self, engine: GameEngine, persisted: int, checkpoint: int):
+        self.engine = engine
+        self.persisted = persisted  # 已写入的行动序号
+        self.checkpoint = checkpoint  # 已写入的检查点对应的行动序号（-1 表示尚未写入）
+
+
+class JournalStore:
+    """按房间批量写入检查点与行动日志"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.rooms: Dict[str, _Tracked] = {}
+        self._lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.entries_written = 0
+        self.checkpoints_written = 0
+        self.failures = 0
+        self.failing = False
+        self.last_flush = 0.0
+
+    def track(self, room_code: str, engine: GameEngine, restored: bool = False):
+        """登记需要持久化的引擎（restored 为真表示引擎刚从 Redis 恢复，已有内容无需重写）"""
+        if not engine.journaling:
+            return
+        if engine.latest_checkpoint() is None:
+            try:
+                engine.checkpoint()
+            except Exception as exc:
+                print(f"[WARNING] 房间 {room_code} 生成检查点失败，行动日志不会持久化: {exc!r}")
+                return
+        if restored:
+            self.rooms[room_code] = _Tracked(engine, engine.action_count, engine.latest_checkpoint()[0])
+        else:
+            self.rooms[room_code] = _Tracked(engine, -1, -1)
+
+    def untrack(self, room_code: str):
+        self.rooms.pop(room_code, None)
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        # 在首次使用时创建，绑定到当前事件循环
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    async def flush(self) -> int:
+        """写入各房间新增的检查点与行动，返回写入的行动数"""
+        async with self.lock:
+            return await self._flush()
+
+    async def _flush(self) -> int:
+        pipe = redis_client.async_raw_client.pipeline(transaction=False)
+        written = []
+        for room_code, room in self.rooms.items():
+            engine = room.engine
+            if engine.action_count == room.persisted:
+                continue
+            checkpoint_index, data = engine.latest_checkpoint()
+            journal_key = ENGINE_JOURNAL_KEY.format(room_code=room_code)
+            after = room.persisted
+            if checkpoint_index != room.checkpoint:
+                pipe.set(ENGINE_SNAPSHOT_KEY.format(room_code=room_code), data, ex=ENGINE_SNAPSHOT_TTL)
+                pipe.delete(journal_key)
+                after = checkpoint_index
+            entries = engine.journal_since(after)
+            if entries:
+                pipe.rpush(journal_key, *[encode_entry(entry) for entry in entries])
+                pipe.expire(journal_key, ENGINE_SNAPSHOT_TTL)
+            written.append((room, checkpoint_index, engine.action_count, len(entries)))
+        if not written:
+            return 0
+
+        started = time.perf_counter()
+        try:
+            await pipe.execute()
+        except Exception as exc:
+            self.failures += 1
+            if not self.failing:
+                # Redis 不可用期间每个间隔都会失败，只在开始失败时记录一次
+                print(f"[WARNING] 行动日志写入失败（{len(written)} 个房间，稍后重试）: {exc!r}")
+            self.failing = True
+            return 0
+        self.failing = False
+
+        self.last_flush = time.perf_counter() - started
+        self.flushes += 1
+        count = 0
+        for room, checkpoint_index, action_count, entries in written:
+            if checkpoint_index != room.checkpoint:
+                self.checkpoints_written += 1
+            room.checkpoint, room.persisted = checkpoint_index, action_count
+            count += entries
+        self.entries_written += count
+        return count
+
+    async def save(self, room_code: str, engine: GameEngine) -> bool:
+        """写入完整快照作为最新检查点并清空行动日志，之后不再跟踪该引擎（驱逐前调用）"""
+        try:
+            data = engine.snapshot()
+        except SnapshotError as exc:
+            print(f"[WARNING] 房间 {room_code} 的引擎无法生成快照: {exc!r}")
+            return False
+        async with self.lock:
+            try:
+                pipe = redis_client.async_raw_client.pipeline(transaction=False)
+                pipe.set(ENGINE_SNAPSHOT_KEY.format(room_code=room_code), data, ex=ENGINE_SNAPSHOT_TTL)
+                pipe.delete(ENGINE_JOURNAL_KEY.format(room_code=room_code))
+                await pipe.execute()
+            except redis.RedisError:
+                return False
+            self.untrack(room_code)
+        return True
+
+    async def load(self, room_code: str) -> Optional[GameEngine]:
+        """从检查点与其后的行动日志恢复引擎（不存在或无法恢复时返回 None）"""
+        try:
+            pipe = redis_client.async_raw_client.pipeline(transaction=False)
+            pipe.get(ENGINE_SNAPSHOT_KEY.format(room_code=room_code))
+            pipe.lrange(ENGINE_JOURNAL_KEY.format(room_code=room_code), 0, -1)
+            data, entries = await pipe.execute()
+        except redis.RedisError:
+            return None
+        if not data:
+            return None
+        try:
+            return recover_engine(data, entries)
+        except ValueError as exc:
+            # SnapshotError 与行动日志损坏（含不连续）
+            print(f"[WARNING] 房间 {room_code} 的引擎快照无法恢复: {exc!r}")
+            return None
+
+    async def run(self):
+        while not self._stopping:
+            await asyncio.sleep(self.interval)
+            await self.flush()
+
+    def start(self):
+        """在当前事件循环中启动后台写入"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """停止后台写入并写入剩余行动"""
+        if self._task is not None:
+            self._stopping = True
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "rooms": len(self.rooms),
+            "pending_rooms": sum(room.engine.action_count != room.persisted for room in self.rooms.values()),
+            "flushes": self.flushes,
+            "entries_written": self.entries_written,
+            "checkpoints_written": self.checkpoints_written,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush * 1000, 3),
+        }
+
+
+def recover_engine(data: bytes, entries: List[bytes]) -> GameEngine:
+    """从检查点与 Redis 中的行动日志重建引擎（数据损坏时抛出 ValueError）"""
+    try:
+        decoded = [decode_entry(entry) for entry in entries]
+    except (TypeError, ValueError) as exc:
+        raise ValueError("行动日志损坏") from exc
+    return GameEngine.recover(data, decoded)
+
+
+journal_store = JournalStore(settings.JOURNAL_FLUSH_INTERVAL_MS / 1000)
@@ -0,0 +1,134 @@
+"""
+阶段驱动：按截止时间或行动齐全自动推进 夜晚 -> 结算 -> 白天 -> 投票结算 -> 夜晚
+"""
+from typing import Awaitable, Callable, Dict, Optional, Set
+
+from app.core.config import settings
+from app.services.game_engine import GameEngine, GamePhase
+from app.services.scheduler import Timer, TimingWheel
+
+# 阶段转换回调：(room_code, engine, event, result)
+TransitionCallback = Callable[[str, GameEngine, str, object], Awaitable[None]]
+
+
+class PhaseDriver:
+    """所有房间共用一个时间轮的阶段驱动器"""
+
+    def __init__(self, wheel: TimingWheel, night_seconds: float, day_seconds: float):
+        self.wheel = wheel
+        self.night_seconds = night_seconds
+        self.day_seconds = day_seconds
+        self.on_transition: Optional[TransitionCallback] = None
+        self.engines: Dict[str, GameEngine] = {}
+        self.timers: Dict[str, Timer] = {}
+        self.advancing: Set[str] = set()  # 正在推进的房间（推进过程中会等待广播，期间不可重入）
+        self.notified: Set[str] = set()  # 推进期间收到行动通知的房间（推进结束后重新检查行动是否齐全）
+
+    def is_running(self, room_code: str) -> bool:
+        return room_code in self.engines
+
+    async def start_game(self, room_code: str, engine: GameEngine):
+        """开始驱动一局游戏（进入第一夜）"""
+        self.engines[room_code] = engine
+        engine.start_night()
+        self._schedule(room_code, self.night_seconds)
+        await self._notify(room_code, engine, "night_started", None)
+
+    async def resume_game(self, room_code: str, engine: GameEngine):
+        """继续驱动从快照恢复的游戏（进程重启后）：当前阶段重新完整计时，行动已齐全时立即推进"""
+        if room_code in self.engines or engine.winner is not None:
+            return
+        if engine.current_round == 0:
+            # 开局后第一夜开始前就中断了
+            await self.start_game(room_code, engine)
+            return
+        self.engines[room_code] = engine
+        self._schedule(room_code, self.night_seconds if engine.current_phase == GamePhase.NIGHT else self.day_seconds)
+        await self.notify_action(room_code)
+
+    def stop_game(self, room_code: str):
+        """停止驱动"""
+        self.wheel.cancel(self.timers.pop(room_code, None))
+        self.engines.pop(room_code, None)
+        self.notified.discard(room_code)
+
+    async def notify_action(self, room_code: str):
+        """玩家提交行动后调用：行动齐全时立即推进，不必等截止时间"""
+        engine = self.engines.get(room_code)
+        if engine is None:
+            return
+        if room_code in self.advancing:
+            self.notified.add(room_code)
+            return
+        if engine.current_phase == GamePhase.NIGHT and engine.night_actions_complete():
+            await self.advance(room_code)
+        elif engine.current_phase == GamePhase.DAY and engine.votes_complete():
+            await self.advance(room_code)
+
+    def _schedule_if_running(self, room_code: str, delay: float):
+        """推进结束时安排下一阶段的截止时间（在最后一次回调之后，截止定时器不会落在推进过程中）"""
+        if room_code in self.engines:
+            self._schedule(room_code, delay)
+
+    def _schedule(self, room_code: str, delay: float):
+        self.wheel.cancel(self.timers.pop(room_code, None))
+        self.timers[room_code] = self.wheel.schedule(delay, self.advance, room_code)
+
+    async def advance(self, room_code: str):
+        """推进到下一阶段
+
+        结算与进入下一阶段之间会等待回调（广播），期间到达的定时器不会重复结算同一阶段；
+        期间到达的行动通知在推进结束后按新阶段重新检查，行动齐全时立即继续推进。
+        """
+        engine = self.engines.get(room_code)
+        if engine is None or room_code in self.advancing:
+            return
+        self.advancing.add(room_code)
+        try:
+            await self._advance(room_code, engine)
+        finally:
+            self.advancing.discard(room_code)
+        if room_code in self.notified:
+            self.notified.discard(room_code)
+            await self.notify_action(room_code)
+
+    async def _advance(self, room_code: str, engine: GameEngine):
+        self.wheel.cancel(self.timers.pop(room_code, None))
+
+        if engine.current_phase == GamePhase.NIGHT:
+            result = engine.process_night_actions()
+            await self._notify(room_code, engine, "night_resolved", result)
+            if await self._check_winner(room_code, engine):
+                return
+            engine.start_day()
+            await self._notify(room_code, engine, "day_started", None)
+            self._schedule_if_running(room_code, self.day_seconds)
+
+        elif engine.current_phase == GamePhase.DAY:
+            result = engine.process_voting()
+            await self._notify(room_code, engine, "voting_resolved", result)
+            if await self._check_winner(room_code, engine):
+                return
+            engine.start_night()
+            await self._notify(room_code, engine, "night_started", None)
+            self._schedule_if_running(room_code, self.night_seconds)
+
+    async def _check_winner(self, room_code: str, engine: GameEngine) -> bool:
+        winner = engine.check_winner()
+        if not winner:
+            return False
+        self.stop_game(room_code)
+        await self._notify(room_code, engine, "game_over", winner)
+        return True
+
+    async def _notify(self, room_code: str, engine: GameEngine, event: str, result):
+        if self.on_transition is None:
+            return
+        try:
+            await self.on_transition(room_code, engine, event, result)
+        except Exception as exc:
+            print(f"[WARNING] 阶段转换回调异常: {exc!r}")
+
+
+timing_wheel = TimingWheel(tick_ms=settings.SCHEDULER_TICK_MS)
+phase_driver = PhaseDriver(timing_wheel, settings.NIGHT_PHASE_SECONDS, settings.DAY_PHASE_SECONDS)
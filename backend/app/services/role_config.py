@@ -0,0 +1,105 @@
+"""
+角色配置编译：校验 Game.roles_config，并按人数预先生成角色模板（LRU 缓存）
+
+roles_config 格式为 {角色: 数量}，例如 {"werewolf": 3, "seer": 1, "witch": 1}；
+未列出的名额均为村民，显式给出的 villager 数量视为下限。空配置使用默认规则。
+"""
+import random
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from app.services.game_engine import Role
+
+# 规范化后的配置：按角色名排序的 ((角色, 数量), ...)，空元组表示默认规则
+ConfigKey = Tuple[Tuple[str, int], ...]
+
+ROLE_NAMES = {role.value: role for role in Role}
+
+# 默认规则的最少人数（人数不足时不分配角色）
+DEFAULT_MIN_PLAYERS = 6
+
+
+class RoleConfigError(ValueError):
+    """角色配置不合法"""
+
+
+def normalize_roles_config(roles_config: Optional[dict]) -> ConfigKey:
+    """校验并规范化角色配置（结果可哈希，用作模板缓存的键）"""
+    if not roles_config:
+        return ()
+    if not isinstance(roles_config, dict):
+        raise RoleConfigError("角色配置必须是 {角色: 数量} 的字典")
+
+    items = []
+    for name, count in roles_config.items():
+        if name not in ROLE_NAMES:
+            raise RoleConfigError(f"未知角色: {name}")
+        if isinstance(count, bool) or not isinstance(count, int) or count < 0:
+            raise RoleConfigError(f"角色 {name} 的数量必须是非负整数")
+        if count:
+            items.append((name, count))
+
+    config = tuple(sorted(items))
+    if dict(config).get(Role.WEREWOLF.value, 0) < 1:
+        raise RoleConfigError("至少需要 1 名狼人")
+    return config
+
+
+def required_players(config: ConfigKey) -> int:
+    """配置至少需要的玩家数（狼人需少于其余玩家，否则开局即结束）"""
+    if not config:
+        return DEFAULT_MIN_PLAYERS
+    counts = dict(config)
+    werewolves = counts[Role.WEREWOLF.value]
+    return max(sum(counts.values()), 2 * werewolves + 1)
+
+
+def _default_template(count: int) -> List[Role]:
+    """默认规则：狼人、预言家，8 人起加女巫和第 2 名狼人，10 人起加猎人，12 人起加守卫"""
+    if count < DEFAULT_MIN_PLAYERS:
+        return []
+    template = [Role.WEREWOLF, Role.SEER]
+    if count >= 8:
+        template.append(Role.WITCH)
+    if count >= 10:
+        template.append(Role.HUNTER)
+    if count >= 12:
+        template.append(Role.GUARD)
+    if count >= 8:
+        template.append(Role.WEREWOLF)
+    return template
+
+
+@lru_cache(maxsize=512)
+def compile_template(config: ConfigKey, count: int) -> Tuple[Role, ...]:
+    """生成 count 人的角色模板（与玩家顺序无关，分配时打乱玩家后按位置对应）"""
+    if not config:
+        template = _default_template(count)
+        if not template:
+            return ()
+    else:
+        if count < required_players(config):
+            raise RoleConfigError(f"该角色配置至少需要 {required_players(config)} 名玩家")
+        # 狼人优先，其余按角色名顺序
+        template = [Role.WEREWOLF] * dict(config)[Role.WEREWOLF.value]
+        for name, role_count in config:
+            if name not in (Role.WEREWOLF.value, Role.VILLAGER.value):
+                template.extend([ROLE_NAMES[name]] * role_count)
+    template.extend([Role.VILLAGER] * (count - len(template)))
+    return tuple(template)
+
+
+def role_template(roles_config: Optional[dict], count: int) -> Tuple[Role, ...]:
+    """校验配置并返回 count 人的角色模板"""
+    return compile_template(normalize_roles_config(roles_config), count)
+
+
+def generate_role_config(player_ids: List[int], rng: random.Random,
+                         roles_config: Optional[dict] = None) -> Dict[int, Role]:
+    """分配角色：打乱玩家后与模板逐位对应（GameEngine 与 BatchGameEngine 共用，保证同种子结果一致）"""
+    template = role_template(roles_config, len(player_ids))
+    if not template:
+        return {}
+    shuffled_ids = player_ids.copy()
+    rng.shuffle(shuffled_ids)
+    return dict(zip(shuffled_ids, template))
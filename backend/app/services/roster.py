@@ -0,0 +1,141 @@
+"""
+房间名单缓存：玩家ID、存活状态、显示名称与房间状态只在首次使用时查库，之后由房间事件维护
+
+发言、聊天与游戏行动的热路径只读缓存，不再访问数据库。加入房间、开始游戏时整体失效重新加载；
+玩家死亡与游戏结束直接更新缓存；房间内已无连接时释放。
+名单通过 AsyncSession 加载，WebSocket 消息遇到缓存未命中时也不阻塞事件循环。
+"""
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.game import Game, GamePlayer, GameStatus
+from app.models.user import User
+
+
+def display_name(username: str, nickname: Optional[str]) -> str:
+    """玩家显示名称（优先昵称）"""
+    return nickname or username
+
+
+class RosterEntry:
+    """名单中的一名玩家"""
+    __slots__ = ("user_id", "name", "is_alive", "seat_number")
+
+    def __init__(self, user_id: int, name: str, is_alive: bool, seat_number: Optional[int]):
+        self.user_id = user_id
+        self.name = name
+        self.is_alive = is_alive
+        self.seat_number = seat_number
+
+
+class RoomRoster:
+    """一个房间的名单快照"""
+
+    def __init__(self, game_id: int, status: GameStatus, current_round: int, current_phase: Optional[str],
+                 players: Dict[int, RosterEntry]):
+        self.game_id = game_id
+        self.status = status
+        self.current_round = current_round
+        self.current_phase = current_phase
+        self.players = players
+
+    def get(self, user_id: int) -> Optional[RosterEntry]:
+        return self.players.get(user_id)
+
+    def name_of(self, user_id: int) -> str:
+        entry = self.players.get(user_id)
+        return entry.name if entry is not None else f"玩家{user_id}"
+
+    def alive_ids(self) -> frozenset:
+        return frozenset(user_id for user_id, entry in self.players.items() if entry.is_alive)
+
+
+class RosterCache:
+    """按房间号缓存 RoomRoster"""
+
+    def __init__(self):
+        self.rooms: Dict[str, RoomRoster] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, room_code: str, db: AsyncSession) -> Optional[RoomRoster]:
+        """获取房间名单，未缓存时通过异步会话查库加载（房间不存在返回 None）"""
+        roster = self.rooms.get(room_code)
+        if roster is not None:
+            self.hits += 1
+            return roster
+        self.misses += 1
+        roster = await self._load(room_code, db)
+        if roster is None:
+            return None
+        # 等待数据库期间其他消息可能已加载或失效重载了名单，以缓存中的为准
+        return self.rooms.setdefault(room_code, roster)
+
+    def peek(self, room_code: str) -> Optional[RoomRoster]:
+        """只读缓存，不查库"""
+        return self.rooms.get(room_code)
+
+    async def _load(self, room_code: str, db: AsyncSession) -> Optional[RoomRoster]:
+        game = await db.scalar(select(Game).where(Game.room_code == room_code))
+        if not game:
+            return None
+        rows = (await db.execute(
+            select(GamePlayer.user_id, GamePlayer.is_alive, GamePlayer.seat_number,
+                   User.username, User.nickname).join(
+                User, User.id == GamePlayer.user_id
+            ).where(GamePlayer.game_id == game.id)
+        )).all()
+        return _build_roster(game, rows)
+
+    def invalidate(self, room_code: str):
+        """房间成员或状态在数据库中发生变化（加入、开始游戏）后调用，下次使用时重新加载"""
+        self.rooms.pop(room_code, None)
+
+    def mark_dead(self, room_code: str, user_ids: Iterable[int]):
+        roster = self.rooms.get(room_code)
+        if roster is None:
+            return
+        for user_id in user_ids:
+            entry = roster.players.get(user_id)
+            if entry is not None:
+                entry.is_alive = False
+
+    def set_phase(self, room_code: str, current_round: int, current_phase: str):
+        roster = self.rooms.get(room_code)
+        if roster is not None:
+            roster.current_round = current_round
+            roster.current_phase = current_phase
+
+    def set_status(self, room_code: str, status: GameStatus):
+        roster = self.rooms.get(room_code)
+        if roster is not None:
+            roster.status = status
+
+    def rename(self, user_id: int, name: str):
+        """用户修改昵称后更新其所在房间的名单"""
+        for roster in self.rooms.values():
+            entry = roster.players.get(user_id)
+            if entry is not None:
+                entry.name = name
+
+    def metrics(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "rooms": len(self.rooms),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else None,
+        }
+
+
+def _build_roster(game: Game, rows) -> RoomRoster:
+    players = {
+        user_id: RosterEntry(user_id, display_name(username, nickname), bool(is_alive), seat_number)
+        for user_id, is_alive, seat_number, username, nickname in rows
+    }
+    return RoomRoster(game.id, game.status, game.current_round or 0, game.current_phase, players)
+
+
+roster_cache = RosterCache()
@@ -0,0 +1,170 @@
+"""
+分层时间轮调度器：单个 asyncio 任务驱动所有房间的定时器，调度/取消/触发均为 O(1)
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Set
+
+
+class Timer:
+    """时间轮定时器"""
+    __slots__ = ("deadline", "callback", "args", "bucket")
+
+    def __init__(self, deadline: int, callback: Callable, args: tuple):
+        self.deadline = deadline  # 到期的 tick
+        self.callback = callback
+        self.args = args
+        self.bucket: Optional[Dict["Timer", None]] = None  # 所在槽位（None 表示已触发或已取消）
+
+    @property
+    def active(self) -> bool:
+        return self.bucket is not None
+
+
+class TimingWheel:
+    """分层时间轮
+
+    第 L 层每个槽位跨度为 slots^L 个 tick；低层转完一圈时把高层对应槽位的定时器下放（cascade）。
+    """
+
+    def __init__(self, tick_ms: int = 50, slots: int = 64, levels: int = 4):
+        self.tick = tick_ms / 1000
+        self.slots = slots
+        self.levels = levels
+        self.wheels: List[List[Dict[Timer, None]]] = [[{} for _ in range(slots)] for _ in range(levels)]
+        self.current_tick = 0
+        self.pending = 0  # 未触发的定时器数量
+        self.fired = 0
+
+        # 时间轮延迟指标（实际处理时间相对于 tick 计划时间的滞后，秒）
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.avg_lag = 0.0
+
+        self._started_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._callbacks: Set[asyncio.Future] = set()  # 运行中的协程回调（保留引用，结束时记录异常）
+
+    def schedule(self, delay: float, callback: Callable, *args) -> Timer:
+        """delay 秒后调用 callback(*args)，callback 可以是协程函数"""
+        ticks = max(1, int(round(delay / self.tick)))
+        timer = Timer(self.current_tick + ticks, callback, args)
+        self._insert(timer)
+        self.pending += 1
+        return timer
+
+    def cancel(self, timer: Optional[Timer]) -> bool:
+        """取消定时器"""
+        if timer is None or timer.bucket is None:
+            return False
+        timer.bucket.pop(timer, None)
+        timer.bucket = None
+        self.pending -= 1
+        return True
+
+    def _insert(self, timer: Timer):
+        delta = timer.deadline - self.current_tick
+        level, span = 0, self.slots
+        while delta >= span and level < self.levels - 1:
+            level += 1
+            span *= self.slots
+        if delta >= span:
+            # 超出时间轮范围：先放在最高层最远的槽位，下放时重新计算
+            deadline = self.current_tick + span - 1
+        else:
+            deadline = timer.deadline
+        index = (deadline // (self.slots ** level)) % self.slots
+        bucket = self.wheels[level][index]
+        bucket[timer] = None
+        timer.bucket = bucket
+
+    def advance(self, ticks: int = 1) -> int:
+        """推进时间轮，返回触发的定时器数量"""
+        fired = 0
+        for _ in range(ticks):
+            self.current_tick += 1
+            self._cascade()
+            bucket = self.wheels[0][self.current_tick % self.slots]
+            if not bucket:
+                continue
+            due = list(bucket)
+            bucket.clear()
+            for timer in due:
+                timer.bucket = None
+                self.pending -= 1
+                fired += 1
+                self._fire(timer)
+        self.fired += fired
+        return fired
+
+    def _cascade(self):
+        span = 1
+        for level in range(1, self.levels):
+            span *= self.slots
+            if self.current_tick % span:
+                break
+            bucket = self.wheels[level][(self.current_tick // span) % self.slots]
+            if not bucket:
+                continue
+            timers = list(bucket)
+            bucket.clear()
+            for timer in timers:
+                self._insert(timer)
+
+    def _fire(self, timer: Timer):
+        try:
+            result = timer.callback(*timer.args)
+            if asyncio.iscoroutine(result):
+                task = asyncio.ensure_future(result)
+                self._callbacks.add(task)
+                task.add_done_callback(self._callback_done)
+        except Exception as exc:
+            print(f"[WARNING] 定时器回调异常: {exc!r}")
+
+    def _callback_done(self, task: asyncio.Future):
+        self._callbacks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"[WARNING] 定时器回调异常: {task.exception()!r}")
+
+    def _record_lag(self, lag: float):
+        self.last_lag = lag
+        self.max_lag = max(self.max_lag, lag)
+        self.avg_lag = self.avg_lag * 0.99 + lag * 0.01
+
+    async def run(self):
+        """按 tick 推进时间轮；事件循环卡顿后会一次性追赶落下的 tick"""
+        self._started_at = time.monotonic() - self.current_tick * self.tick
+        while True:
+            next_at = self._started_at + (self.current_tick + 1) * self.tick
+            await asyncio.sleep(max(0.0, next_at - time.monotonic()))
+            now = time.monotonic()
+            target = int((now - self._started_at) / self.tick)
+            if target > self.current_tick:
+                self._record_lag(now - (self._started_at + target * self.tick))
+                self.advance(target - self.current_tick)
+
+    def start(self):
+        """在当前事件循环中启动时间轮"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """停止时间轮"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def metrics(self) -> dict:
+        """调度器指标"""
+        return {
+            "tick_ms": self.tick * 1000,
+            "pending_timers": self.pending,
+            "fired_timers": self.fired,
+            "last_lag_ms": round(self.last_lag * 1000, 3),
+            "avg_lag_ms": round(self.avg_lag * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
@@ -0,0 +1,230 @@
+"""
+无界面自博弈模拟器：用脚本策略驱动 GameEngine，多进程批量跑对局
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from app.services.game_engine import GameEngine, Role
+
+
+class Policy:
+    """脚本策略基类：决定每名玩家的夜晚行动和投票"""
+
+    name = "base"
+
+    def night_action(self, engine: GameEngine, player_id: int, role: Role,
+                     rng: random.Random) -> Optional[Tuple[str, Optional[int], dict]]:
+        """返回 (action_type, target_id, data)，None 表示不行动"""
+        return None
+
+    def vote(self, engine: GameEngine, player_id: int, role: Role, rng: random.Random) -> int:
+        """返回投票目标，-1 表示弃权"""
+        return -1
+
+
+class RandomPolicy(Policy):
+    """随机策略：狼人随机刀非狼人，神职随机行动，所有人随机投票"""
+
+    name = "random"
+
+    def night_action(self, engine, player_id, role, rng):
+        others = [pid for pid in engine.alive_players if pid != player_id]
+        if not others:
+            return None
+
+        if role == Role.WEREWOLF:
+            targets = [pid for pid in others if engine.roles.get(pid) != Role.WEREWOLF]
+            return ("kill", rng.choice(targets), {}) if targets else None
+        if role == Role.SEER:
+            return ("check", rng.choice(others), {})
+        if role == Role.GUARD:
+            return ("guard", rng.choice(others + [player_id]), {})
+        if role == Role.WITCH:
+            if rng.random() < 0.5:
+                return ("save", None, {"use_antidote": True})
+            if rng.random() < 0.2:
+                return ("poison", rng.choice(others), {})
+        return None
+
+    def vote(self, engine, player_id, role, rng):
+        others = [pid for pid in engine.alive_players if pid != player_id]
+        if role == Role.WEREWOLF:
+            others = [pid for pid in others if engine.roles.get(pid) != Role.WEREWOLF]
+        return rng.choice(others) if others else -1
+
+
+class CoordinatedPolicy(RandomPolicy):
+    """协同策略：狼人统一刀同一目标，预言家查到的狼人会被好人集中投票"""
+
+    name = "coordinated"
+
+    def __init__(self):
+        self.known_werewolves: Dict[int, set] = {}  # {game_id: {player_id}}
+
+    def night_action(self, engine, player_id, role, rng):
+        if role == Role.WEREWOLF:
+            targets = sorted(pid for pid in engine.alive_players if engine.roles.get(pid) != Role.WEREWOLF)
+            if not targets:
+                return None
+            # 同一夜所有狼人选同一个目标
+            return ("kill", targets[(engine.game_id + engine.current_round) % len(targets)], {})
+
+        action = super().night_action(engine, player_id, role, rng)
+        if role == Role.SEER and action and engine.roles.get(action[1]) == Role.WEREWOLF:
+            self.known_werewolves.setdefault(engine.game_id, set()).add(action[1])
+        return action
+
+    def vote(self, engine, player_id, role, rng):
+        if role != Role.WEREWOLF:
+            known = [pid for pid in self.known_werewolves.get(engine.game_id, ()) if pid in engine.alive_players]
+            if known:
+                return min(known)
+        return super().vote(engine, player_id, role, rng)
+
+
+POLICIES = {
+    RandomPolicy.name: RandomPolicy,
+    CoordinatedPolicy.name: CoordinatedPolicy,
+}
+
+
+def play_game(engine: GameEngine, policy: Policy, rng: random.Random, max_rounds: int = 50) -> Optional[str]:
+    """用策略把已分配角色的对局跑到分出胜负（或达到轮数上限），返回获胜方"""
+    winner = None
+    while engine.current_round < max_rounds:
+        engine.start_night()
+        for pid in list(engine.alive_players):
+            action = policy.night_action(engine, pid, engine.roles.get(pid), rng)
+            if action:
+                action_type, target_id, data = action
+                engine.record_night_action(pid, action_type, target_id, data)
+        engine.process_night_actions()
+        winner = engine.check_winner()
+        if winner:
+            break
+
+        engine.start_day()
+        for pid in list(engine.alive_players):
+            engine.record_vote(pid, policy.vote(engine, pid, engine.roles.get(pid), rng))
+        engine.process_voting()
+        winner = engine.check_winner()
+        if winner:
+            break
+
+    if isinstance(policy, CoordinatedPolicy):
+        policy.known_werewolves.pop(engine.game_id, None)
+    return winner
+
+
+def simulate_game(seed: int, player_count: int, policy: Policy, max_rounds: int = 50) -> Tuple[Optional[str], int]:
+    """模拟一局游戏，返回 (获胜方, 轮数)"""
+    rng = random.Random(seed)
+    engine = GameEngine(seed, player_count, rng=rng, journaling=False)
+    engine.assign_roles(list(range(1, player_count + 1)))
+    winner = play_game(engine, policy, rng, max_rounds)
+    return winner, engine.current_round
+
+
+def run_chunk(start_seed: int, count: int, player_count: int, policy_name: str, max_rounds: int,
+              engine: str = "object") -> dict:
+    """在工作进程中运行一批连续种子的对局，返回聚合结果"""
+    if engine == "batch":
+        # 向量化批量引擎（仅支持随机策略）
+        from app.services.batch_engine import simulate_batch
+
+        started = time.perf_counter()
+        result = simulate_batch(list(range(start_seed, start_seed + count)), player_count, max_rounds)
+        result["elapsed"] = time.perf_counter() - started
+        return result
+
+    policy = POLICIES[policy_name]()
+    wins: Dict[str, int] = {"werewolves": 0, "villagers": 0, "draw": 0}
+    total_rounds = 0
+
+    started = time.perf_counter()
+    for seed in range(start_seed, start_seed + count):
+        winner, rounds = simulate_game(seed, player_count, policy, max_rounds)
+        wins[winner or "draw"] += 1
+        total_rounds += rounds
+
+    return {
+        "games": count,
+        "wins": wins,
+        "rounds": total_rounds,
+        "elapsed": time.perf_counter() - started,
+    }
+
+
+def _chunks(games: int, chunk_size: int, seed: int) -> List[Tuple[int, int]]:
+    return [(seed + start, min(chunk_size, games - start)) for start in range(0, games, chunk_size)]
+
+
+def run_simulation(games: int, player_count: int, policy_name: str = "random", workers: Optional[int] = None,
+                   chunk_size: int = 1000, seed: int = 0, max_rounds: int = 50, engine: str = "object",
+                   out=sys.stdout) -> dict:
+    """把对局分块分发到进程池，每完成一块就输出一行聚合结果（JSON Lines）"""
+    workers = workers or os.cpu_count() or 1
+    totals = {"games": 0, "wins": {"werewolves": 0, "villagers": 0, "draw": 0}, "rounds": 0, "cpu_seconds": 0.0}
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_chunk, start, count, player_count, policy_name, max_rounds, engine)
+            for start, count in _chunks(games, chunk_size, seed)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            totals["games"] += result["games"]
+            totals["rounds"] += result["rounds"]
+            totals["cpu_seconds"] += result["elapsed"]
+            for side, count in result["wins"].items():
+                totals["wins"][side] += count
+
+            wall = time.perf_counter() - started
+            out.write(json.dumps({
+                "games": totals["games"],
+                "wins": totals["wins"],
+                "avg_rounds": round(totals["rounds"] / totals["games"], 3),
+                "games_per_sec": round(totals["games"] / wall, 1),
+                "games_per_sec_per_core": round(totals["games"] / totals["cpu_seconds"], 1),
+            }) + "\n")
+            out.flush()
+
+    totals["wall_seconds"] = time.perf_counter() - started
+    totals["workers"] = workers
+    return totals
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="werewolf-sim", description="狼人杀无界面自博弈模拟器")
+    parser.add_argument("--games", type=int, default=10000, help="对局总数")
+    parser.add_argument("--players", type=int, default=12, help="每局玩家人数")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="random", help="脚本策略")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数（默认CPU核数）")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="每个任务包含的对局数")
+    parser.add_argument("--seed", type=int, default=0, help="起始种子")
+    parser.add_argument("--max-rounds", type=int, default=50, help="单局最大轮数")
+    parser.add_argument("--engine", choices=["object", "batch"], default="object",
+                        help="object: 逐局驱动 GameEngine；batch: NumPy 批量引擎（需要 numpy，仅随机策略）")
+    args = parser.parse_args(argv)
+    if args.engine == "batch" and args.policy != RandomPolicy.name:
+        parser.error("batch 引擎仅支持 random 策略")
+
+    totals = run_simulation(
+        args.games, args.players, args.policy, args.workers, args.chunk_size, args.seed, args.max_rounds, args.engine
+    )
+    print(
+        f"完成 {totals['games']} 局，用时 {totals['wall_seconds']:.2f}s，"
+        f"{totals['games'] / totals['wall_seconds']:.1f} 局/秒（{totals['workers']} 进程）",
+        file=sys.stderr
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+GameEngine 二进制快照：版本化的紧凑 struct 编码，用于持久化与快速恢复
+"""
+import json
+import struct
+from typing import List
+
+from app.services.game_engine import GameEngine, GamePhase, Role
+from app.services.game_events import EventType, GameEvent, from_wall_time, to_wall_time
+
+MAGIC = b"WWS"
+SNAPSHOT_VERSION = 3
+
+ROLES: List[Role] = list(Role)
+PHASES: List[GamePhase] = list(GamePhase)
+ROLE_INDEX = {role: index for index, role in enumerate(ROLES)}
+PHASE_INDEX = {phase: index for index, phase in enumerate(PHASES)}
+EVENT_TYPES = {event_type.value: event_type for event_type in EventType}
+
+# 头部：魔数、版本、game_id、player_count、current_round、phase
+_HEADER = struct.Struct("<3sBqIIB")
+# v2 起头部后紧跟已执行的行动数（对应行动日志序号）
+# v3 起日志事件数之前记录第一条事件之前的序号（冷存储丢弃过最旧的日志时不为 0）
+_ACTION_COUNT = struct.Struct("<Q")
+_COUNT = struct.Struct("<I")
+# 玩家：player_id、角色编码（-1 为未分配）、是否存活
+_PLAYER = struct.Struct("<qb?")
+_VOTE = struct.Struct("<qq")
+# 事件：code、round、可选字段标记、actor_id、target_id、墙上时间
+_EVENT = struct.Struct("<BIBqqd")
+_INT = struct.Struct("<q")
+# 发言：玩家名称与内容的字节长度
+_SPEECH = struct.Struct("<II")
+
+_HAS_ACTOR = 1
+_HAS_TARGET = 2
+_PAYLOAD_INT = 4
+_PAYLOAD_SPEECH = 8
+
+
+class SnapshotError(ValueError):
+    """快照格式错误或版本不支持"""
+
+
+def _pack_str(parts: list, value: str):
+    data = value.encode("utf-8")
+    parts.append(_COUNT.pack(len(data)))
+    parts.append(data)
+
+
+class _Reader:
+    """顺序读取缓冲区"""
+
+    def __init__(self, data: bytes):
+        self.data = bytes(data)
+        self.offset = 0
+
+    def unpack(self, fmt: struct.Struct) -> tuple:
+        values = fmt.unpack_from(self.data, self.offset)
+        self.offset += fmt.size
+        return values
+
+    def count(self) -> int:
+        return self.unpack(_COUNT)[0]
+
+    def string(self, length: int = None) -> str:
+        if length is None:
+            length = self.count()
+        value = self.data[self.offset:self.offset + length].decode("utf-8")
+        self.offset += length
+        return value
+
+
+def encode_engine(engine: GameEngine) -> bytes:
+    """编码游戏引擎完整状态（状态超出编码范围时抛出 SnapshotError）"""
+    try:
+        return _encode(engine)
+    except (struct.error, KeyError, TypeError, ValueError) as exc:
+        raise SnapshotError("游戏引擎状态无法编码为快照") from exc
+
+
+def _encode(engine: GameEngine) -> bytes:
+    state = engine.state
+    parts = [_HEADER.pack(MAGIC, SNAPSHOT_VERSION, engine.game_id, engine.player_count,
+                          engine.current_round, PHASE_INDEX[engine.current_phase]),
+             _ACTION_COUNT.pack(engine.action_count)]
+
+    # 玩家：先按角色分配顺序，再补充未分配角色的玩家（保持角色索引顺序）
+    players = list(state.roles)
+    players.extend(pid for pid in state.alive_players | state.dead_players if pid not in state.roles)
+    parts.append(_COUNT.pack(len(players)))
+    for pid in players:
+        role = state.roles.get(pid)
+        parts.append(_PLAYER.pack(pid, ROLE_INDEX[role] if role is not None else -1, pid in state.alive_players))
+
+    # 夜晚行动：data 为任意字典，使用 JSON
+    parts.append(_COUNT.pack(len(engine.night_actions)))
+    for pid, action in engine.night_actions.items():
+        target_id = action.get("target_id")
+        parts.append(_INT.pack(pid))
+        _pack_str(parts, action["type"])
+        parts.append(_INT.pack(target_id if target_id is not None else 0))
+        _pack_str(parts, json.dumps(action.get("data") or {}, ensure_ascii=False, separators=(",", ":")))
+
+    parts.append(_COUNT.pack(len(engine.votes)))
+    for voter_id, target_id in engine.votes.items():
+        parts.append(_VOTE.pack(voter_id, target_id))
+
+    # 日志事件（序号连续：先记录第一条之前的序号，恢复时从其后按顺序追加即可重建）
+    events = engine.game_log.all()
+    parts.append(_COUNT.pack(engine.game_log.last_seq - len(events)))
+    parts.append(_COUNT.pack(len(events)))
+    for event in events:
+        flags = (_HAS_ACTOR if event.actor_id is not None else 0) | (_HAS_TARGET if event.target_id is not None else 0)
+        if event.code == EventType.SPEECH:
+            flags |= _PAYLOAD_SPEECH
+        elif event.payload is not None:
+            flags |= _PAYLOAD_INT
+        parts.append(_EVENT.pack(event.code, event.round, flags, event.actor_id or 0, event.target_id or 0,
+                                 to_wall_time(event.ts)))
+        if flags & _PAYLOAD_SPEECH:
+            name, content = event.payload[0].encode("utf-8"), event.payload[1].encode("utf-8")
+            parts.append(_SPEECH.pack(len(name), len(content)))
+            parts.append(name + content)
+        elif flags & _PAYLOAD_INT:
+            parts.append(_INT.pack(event.payload))
+
+    return b"".join(parts)
+
+
+def decode_engine(data: bytes) -> GameEngine:
+    """从快照恢复游戏引擎"""
+    try:
+        return _decode(_Reader(data))
+    except (struct.error, UnicodeDecodeError, IndexError, KeyError) as exc:
+        raise SnapshotError("快照数据损坏或不完整") from exc
+
+
+def _decode(reader: _Reader) -> GameEngine:
+    magic, version, game_id, player_count, current_round, phase = reader.unpack(_HEADER)
+    if magic != MAGIC:
+        raise SnapshotError("不是游戏引擎快照")
+    if version not in (1, 2, SNAPSHOT_VERSION):
+        raise SnapshotError(f"不支持的快照版本: {version}")
+
+    engine = GameEngine(game_id, player_count)
+    if version >= 2:
+        engine.action_count = reader.unpack(_ACTION_COUNT)[0]
+    engine.current_round = current_round
+    engine.current_phase = PHASES[phase]
+
+    player_ids, roles, dead = [], {}, []
+    for _ in range(reader.count()):
+        pid, role, alive = reader.unpack(_PLAYER)
+        player_ids.append(pid)
+        if role >= 0:
+            roles[pid] = ROLES[role]
+        if not alive:
+            dead.append(pid)
+    engine.state.reset(player_ids, roles)
+    for pid in dead:
+        engine.state.kill(pid)
+
+    for _ in range(reader.count()):
+        pid = reader.unpack(_INT)[0]
+        action_type = reader.string()
+        target_id = reader.unpack(_INT)[0]
+        engine.night_actions[pid] = {
+            "type": action_type,
+            "target_id": target_id or None,
+            "data": json.loads(reader.string()),
+        }
+
+    for _ in range(reader.count()):
+        voter_id, target_id = reader.unpack(_VOTE)
+        engine.tally.cast(voter_id, target_id)
+
+    if version >= 3:
+        engine.game_log.start_after(reader.count())
+    for _ in range(reader.count()):
+        code, round_num, flags, actor_id, target_id, wall = reader.unpack(_EVENT)
+        payload = None
+        if flags & _PAYLOAD_SPEECH:
+            name_length, content_length = reader.unpack(_SPEECH)
+            payload = (reader.string(name_length), reader.string(content_length))
+        elif flags & _PAYLOAD_INT:
+            payload = reader.unpack(_INT)[0]
+        engine.game_log.append(GameEvent(
+            EVENT_TYPES[code], round_num,
+            actor_id if flags & _HAS_ACTOR else None,
+            target_id if flags & _HAS_TARGET else None,
+            payload, ts=from_wall_time(wall)
+        ))
+
+    engine.tally.drain_changes()
+    if engine.current_phase == GamePhase.RESULT:
+        engine.winner = engine.compute_winner()
+    
+    # 快照本身即是当前状态的检查点
+    engine.checkpoints.append((engine.action_count, reader.data))
+    return engine
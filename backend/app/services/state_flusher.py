@@ -0,0 +1,162 @@
+"""
+游戏状态写回（write-behind）：引擎状态变化只在内存中标记，由后台任务定期批量写入数据库
+
+阶段转换时记录房间的轮次、阶段与死亡玩家（后记录的覆盖先记录的），每隔 STATE_FLUSH_INTERVAL_MS
+或待写房间数达到 STATE_FLUSH_MAX_PENDING 时，用两条批量 UPDATE 在一个事务中写回：
+games.current_round/current_phase 与 game_players.is_alive。写入失败的房间留待下次重试，关闭时写回剩余状态。
+行动与阶段推进的热路径上没有数据库写入；数据库最终一致。
+"""
+import asyncio
+import time
+from typing import Dict, FrozenSet, Optional
+
+from sqlalchemy import bindparam, update
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.game import Game, GamePlayer
+from app.services.game_engine import GameEngine
+
+_games = Game.__table__
+_players = GamePlayer.__table__
+
+_UPDATE_GAME = update(_games).where(_games.c.id == bindparam("b_game_id")).values(
+    current_round=bindparam("b_round"), current_phase=bindparam("b_phase")
+)
+_UPDATE_PLAYER = update(_players).where(
+    _players.c.game_id == bindparam("b_game_id"), _players.c.user_id == bindparam("b_user_id")
+).values(is_alive=False)
+
+_NO_PLAYERS: FrozenSet[int] = frozenset()
+
+
+class _RoomState:
+    """待写回的房间状态快照"""
+    __slots__ = ("game_id", "current_round", "current_phase", "dead", "finished")
+
+    def __init__(self, game_id: int, current_round: int, current_phase: str, dead: FrozenSet[int], finished: bool):
+        self.game_id = game_id
+        self.current_round = current_round
+        self.current_phase = current_phase
+        self.dead = dead
+        self.finished = finished  # 对局已结束或房间已关闭：写回后不再保留该房间已写入的死亡玩家
+
+
+class StateFlusher:
+    """按房间合并引擎状态并批量写回"""
+
+    def __init__(self, interval: float, max_pending: int):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.dirty: Dict[str, _RoomState] = {}
+        self.flushing: Dict[str, _RoomState] = {}  # 正在写回的一批状态
+        self.written_dead: Dict[str, FrozenSet[int]] = {}  # 各房间已写入数据库的死亡玩家
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._stopping = False
+        self.flushes = 0
+        self.rooms_written = 0
+        self.players_written = 0
+        self.failures = 0
+        self.last_flush = 0.0
+        self.max_flush = 0.0
+
+    def mark(self, room_code: str, engine: GameEngine):
+        """记录房间当前状态（阶段转换时调用，只修改内存）"""
+        self.dirty[room_code] = _RoomState(
+            engine.game_id, engine.current_round, engine.current_phase.value,
+            frozenset(engine.dead_players), engine.winner is not None,
+        )
+        if len(self.dirty) >= self.max_pending and self._wake is not None:
+            self._wake.set()
+
+    async def flush(self) -> int:
+        """写回当前所有待写状态，返回写回的房间数"""
+        if not self.dirty:
+            return 0
+        batch, self.dirty = self.dirty, {}
+        self.flushing = batch
+        games = []
+        deaths = []
+        for room_code, state in batch.items():
+            games.append({"b_game_id": state.game_id, "b_round": state.current_round, "b_phase": state.current_phase})
+            for user_id in state.dead - self.written_dead.get(room_code, _NO_PLAYERS):
+                deaths.append({"b_game_id": state.game_id, "b_user_id": user_id})
+
+        started = time.perf_counter()
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(_UPDATE_GAME, games)
+                if deaths:
+                    await db.execute(_UPDATE_PLAYER, deaths)
+                await db.commit()
+        except Exception as exc:
+            self.flushing = {}
+            # 期间有更新的状态时以新状态为准
+            for room_code, state in batch.items():
+                self.dirty.setdefault(room_code, state)
+            self.failures += 1
+            print(f"[WARNING] 游戏状态写回失败（{len(batch)} 个房间，稍后重试）: {exc!r}")
+            return 0
+
+        self.flushing = {}
+        self.last_flush = time.perf_counter() - started
+        self.max_flush = max(self.max_flush, self.last_flush)
+        self.flushes += 1
+        self.rooms_written += len(batch)
+        self.players_written += len(deaths)
+        for room_code, state in batch.items():
+            if state.finished:
+                self.written_dead.pop(room_code, None)
+            else:
+                self.written_dead[room_code] = state.dead
+        return len(batch)
+
+    def forget(self, room_code: str):
+        """房间关闭或引擎驱逐时丢弃该房间已写入的死亡玩家记录（待写状态照常写回，写回后不再保留）"""
+        self.written_dead.pop(room_code, None)
+        for pending in (self.dirty, self.flushing):
+            state = pending.get(room_code)
+            if state is not None:
+                state.finished = True
+
+    async def run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+
+    def start(self):
+        """在当前事件循环中启动后台写回"""
+        if self._task is None or self._task.done():
+            self._stopping = False
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """停止后台写回并写回剩余状态"""
+        if self._task is not None:
+            self._stopping = True
+            self._wake.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def metrics(self) -> dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "pending_rooms": len(self.dirty),
+            "tracked_rooms": len(self.written_dead),
+            "flushes": self.flushes,
+            "rooms_written": self.rooms_written,
+            "players_written": self.players_written,
+            "failures": self.failures,
+            "last_flush_ms": round(self.last_flush * 1000, 3),
+            "max_flush_ms": round(self.max_flush * 1000, 3),
+        }
+
+
+state_flusher = StateFlusher(settings.STATE_FLUSH_INTERVAL_MS / 1000, settings.STATE_FLUSH_MAX_PENDING)
@@ -0,0 +1,72 @@
+"""
+增量计票：投票/改票/弃权时 O(1) 维护各目标票数与最高票，结算无需重新统计
+"""
+from typing import Dict, List, Optional
+
+
+class VoteTally:
+    """按票数分桶的计票器
+
+    counts 为 {目标: 票数}，buckets 为 {票数: {目标: None}}，max_votes 为当前最高票数。
+    改票时旧目标减一、新目标加一，最高票只可能变化 1，因此每次投票都是 O(1)。
+    弃权（-1）与普通目标一样参与计票。
+    """
+    __slots__ = ("votes", "counts", "buckets", "max_votes", "_changed")
+
+    def __init__(self):
+        self.votes: Dict[int, int] = {}  # {voter_id: target_id}
+        self.counts: Dict[int, int] = {}
+        self.buckets: Dict[int, Dict[int, None]] = {}
+        self.max_votes = 0
+        self._changed: Dict[int, None] = {}  # 上次 drain_changes 之后票数变化的目标
+
+    def __len__(self) -> int:
+        return len(self.votes)
+
+    def clear(self):
+        self.votes = {}
+        self.counts = {}
+        self.buckets = {}
+        self.max_votes = 0
+        self._changed = {}
+
+    def cast(self, voter_id: int, target_id: int) -> Optional[int]:
+        """记录（或修改）一张票，返回该玩家之前的投票目标"""
+        previous = self.votes.get(voter_id)
+        if previous == target_id:
+            return previous
+        self.votes[voter_id] = target_id
+        if previous is not None:
+            self._move(previous, -1)
+        self._move(target_id, 1)
+        return previous
+
+    def _move(self, target_id: int, delta: int):
+        count = self.counts.get(target_id, 0)
+        if count:
+            bucket = self.buckets[count]
+            bucket.pop(target_id)
+            if not bucket:
+                del self.buckets[count]
+                if count == self.max_votes and delta < 0:
+                    self.max_votes -= 1
+
+        count += delta
+        if count:
+            self.counts[target_id] = count
+            self.buckets.setdefault(count, {})[target_id] = None
+            if count > self.max_votes:
+                self.max_votes = count
+        else:
+            del self.counts[target_id]
+        self._changed[target_id] = None
+
+    def leaders(self) -> List[int]:
+        """得票最多的目标（可能包含弃权 -1）"""
+        return list(self.buckets.get(self.max_votes, ()))
+
+    def drain_changes(self) -> Dict[int, int]:
+        """取出上次调用以来票数变化的目标及其当前票数（用于增量推送）"""
+        changes = {target_id: self.counts.get(target_id, 0) for target_id in self._changed}
+        self._changed = {}
+        return changes
@@ -0,0 +1,184 @@
+"""
+跨进程广播背板：每个 worker 订阅本进程持有连接的房间频道，广播时每个房间只发布一次
+
+消息帧格式为 "来源worker|消息类型|目标用户ID(逗号分隔，空表示全体)|已编码的消息"，
+接收方跳过自己发布的消息（本进程的连接在发布前已直接投递）。
+"""
+import asyncio
+import uuid
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Set
+
+# 投递回调：(room_code, 消息类型, 目标用户ID或None, 已编码的消息)
+DeliverCallback = Callable[[str, str, Optional[list], str], Awaitable[None]]
+
+CHANNEL_PREFIX = "ws:room:"
+
+
+def encode_frame(origin: str, kind: str, user_ids: Optional[Iterable[int]], text: str) -> str:
+    users = ",".join(str(user_id) for user_id in user_ids) if user_ids is not None else ""
+    return f"{origin}|{kind}|{users}|{text}"
+
+
+def decode_frame(frame: str):
+    origin, kind, users, text = frame.split("|", 3)
+    user_ids = [int(user_id) for user_id in users.split(",")] if users else None
+    return origin, kind, user_ids, text
+
+
+class Backplane(ABC):
+    """背板基类：子类实现订阅与发布（subscribe/unsubscribe 须调用父类方法维护已订阅房间）"""
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self.deliver: Optional[DeliverCallback] = None
+        self.rooms: Set[str] = set()
+        self.published = 0
+        self.received = 0
+
+    async def start(self, deliver: DeliverCallback):
+        self.deliver = deliver
+
+    async def stop(self):
+        self.rooms.clear()
+
+    @abstractmethod
+    async def subscribe(self, room_code: str):
+        self.rooms.add(room_code)
+
+    @abstractmethod
+    async def unsubscribe(self, room_code: str):
+        self.rooms.discard(room_code)
+
+    @abstractmethod
+    async def publish(self, room_code: str, kind: str, text: str, user_ids: Optional[Iterable[int]] = None):
+        """向房间频道发布已编码的消息（user_ids 为空表示全体）"""
+
+    async def _receive(self, room_code: str, frame: str):
+        origin, kind, user_ids, text = decode_frame(frame)
+        if origin == self.worker_id or self.deliver is None:
+            return
+        self.received += 1
+        await self.deliver(room_code, kind, user_ids, text)
+
+    def metrics(self) -> dict:
+        return {
+            "backend": type(self).__name__,
+            "worker_id": self.worker_id,
+            "subscribed_rooms": len(self.rooms),
+            "published": self.published,
+            "received": self.received,
+        }
+
+
+class LocalHub:
+    """进程内的“Redis”：用于测试和基准，多个 LocalBackplane 共享同一个 hub 即模拟多个 worker"""
+
+    def __init__(self):
+        self.channels: Dict[str, Set["LocalBackplane"]] = {}
+
+    async def publish(self, room_code: str, frame: str) -> int:
+        subscribers = list(self.channels.get(room_code, ()))
+        for backplane in subscribers:
+            await backplane._receive(room_code, frame)
+        return len(subscribers)
+
+
+local_hub = LocalHub()
+
+
+class LocalBackplane(Backplane):
+    """进程内背板"""
+
+    def __init__(self, hub: LocalHub = None):
+        super().__init__()
+        self.hub = hub or local_hub
+
+    async def subscribe(self, room_code: str):
+        await super().subscribe(room_code)
+        self.hub.channels.setdefault(room_code, set()).add(self)
+
+    async def unsubscribe(self, room_code: str):
+        await super().unsubscribe(room_code)
+        subscribers = self.hub.channels.get(room_code)
+        if subscribers is not None:
+            subscribers.discard(self)
+            if not subscribers:
+                del self.hub.channels[room_code]
+
+    async def stop(self):
+        for room_code in list(self.rooms):
+            await self.unsubscribe(room_code)
+
+    async def publish(self, room_code: str, kind: str, text: str, user_ids: Optional[Iterable[int]] = None):
+        self.published += 1
+        await self.hub.publish(room_code, encode_frame(self.worker_id, kind, user_ids, text))
+
+
+class RedisBackplane(Backplane):
+    """基于 Redis pub/sub 的背板"""
+
+    def __init__(self, client=None):
+        super().__init__()
+        if client is None:
+            from app.core.redis_client import redis_client
+            client = redis_client.async_client
+        self.client = client
+        self.pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver: DeliverCallback):
+        await super().start(deliver)
+        self._task = asyncio.ensure_future(self._listen())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.pubsub.close()
+        await super().stop()
+
+    async def subscribe(self, room_code: str):
+        await super().subscribe(room_code)
+        await self.pubsub.subscribe(CHANNEL_PREFIX + room_code)
+
+    async def unsubscribe(self, room_code: str):
+        await super().unsubscribe(room_code)
+        await self.pubsub.unsubscribe(CHANNEL_PREFIX + room_code)
+
+    async def publish(self, room_code: str, kind: str, text: str, user_ids: Optional[Iterable[int]] = None):
+        self.published += 1
+        await self.client.publish(CHANNEL_PREFIX + room_code, encode_frame(self.worker_id, kind, user_ids, text))
+
+    async def _listen(self):
+        while True:
+            if not self.pubsub.subscribed:
+                await asyncio.sleep(0.05)
+                continue
+            try:
+                message = await self.pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                print(f"[WARNING] Redis 背板读取失败: {exc!r}")
+                await asyncio.sleep(1.0)
+                continue
+            if message is None or message["type"] != "message":
+                continue
+            channel, data = message["channel"], message["data"]
+            await self._receive(channel[len(CHANNEL_PREFIX):], data)
+
+
+def create_backplane(mode: str) -> Optional[Backplane]:
+    """按配置创建背板：none（单进程，不使用背板）、local、redis"""
+    if mode == "none":
+        return None
+    if mode == "local":
+        return LocalBackplane()
+    if mode == "redis":
+        return RedisBackplane()
+    raise ValueError(f"未知的 WS_BACKPLANE: {mode}")
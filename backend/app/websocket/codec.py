@@ -0,0 +1,130 @@
+"""
+WebSocket 消息编码：默认 JSON 文本帧；客户端协商子协议 werewolf.msgpack.v1 时使用 msgpack 二进制帧
+
+msgpack 消息为 [类型编码, 其余字段]，类型编码见 MESSAGE_TYPES（0 表示未登记的类型，字段中保留 type）。
+二进制帧首字节为压缩标记：0 为原始 msgpack，1 为 zlib 压缩（超过 COMPRESS_THRESHOLD 字节的大消息，如完整日志同步）。
+"""
+import json
+import zlib
+from typing import Dict, List, Optional, Union
+
+import msgpack
+
+MSGPACK_SUBPROTOCOL = "werewolf.msgpack.v1"
+
+# 消息类型编码（只能在末尾追加，不能调整顺序）
+MESSAGE_TYPES: List[str] = [
+    "connected", "player_joined", "player_left", "chat", "speech", "game_log",
+    "game_action", "get_status", "game_status", "game_started", "phase_change",
+    "game_over", "vote_tally", "action_ack", "error", "seer_result", "batch",
+]
+TYPE_CODES: Dict[str, int] = {name: code for code, name in enumerate(MESSAGE_TYPES, start=1)}
+BATCH_CODE = TYPE_CODES["batch"]
+
+COMPRESS_THRESHOLD = 1024
+MAX_FRAME_SIZE = 1 << 20  # 客户端帧解压后的上限（字节）
+_RAW = b"\x00"
+_DEFLATE = b"\x01"
+
+Payload = Union[str, bytes]
+
+
+class CodecError(ValueError):
+    """客户端帧无法解码（格式错误、帧类型与协商的编码不一致或超出大小限制）"""
+
+
+class JsonCodec:
+    """JSON 文本帧（与 WebSocket.send_json 的格式一致）"""
+    name = "json"
+    binary = False
+
+    def encode(self, message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    def decode(self, data: str) -> dict:
+        try:
+            message = json.loads(data)
+        except ValueError as exc:
+            raise CodecError(f"JSON 解析失败: {exc}") from None
+        if not isinstance(message, dict):
+            raise CodecError("消息必须是对象")
+        return message
+
+    def batch(self, parts: List[str]) -> str:
+        """拼接已编码的消息为合并帧，无需重新编码"""
+        return '{"type":"batch","messages":[' + ",".join(parts) + ']}'
+
+    def frame(self, data: str) -> str:
+        return data
+
+
+class MsgpackCodec:
+    """msgpack 二进制帧，带类型编码与大消息压缩"""
+    name = "msgpack"
+    binary = True
+
+    def __init__(self, compress_threshold: int = COMPRESS_THRESHOLD):
+        self.compress_threshold = compress_threshold
+        # 广播时同一消息会依次发给多个连接，缓存最近一次的压缩结果
+        self._last_body: Optional[bytes] = None
+        self._last_frame: Optional[bytes] = None
+
+    def encode(self, message: dict) -> bytes:
+        code = TYPE_CODES.get(message.get("type"))
+        if code is None:
+            return msgpack.packb([0, message], use_bin_type=True)
+        return msgpack.packb([code, {k: v for k, v in message.items() if k != "type"}], use_bin_type=True)
+
+    def decode(self, data: bytes) -> dict:
+        try:
+            flag, body = data[:1], data[1:]
+            if flag == _DEFLATE:
+                inflater = zlib.decompressobj()
+                body = inflater.decompress(body, MAX_FRAME_SIZE)
+                if inflater.unconsumed_tail:
+                    raise CodecError("帧解压后超出大小限制")
+            elif flag != _RAW:
+                raise CodecError("未知的帧压缩标记")
+            code, fields = msgpack.unpackb(body, raw=False, strict_map_key=False)
+            if code == BATCH_CODE:
+                return {"type": "batch", "messages": [self._unwrap(*item) for item in fields]}
+            return self._unwrap(code, fields)
+        except CodecError:
+            raise
+        except Exception as exc:
+            # zlib.error、msgpack 的各种解包异常、结构不符（非 [编码, 字段]）等
+            raise CodecError(f"msgpack 解析失败: {exc!r}") from None
+
+    def _unwrap(self, code: int, fields: dict) -> dict:
+        if not isinstance(fields, dict) or type(code) is not int or not 0 <= code <= len(MESSAGE_TYPES):
+            raise CodecError("消息必须是 [类型编码, 字段]")
+        if code == 0:
+            return fields
+        return {"type": MESSAGE_TYPES[code - 1], **fields}
+
+    def batch(self, parts: List[bytes]) -> bytes:
+        """[BATCH_CODE, [消息...]]：msgpack 数组即头部加各元素的字节拼接，无需重新编码"""
+        packer = msgpack.Packer(use_bin_type=True)
+        return (packer.pack_array_header(2) + packer.pack(BATCH_CODE)
+                + packer.pack_array_header(len(parts)) + b"".join(parts))
+
+    def frame(self, body: bytes) -> bytes:
+        if body is self._last_body:
+            return self._last_frame
+        if len(body) > self.compress_threshold:
+            frame = _DEFLATE + zlib.compress(body, 6)
+        else:
+            frame = _RAW + body
+        self._last_body, self._last_frame = body, frame
+        return frame
+
+
+JSON_CODEC = JsonCodec()
+MSGPACK_CODEC = MsgpackCodec()
+
+
+def negotiate(subprotocols: List[str]):
+    """根据客户端提供的子协议选择编码，返回 (codec, 接受的子协议)"""
+    if MSGPACK_SUBPROTOCOL in subprotocols:
+        return MSGPACK_CODEC, MSGPACK_SUBPROTOCOL
+    return JSON_CODEC, None
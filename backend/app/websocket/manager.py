@@ -1,26 +1,98 @@
 """
 WebSocket连接管理器
 """
-from typing import Dict, List, Set
+from typing import Dict, Iterable, KeysView, List, Optional, Set, Tuple
 from fastapi import WebSocket
+import asyncio
 import json
+import time
+
+from app.core.config import settings
+from app.websocket.backplane import Backplane
+from app.websocket.codec import JSON_CODEC
+from app.websocket.outbound import COALESCE_MERGERS, OutboundQueue
+from app.websocket.sync import ReplayLog, StateTracker
+
+
+def encode_message(message: dict) -> str:
+    """编码消息（与 WebSocket.send_json 的格式一致），广播时只编码一次"""
+    return JSON_CODEC.encode(message)
 
 
 class ConnectionManager:
     """WebSocket连接管理器"""
     
-    def __init__(self):
+    def __init__(self, send_timeout: float = None, queue_size: int = None, batch_tick_ms: int = None,
+                 replay_size: int = None):
         # {room_code: {websocket: user_id}}
         self.active_connections: Dict[str, Dict[WebSocket, int]] = {}
+        # 反向索引：{room_code: {user_id: {websocket: None}}}（同一用户可能多标签页连接）
+        self.room_users: Dict[str, Dict[int, Dict[WebSocket, None]]] = {}
+        # {websocket: (room_code, user_id)}
+        self.connection_index: Dict[WebSocket, Tuple[str, int]] = {}
+        # {websocket: 出站队列}，每个连接一个写任务
+        self.queues: Dict[WebSocket, OutboundQueue] = {}
+        # 单次发送超时（秒）与出站队列上限，超出的慢连接会被断开，避免拖住整个房间
+        self.send_timeout = settings.WS_SEND_TIMEOUT_SECONDS if send_timeout is None else send_timeout
+        self.queue_size = settings.WS_QUEUE_SIZE if queue_size is None else queue_size
+        self.evicted = 0
+        self.coalesced = 0  # 已关闭连接累计合并的消息数
+        # 合并帧 tick（秒），0 表示不合并；同一房间 tick 内的消息合并为一帧发给支持的客户端
+        self.batch_tick = (settings.WS_BATCH_TICK_MS if batch_tick_ms is None else batch_tick_ms) / 1000
+        self._flush_scheduled: Set[str] = set()
+        # 跨进程广播背板（None 表示单进程部署）
+        self.backplane: Optional[Backplane] = None
+        # 断线续传：房间广播补发缓冲区与状态版本，房间无连接 WS_REPLAY_TTL_SECONDS 后释放
+        self.replay = ReplayLog(settings.WS_REPLAY_BUFFER if replay_size is None else replay_size)
+        self.states = StateTracker()
+        self._sync_expiry: Dict[str, asyncio.TimerHandle] = {}
     
-    async def connect(self, websocket: WebSocket, room_code: str, user_id: int):
-        """连接WebSocket"""
-        await websocket.accept()
-        
-        if room_code not in self.active_connections:
-            self.active_connections[room_code] = {}
-        
-        self.active_connections[room_code][websocket] = user_id
+    async def start_backplane(self, backplane: Backplane):
+        """启用背板并订阅本进程已有连接的房间"""
+        self.backplane = backplane
+        await backplane.start(self._deliver_remote)
+        for room_code in self.active_connections:
+            await backplane.subscribe(room_code)
+    
+    async def stop_backplane(self):
+        if self.backplane is not None:
+            await self.backplane.stop()
+            self.backplane = None
+    
+    async def connect(self, websocket: WebSocket, room_code: str, user_id: int, batching: bool = False,
+                      codec=JSON_CODEC, subprotocol: str = None, since: int = None, epoch: str = None,
+                      greeting: dict = None) -> bool:
+        """连接WebSocket（batching 表示客户端支持合并帧，codec/subprotocol 为协商的编码与子协议）
+
+        since/epoch 为重连客户端已收到的最后一条广播，返回是否已补发全部错过的广播
+        （False 表示无法续传，调用方应发送完整状态）。greeting 为最先发给该连接的消息，
+        发送前补充 epoch、room_seq 与 resumed 字段。
+        """
+        await websocket.accept(subprotocol=subprotocol)
+        new_room = room_code not in self.active_connections
+        first_connection = self.add_connection(websocket, room_code, user_id, batching, codec)
+        # 登记连接、问候与补发之间没有 await，补发的消息一定排在新广播之前
+        missed = self.replay.since(room_code, since, epoch, user_id) if since is not None else None
+        queue = self.queues[websocket]
+        resumed = missed is not None and len(missed) <= queue.max_size // 2  # 补发量接近队列上限时完整同步更省
+        if greeting is not None:
+            greeting = {
+                **greeting,
+                "epoch": self.replay.epoch,
+                "room_seq": self.replay.last_seq.get(room_code, 0),
+                "resumed": resumed
+            }
+            queue.enqueue(queue.codec.encode(greeting), greeting)
+        if resumed:
+            for entry in missed:
+                data = entry.text if queue.codec is JSON_CODEC else queue.codec.encode(entry.message)
+                queue.enqueue(data, entry.message)
+        queue.flush()
+        if new_room and self.backplane is not None:
+            await self.backplane.subscribe(room_code)
+        if not first_connection:
+            # 同一用户的其他标签页已在房间内，不重复通知
+            return resumed
         
         # 通知房间内其他玩家
         await self.broadcast(
@@ -32,57 +104,247 @@ class ConnectionManager:
             },
             exclude={websocket}
         )
+        return resumed
     
-    def disconnect(self, websocket: WebSocket, room_code: str):
-        """断开WebSocket连接"""
-        if room_code in self.active_connections:
-            user_id = self.active_connections[room_code].pop(websocket, None)
-            
-            # 如果房间为空，删除房间
-            if not self.active_connections[room_code]:
-                del self.active_connections[room_code]
-            
-            return user_id
-        return None
+    def add_connection(self, websocket: WebSocket, room_code: str, user_id: int, batching: bool = False,
+                       codec=JSON_CODEC) -> bool:
+        """登记已建立的连接并启动其写任务，返回是否为该用户在房间内的第一个连接"""
+        if room_code not in self.active_connections:
+            self.active_connections[room_code] = {}
+            self.room_users[room_code] = {}
+        
+        self.active_connections[room_code][websocket] = user_id
+        self.connection_index[websocket] = (room_code, user_id)
+        self.replay.open(room_code)
+        expiry = self._sync_expiry.pop(room_code, None)
+        if expiry is not None:
+            expiry.cancel()
+        sockets = self.room_users[room_code].setdefault(user_id, {})
+        sockets[websocket] = None
+        
+        queue = OutboundQueue(
+            websocket, self.queue_size,
+            on_evict=lambda q, reason: self._evict(q.websocket, room_code, reason),
+            codec=codec,
+            batching=batching and self.batch_tick > 0
+        )
+        self.queues[websocket] = queue
+        queue.start()
+        return len(sockets) == 1
     
-    async def send_personal_message(self, message: dict, websocket: WebSocket):
-        """发送个人消息"""
-        await websocket.send_json(message)
+    def disconnect(self, websocket: WebSocket, room_code: str = None) -> Optional[int]:
+        """断开WebSocket连接
+
+        返回完全离开房间的用户ID；该用户在房间内仍有其他连接（多标签页）时返回 None。
+        """
+        queue = self.queues.pop(websocket, None)
+        if queue is not None:
+            queue.close()
+            self.coalesced += queue.coalesced
+        
+        location = self.connection_index.pop(websocket, None)
+        if location is None:
+            return None
+        room_code, user_id = location
+        
+        connections = self.active_connections[room_code]
+        connections.pop(websocket, None)
+        users = self.room_users[room_code]
+        sockets = users[user_id]
+        sockets.pop(websocket, None)
+        if sockets:
+            return None
+        del users[user_id]
+        
+        # 如果房间为空，删除房间
+        if not connections:
+            del self.active_connections[room_code]
+            del self.room_users[room_code]
+            if self.backplane is not None:
+                asyncio.ensure_future(self._release_room(room_code))
+            # 保留补发缓冲区一段时间，供短暂断线的客户端续传
+            self._sync_expiry[room_code] = asyncio.get_event_loop().call_later(
+                settings.WS_REPLAY_TTL_SECONDS, self._expire_sync, room_code
+            )
+        
+        return user_id
     
-    async def broadcast(self, room_code: str, message: dict, exclude: Set[WebSocket] = None):
-        """广播消息到房间内所有连接"""
+    def _expire_sync(self, room_code: str):
+        self._sync_expiry.pop(room_code, None)
         if room_code not in self.active_connections:
+            self.replay.drop(room_code)
+            self.states.drop(room_code)
+    
+    def _evict(self, websocket: WebSocket, room_code: str, reason: str):
+        """断开慢连接（出站队列溢出或发送超时）"""
+        if self.queues.get(websocket) is None:
             return
+        self.evicted += 1
+        print(f"[WARNING] 断开慢连接（{reason}）: room={room_code}")
+        user_id = self.disconnect(websocket, room_code)
+        asyncio.ensure_future(self.close(websocket))
+        if user_id is not None:
+            asyncio.ensure_future(self.broadcast(room_code, {
+                "type": "player_left",
+                "user_id": user_id,
+                "message": f"玩家 {user_id} 离开了房间"
+            }))
+    
+    def evict_stalled(self) -> int:
+        """巡检：断开发送卡住超过 send_timeout 的连接，返回断开数量"""
+        now = time.monotonic()
+        stalled = [queue for queue in self.queues.values() if queue.stalled(now, self.send_timeout)]
+        for queue in stalled:
+            queue.close()
+            queue.on_evict(queue, "send timeout")
+        return len(stalled)
+    
+    def start_watchdog(self, wheel):
+        """用调度器时间轮定期巡检慢连接"""
+        interval = max(self.send_timeout / 2, wheel.tick)
         
-        exclude = exclude or set()
-        disconnected = []
+        def watch():
+            self.evict_stalled()
+            wheel.schedule(interval, watch)
         
-        for websocket, user_id in self.active_connections[room_code].items():
-            if websocket not in exclude:
-                try:
-                    await websocket.send_json(message)
-                except:
-                    disconnected.append(websocket)
+        wheel.schedule(interval, watch)
+    
+    async def send_personal_message(self, message: dict, websocket: WebSocket):
+        """发送个人消息（与广播共用出站队列以保持顺序）"""
+        queue = self.queues.get(websocket)
+        if queue is None:
+            await websocket.send_json(message)
+            return
+        queue.enqueue(queue.codec.encode(message), message)
+        # 个人消息（如行动回执）不等待房间 tick
+        queue.flush()
+    
+    async def broadcast(self, room_code: str, message: dict, exclude: Set[WebSocket] = None):
+        """广播消息到房间内所有连接（消息只编码一次，放入各连接的出站队列后立即返回）
+
+        启用背板时，本进程的连接直接投递，其他进程经背板每个房间发布一次。
+        本进程的广播带房间内递增的 room_seq 并进入补发缓冲区；经背板发布的是未编号的消息，由各进程各自编号。
+        """
+        if self.backplane is None and not self.replay.is_open(room_code):
+            return
+        excluded = [self.connection_index[ws][1] for ws in exclude if ws in self.connection_index] if exclude else ()
+        stamped, text = self.replay.stamp(room_code, message, encode_message, excluded)
+        self._deliver_local(room_code, text, stamped, exclude=exclude)
+        if self.backplane is not None:
+            await self._publish(room_code, message, text if stamped is message else encode_message(message))
+    
+    def _deliver_local(self, room_code: str, text: str, message: Optional[dict],
+                       user_ids: Iterable[int] = None, exclude: Set[WebSocket] = None):
+        """把消息放入本进程连接的出站队列（user_ids 为空表示房间内全部连接）
+
+        text 为 JSON 编码；其他编码的连接按需编码，每种编码只编码一次。
+        """
+        if user_ids is None:
+            websockets = list(self.active_connections.get(room_code, ()))
+        else:
+            users = self.room_users.get(room_code, {})
+            websockets = [ws for user_id in user_ids for ws in users.get(user_id, ())]
+        encoded = {JSON_CODEC: text}
+        batched = False
+        for websocket in websockets:
+            if exclude and websocket in exclude:
+                continue
+            queue = self.queues.get(websocket)
+            if queue is None:
+                continue
+            data = encoded.get(queue.codec)
+            if data is None:
+                if message is None:
+                    message = json.loads(text)
+                data = encoded[queue.codec] = queue.codec.encode(message)
+            queue.enqueue(data, message)
+            batched = batched or queue.batching
         
-        # 清理断开的连接
-        for ws in disconnected:
-            self.disconnect(ws, room_code)
+        # 房间内支持合并帧的连接在 tick 结束时统一发送
+        if batched and room_code not in self._flush_scheduled:
+            self._flush_scheduled.add(room_code)
+            asyncio.get_event_loop().call_later(self.batch_tick, self._flush_room, room_code)
     
-    def get_room_users(self, room_code: str) -> List[int]:
-        """获取房间内的用户ID列表"""
-        if room_code not in self.active_connections:
-            return []
-        return list(self.active_connections[room_code].values())
+    def _flush_room(self, room_code: str):
+        self._flush_scheduled.discard(room_code)
+        for websocket in self.active_connections.get(room_code, ()):
+            queue = self.queues.get(websocket)
+            if queue is not None and queue.batching:
+                queue.flush()
     
-    def get_user_websocket(self, room_code: str, user_id: int) -> WebSocket:
-        """获取指定用户的WebSocket连接"""
+    async def _publish(self, room_code: str, message: dict, text: str, user_ids: Iterable[int] = None):
+        if self.backplane is None:
+            return
+        try:
+            await self.backplane.publish(room_code, message.get("type", ""), text, user_ids)
+        except Exception as exc:
+            print(f"[WARNING] 背板发布失败: {exc!r}")
+    
+    async def _deliver_remote(self, room_code: str, kind: str, user_ids: Optional[list], text: str):
+        """投递其他进程经背板发布的消息"""
         if room_code not in self.active_connections:
-            return None
-        
-        for websocket, uid in self.active_connections[room_code].items():
-            if uid == user_id:
-                return websocket
-        return None
+            return
+        if user_ids is None:
+            # 房间广播在本进程重新编号，进入补发缓冲区
+            message, text = self.replay.stamp(room_code, json.loads(text), encode_message)
+        else:
+            # 只有可合并的消息需要还原字典
+            message = json.loads(text) if kind in COALESCE_MERGERS else None
+        self._deliver_local(room_code, text, message, user_ids=user_ids)
+    
+    async def _release_room(self, room_code: str):
+        """本进程已无该房间的连接时取消订阅（期间重新有人加入则保留）"""
+        if room_code not in self.active_connections and self.backplane is not None:
+            await self.backplane.unsubscribe(room_code)
+    
+    async def close(self, websocket: WebSocket, code: int = 1013):
+        """关闭连接（已关闭或对端无响应时忽略）"""
+        try:
+            await asyncio.wait_for(websocket.close(code=code), self.send_timeout)
+        except Exception:
+            pass
+    
+    async def send_to_user(self, room_code: str, user_id: int, message: dict):
+        """发送私密消息给房间内的指定玩家（该玩家的所有连接）"""
+        await self.send_to_users(room_code, (user_id,), message)
+    
+    async def send_to_users(self, room_code: str, user_ids: Iterable[int], message: dict):
+        """发送消息给房间内的若干玩家（如狼人阵营），消息只编码一次"""
+        user_ids = list(user_ids)
+        text = encode_message(message)
+        self._deliver_local(room_code, text, message, user_ids=user_ids)
+        await self._publish(room_code, message, text, user_ids)
+    
+    def get_room_users(self, room_code: str) -> KeysView[int]:
+        """获取房间内的用户ID（去重后的只读视图，随连接变化实时更新）"""
+        return self.room_users.get(room_code, {}).keys()
+    
+    def is_user_connected(self, room_code: str, user_id: int) -> bool:
+        """用户是否在房间内有连接"""
+        return user_id in self.room_users.get(room_code, ())
+    
+    def get_user_websockets(self, room_code: str, user_id: int) -> KeysView[WebSocket]:
+        """获取指定用户在房间内的全部连接"""
+        return self.room_users.get(room_code, {}).get(user_id, {}).keys()
+    
+    def get_user_websocket(self, room_code: str, user_id: int) -> Optional[WebSocket]:
+        """获取指定用户的WebSocket连接（多标签页时返回最早的连接）"""
+        return next(iter(self.get_user_websockets(room_code, user_id)), None)
+    
+    def metrics(self) -> dict:
+        """连接、出站队列与背板指标"""
+        depths = [len(queue) for queue in self.queues.values()]
+        return {
+            "connections": len(self.queues),
+            "queued_messages": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "queue_size": self.queue_size,
+            "coalesced_messages": self.coalesced + sum(queue.coalesced for queue in self.queues.values()),
+            "evicted_connections": self.evicted,
+            "batch_tick_ms": self.batch_tick * 1000,
+            "backplane": self.backplane.metrics() if self.backplane is not None else None,
+            "replay": self.replay.metrics(),
+        }
 
 
 manager = ConnectionManager()
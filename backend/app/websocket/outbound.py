@@ -0,0 +1,159 @@
+"""
+每个 WebSocket 连接的出站队列：独立的写任务 + 有界队列，慢连接不会拖慢房间内其他玩家
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from app.websocket.codec import JSON_CODEC
+from app.websocket.sync import merge_status
+
+
+def _merge_vote_tally(old: dict, new: dict) -> dict:
+    """合并两条尚未发送的计票增量（新票数覆盖旧票数）"""
+    changes = dict(old["changes"])
+    changes.update(new["changes"])
+    return {**new, "changes": [[target_id, count] for target_id, count in changes.items()]}
+
+
+# 可合并的消息类型：队列中已有同类型未发送消息时，合并为一条而不是继续排队
+COALESCE_MERGERS: Dict[str, Callable[[dict, dict], dict]] = {
+    "vote_tally": _merge_vote_tally,
+    "game_status": merge_status,
+}
+
+
+class _Outgoing:
+    """排队中的一条已编码消息（可合并的消息同时保留原始字典）"""
+    __slots__ = ("data", "kind", "message")
+
+    def __init__(self, data, kind: Optional[str] = None, message: Optional[dict] = None):
+        self.data = data
+        self.kind = kind
+        self.message = message
+
+
+class OutboundQueue:
+    """单个连接的有界出站队列
+
+    enqueue 只做入队不等待网络；写任务按顺序发送。队列满或单次发送卡住超过 send_timeout
+    （由 ConnectionManager 的巡检发现）时连接被判定为慢消费者，由 on_evict 回调将其移出房间并关闭。
+
+    batching 为真时（客户端声明支持合并帧），入队不立即唤醒写任务，而是等待 flush()，
+    届时把队列中的全部消息作为一个合并帧发送。codec 为该连接协商的编码（见 app.websocket.codec）。
+    """
+
+    def __init__(self, websocket: WebSocket, max_size: int,
+                 on_evict: Callable[["OutboundQueue", str], None], codec=JSON_CODEC,
+                 batching: bool = False):
+        self.websocket = websocket
+        self.max_size = max_size
+        self.batching = batching
+        self.on_evict = on_evict
+        self.codec = codec
+        self.queue: deque = deque()
+        self.pending: Dict[str, _Outgoing] = {}  # {消息类型: 未发送的可合并消息}
+        self.closed = False
+        self.sent = 0  # 已发送的消息数
+        self.frames = 0  # 已发送的帧数（合并帧算一帧）
+        self.coalesced = 0
+        self.send_started: Optional[float] = None  # 正在进行的发送的开始时间（单调时钟）
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.queue)
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    def enqueue(self, data, message: Optional[dict] = None) -> bool:
+        """入队按本连接编码的消息，返回是否成功（失败表示连接已关闭或已被驱逐）"""
+        if self.closed:
+            return False
+
+        kind = message.get("type") if message is not None else None
+        merge = COALESCE_MERGERS.get(kind)
+        if merge is not None:
+            queued = self.pending.get(kind)
+            if queued is not None:
+                queued.message = merge(queued.message, message)
+                queued.data = self.codec.encode(queued.message)
+                self.coalesced += 1
+                return True
+
+        if len(self.queue) >= self.max_size:
+            self.close()
+            self.on_evict(self, "outbound queue overflow")
+            return False
+
+        entry = _Outgoing(data, kind, message) if merge is not None else _Outgoing(data)
+        if merge is not None:
+            self.pending[kind] = entry
+        self.queue.append(entry)
+        if not self.batching:
+            self._wakeup.set()
+        return True
+
+    def flush(self):
+        """唤醒写任务发送已排队的消息（合并模式下由房间 tick 调用）"""
+        if self.queue:
+            self._wakeup.set()
+
+    async def _run(self):
+        websocket, codec = self.websocket, self.codec
+        send = websocket.send_bytes if codec.binary else websocket.send_text
+        while not self.closed:
+            if not self.queue or (self.batching and not self._wakeup.is_set()):
+                if not self.queue:
+                    self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            if self.batching:
+                # 合并模式：一次取出全部消息，下一批等待下一次 flush
+                self._wakeup.clear()
+                entries = list(self.queue)
+                self.queue.clear()
+                self.pending.clear()
+                if len(entries) == 1:
+                    data = entries[0].data
+                else:
+                    data = codec.batch([entry.data for entry in entries])
+            else:
+                entry = self.queue.popleft()
+                if entry.kind is not None and self.pending.get(entry.kind) is entry:
+                    del self.pending[entry.kind]
+                entries, data = (entry,), entry.data
+            # 不为每次发送创建超时任务，卡住的发送由巡检根据 send_started 处理
+            self.send_started = time.monotonic()
+            try:
+                await send(codec.frame(data))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 连接已断开：由接收循环走正常的断开流程
+                self.close()
+                return
+            finally:
+                self.send_started = None
+            self.sent += len(entries)
+            self.frames += 1
+
+    def stalled(self, now: float, timeout: float) -> bool:
+        """当前发送是否已卡住超过 timeout 秒"""
+        return self.send_started is not None and now - self.send_started > timeout
+
+    def close(self):
+        """停止写任务并丢弃未发送的消息"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.clear()
+        self.pending.clear()
+        self._wakeup.set()
+        if self._task is not None and self._task is not asyncio.current_task():
+            self._task.cancel()
@@ -2,17 +2,28 @@
 WebSocket路由
 """
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.api.auth import get_current_user
+from app.websocket.codec import CodecError, negotiate
 from app.websocket.manager import manager
-from app.models.game import Game, GameStatus
-from app.models.user import User
+from app.models.game import GameStatus
+from app.services.game_engine import DEFAULT_NIGHT_ACTIONS, GameEngine, GamePhase
+from app.services.game_finalizer import game_finalizer
+from app.services.phase_driver import phase_driver, timing_wheel
+from app.services.roster import roster_cache
+from app.services.state_flusher import state_flusher
 
 router = APIRouter()
 
+# 每个房间已广播到的日志序号
+_broadcast_log_seq: dict = {}
+# 已安排实时计票推送的房间 {room_code: Timer}
+_pending_tally: dict = {}
+
 
 async def get_current_user_from_token(websocket: WebSocket):
     """从WebSocket查询参数或Header获取用户"""
@@ -24,12 +35,18 @@ async def get_current_user_from_token(websocket: WebSocket):
         return None
     
     from app.core.security import decode_access_token
+    from app.core.token_cache import token_cache
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached.claims.get("user_id")
+    
     payload = decode_access_token(token)
     
     if not payload:
         await websocket.close(code=1008, reason="无效的token")
         return None
     
+    token_cache.put(token, payload)
     return payload.get("user_id")
 
 
@@ -41,32 +58,65 @@ async def websocket_room(websocket: WebSocket, room_code: str):
     if not user_id:
         return
     
-    # 验证房间是否存在
-    db = next(get_db())
-    game = db.query(Game).filter(Game.room_code == room_code).first()
-    if not game:
+    # 验证房间是否存在（同时加载房间名单）；连接期间不持有数据库会话，每条消息使用独立的短异步会话
+    async with AsyncSessionLocal() as db:
+        roster = await roster_cache.get(room_code, db)
+        if roster is not None and roster.status == GameStatus.PLAYING and not phase_driver.is_running(room_code):
+            # 进程重启后的首个连接：从快照恢复进行中的对局并继续驱动
+            from app.api.ai_assistant import get_or_create_game_engine_async
+            await get_or_create_game_engine_async(room_code, db)
+    if roster is None:
         await websocket.close(code=1008, reason="房间不存在")
         return
     
-    # 连接
-    await manager.connect(websocket, room_code, user_id)
+    # 连接（客户端通过 batch=1 声明支持合并帧，通过子协议 werewolf.msgpack.v1 选择 msgpack 编码，
+    # 重连时通过 since/epoch 告知已收到的最后一条广播）
+    batching = websocket.query_params.get("batch") == "1"
+    codec, subprotocol = negotiate(websocket.scope.get("subprotocols", []))
+    since = _int_param(websocket.query_params.get("since"))
+    epoch = websocket.query_params.get("epoch")
+    resumed = await manager.connect(websocket, room_code, user_id, batching, codec, subprotocol, since, epoch, {
+        "type": "connected",
+        "room_code": room_code,
+        "user_id": user_id,
+        "message": "连接成功"
+    })
     
     try:
-        # 发送当前游戏状态
-        await manager.send_personal_message({
-            "type": "connected",
-            "room_code": room_code,
-            "user_id": user_id,
-            "message": "连接成功"
-        }, websocket)
+        if since is not None and not resumed:
+            # 错过的广播已不在补发缓冲区中，发送完整状态
+            async with AsyncSessionLocal() as db:
+                status = await get_room_status(room_code, db)
+            await manager.send_personal_message(status, websocket)
         
         # 保持连接，接收消息
         while True:
-            data = await websocket.receive_json()
-            await handle_room_message(room_code, user_id, data, websocket, db)
+            try:
+                data = await receive_message(websocket, codec)
+            except CodecError as exc:
+                await manager.send_personal_message({
+                    "type": "error",
+                    "message": f"无法解析的消息: {exc}"
+                }, websocket)
+                continue
+            async with AsyncSessionLocal() as db:
+                await handle_room_message(room_code, user_id, data, websocket, db)
     
     except WebSocketDisconnect:
+        pass
+    except Exception as exc:
+        print(f"[WARNING] WebSocket 消息处理异常，断开连接: room={room_code} user={user_id} {exc!r}")
+        await manager.close(websocket, code=1011)
+    finally:
+        # 无论如何退出接收循环，都要从连接管理器中移除该连接
         user_id = manager.disconnect(websocket, room_code)
+        if room_code not in manager.active_connections:
+            # 房间已无连接，保存引擎快照并释放内存
+            from app.api.ai_assistant import evict_game_engine
+            await evict_game_engine(room_code)
+            if not phase_driver.is_running(room_code):
+                roster_cache.invalidate(room_code)
+                state_flusher.forget(room_code)
         if user_id:
             await manager.broadcast(room_code, {
                 "type": "player_left",
@@ -75,6 +125,47 @@ async def websocket_room(websocket: WebSocket, room_code: str):
             })
 
 
+async def receive_message(websocket: WebSocket, codec) -> dict:
+    """接收并解码一帧（帧类型须与协商的编码一致）"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000))
+    raw = message.get("bytes") if codec.binary else message.get("text")
+    if raw is None:
+        raise CodecError("帧类型与协商的编码不一致")
+    return codec.decode(raw)
+
+
+def _int_param(value):
+    try:
+        return int(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+async def get_room_status(room_code: str, db: AsyncSession, version: int = None, epoch: str = None) -> dict:
+    """房间状态：客户端提供已知版本时只返回变化的部分（阶段、轮次、存活集合增删、最新日志序号）"""
+    from app.api.ai_assistant import get_loaded_game_engine
+    roster = await roster_cache.get(room_code, db)
+    engine = phase_driver.engines.get(room_code) or get_loaded_game_engine(room_code)
+    if engine is not None:
+        view = {
+            "current_phase": engine.current_phase.value,
+            "current_round": engine.current_round,
+            "alive": frozenset(engine.alive_players),
+            "log_seq": engine.game_log.last_seq,
+        }
+    else:
+        view = {
+            "current_phase": (roster.current_phase if roster else None) or "waiting",
+            "current_round": roster.current_round if roster else 0,
+            "alive": roster.alive_ids() if roster else frozenset(),
+            "log_seq": 0,
+        }
+    view["status"] = roster.status.value if roster else "waiting"
+    return manager.states.status(room_code, view, version, epoch)
+
+
 async def broadcast_game_log(room_code: str, log_message: str, phase: str = None, round_num: int = None):
     """广播游戏日志到房间所有玩家"""
     await manager.broadcast(room_code, {
@@ -86,7 +177,161 @@ async def broadcast_game_log(room_code: str, log_message: str, phase: str = None
     })
 
 
-async def handle_room_message(room_code: str, user_id: int, data: dict, websocket: WebSocket, db: Session):
+async def broadcast_new_logs(room_code: str, engine: GameEngine):
+    """广播上次广播以来新产生的游戏日志（带 seq，每条日志只广播一次）"""
+    logs = engine.get_logs_since(_broadcast_log_seq.get(room_code, 0))
+    if not logs:
+        return
+    # 先推进序号再发送：发送期间的其他调用不会重复广播同一批日志
+    _broadcast_log_seq[room_code] = logs[-1]["seq"]
+    for log in logs:
+        await manager.broadcast(room_code, log)
+
+
+async def broadcast_phase_transition(room_code: str, engine: GameEngine, event: str, result):
+    """阶段驱动器回调：广播新产生的游戏日志和阶段变化"""
+    await broadcast_new_logs(room_code, engine)
+    
+    if event == "voting_resolved":
+        timing_wheel.cancel(_pending_tally.pop(room_code, None))
+    
+    if event == "night_resolved" and result["killed"]:
+        roster_cache.mark_dead(room_code, result["killed"])
+    elif event == "voting_resolved" and result is not None:
+        roster_cache.mark_dead(room_code, (result,))
+    roster_cache.set_phase(room_code, engine.current_round, engine.current_phase.value)
+    # 轮次、阶段与死亡玩家由后台批量写回数据库
+    state_flusher.mark(room_code, engine)
+    
+    if event == "game_over":
+        _broadcast_log_seq.pop(room_code, None)
+        roster_cache.set_status(room_code, GameStatus.FINISHED)
+        # 对局记录与玩家战绩由结算队列分批写入
+        game_finalizer.submit(room_code, engine)
+        await manager.broadcast(room_code, {
+            "type": "game_over",
+            "winner": result
+        })
+        return
+    
+    message = {
+        "type": "phase_change",
+        "event": event,
+        "phase": engine.current_phase.value,
+        "round": engine.current_round
+    }
+    if event == "night_resolved":
+        message["killed"] = result["killed"]
+        if result["seer_result"]:
+            # 查验结果只发给引擎结算时的预言家（其他玩家提交的 check 不会产生查验结果）
+            await manager.send_to_user(room_code, result["seer_id"], {
+                "type": "seer_result",
+                "round": engine.current_round,
+                **result["seer_result"]
+            })
+    elif event == "voting_resolved":
+        message["eliminated"] = result
+    await manager.broadcast(room_code, message)
+
+
+phase_driver.on_transition = broadcast_phase_transition
+
+
+async def flush_vote_tally(room_code: str):
+    """推送上次推送以来票数有变化的目标（节流后合并多次投票）"""
+    _pending_tally.pop(room_code, None)
+    engine = phase_driver.engines.get(room_code)
+    if engine is None or engine.current_phase != GamePhase.DAY:
+        return
+    changes = engine.tally.drain_changes()
+    if not changes:
+        return
+    await manager.broadcast(room_code, {
+        "type": "vote_tally",
+        "round": engine.current_round,
+        "changes": [[target_id, count] for target_id, count in changes.items()],
+        "leaders": engine.tally.leaders(),
+        "max_votes": engine.tally.max_votes,
+        "voted": len(engine.tally)
+    })
+
+
+def schedule_vote_tally(room_code: str):
+    """每个房间在一个推送间隔内最多推送一次计票"""
+    if room_code not in _pending_tally:
+        _pending_tally[room_code] = timing_wheel.schedule(
+            settings.VOTE_TALLY_INTERVAL_MS / 1000, flush_vote_tally, room_code
+        )
+
+
+async def handle_game_action(room_code: str, user_id: int, data: dict, websocket: WebSocket,
+                             db: AsyncSession) -> bool:
+    """把夜晚行动和投票记录到正在进行的游戏中，返回是否已处理"""
+    action = data.get("action")
+    if action not in ("night_action", "vote"):
+        return False
+    engine = phase_driver.engines.get(room_code)
+    if engine is None:
+        # 进程重启后尚未恢复的对局：从快照恢复（进行中时交回阶段驱动器）
+        from app.api.ai_assistant import get_or_create_game_engine_async
+        await get_or_create_game_engine_async(room_code, db)
+        engine = phase_driver.engines.get(room_code)
+    if engine is None:
+        # 游戏未开始，或由其他 worker 驱动（多 worker 部署时须按房间粘性路由到开始游戏的进程）：
+        # 明确拒绝，不当作普通消息广播
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "游戏未在本服务进程中进行，无法执行该行动"
+        }, websocket)
+        return True
+    
+    payload = data.get("data") or {}
+    if not isinstance(payload, dict):
+        payload = {}
+    # 行动类型与目标由引擎校验：行动类型须属于玩家角色，目标须为存活玩家的整数ID
+    if action == "night_action":
+        role = engine.get_player_role(user_id)
+        action_type = payload.get("action_type") or DEFAULT_NIGHT_ACTIONS.get(role)
+        # 只保留引擎使用的字段，客户端的其他内容不进入快照
+        action_data = {"use_antidote": True} if payload.get("use_antidote") is True else {}
+        success = (
+            engine.current_phase == GamePhase.NIGHT
+            and action_type is not None
+            and engine.record_night_action(user_id, action_type, payload.get("target_id"), action_data)
+        )
+    else:
+        success = (
+            engine.current_phase == GamePhase.DAY
+            and engine.record_vote(user_id, payload.get("target_id", -1))
+        )
+    
+    if not success:
+        await manager.send_personal_message({
+            "type": "error",
+            "message": "当前无法执行该行动"
+        }, websocket)
+        return True
+    
+    await manager.send_personal_message({
+        "type": "action_ack",
+        "action": action
+    }, websocket)
+    
+    # 投票公开，夜晚行动不广播
+    if action == "vote":
+        await manager.broadcast(room_code, {
+            "type": "game_action",
+            "user_id": user_id,
+            "action": action,
+            "data": {"target_id": payload.get("target_id", -1)}
+        }, exclude={websocket})
+        schedule_vote_tally(room_code)
+    
+    await phase_driver.notify_action(room_code)
+    return True
+
+
+async def handle_room_message(room_code: str, user_id: int, data: dict, websocket: WebSocket, db: AsyncSession):
     """处理房间消息"""
     message_type = data.get("type")
     
@@ -100,16 +345,14 @@ async def handle_room_message(room_code: str, user_id: int, data: dict, websocke
         }, exclude={websocket})
     
     elif message_type == "speech":
-        # 游戏中的发言（记录到游戏日志）
-        from app.models.user import User
-        from app.models.game import GamePlayer
+        # 游戏中的发言（记录到游戏日志；校验与玩家名称均来自房间名单缓存，不访问数据库）
         from app.api.speech_handler import handle_player_speech
         
         speech_content = data.get("content", "")
         
         # 验证游戏状态
-        game = db.query(Game).filter(Game.room_code == room_code).first()
-        if not game or game.status != GameStatus.PLAYING:
+        roster = await roster_cache.get(room_code, db)
+        if not roster or roster.status != GameStatus.PLAYING:
             await manager.send_personal_message({
                 "type": "error",
                 "message": "游戏未开始，无法发言"
@@ -117,11 +360,7 @@ async def handle_room_message(room_code: str, user_id: int, data: dict, websocke
             return
         
         # 验证玩家状态
-        player = db.query(GamePlayer).filter(
-            GamePlayer.game_id == game.id,
-            GamePlayer.user_id == user_id
-        ).first()
-        
+        player = roster.get(user_id)
         if not player or not player.is_alive:
             await manager.send_personal_message({
                 "type": "error",
@@ -129,23 +368,12 @@ async def handle_room_message(room_code: str, user_id: int, data: dict, websocke
             }, websocket)
             return
         
-        # 获取玩家名称
-        user = db.query(User).filter(User.id == user_id).first()
-        player_name = user.nickname if user and user.nickname else (user.username if user else f"玩家{user_id}")
-        
         # 记录发言到游戏引擎
-        success = handle_player_speech(room_code, user_id, speech_content, db)
+        engine = await handle_player_speech(room_code, user_id, speech_content, db)
         
-        if success:
-            # 广播发言消息到所有玩家
-            await manager.broadcast(room_code, {
-                "type": "game_log",
-                "message": f"💬 {player_name}: {speech_content}",
-                "phase": "day",
-                "round": game.current_round or 1,
-                "player_id": user_id,
-                "player_name": player_name
-            })
+        if engine is not None:
+            # 广播游戏日志中的发言事件（与阶段转换时的日志共用序号，不会重复广播）
+            await broadcast_new_logs(room_code, engine)
         else:
             await manager.send_personal_message({
                 "type": "error",
@@ -154,6 +382,9 @@ async def handle_room_message(room_code: str, user_id: int, data: dict, websocke
     
     elif message_type == "game_action":
         # 游戏行动（夜晚行动、投票等）
+        if await handle_game_action(room_code, user_id, data, websocket, db):
+            return
+        
         await manager.broadcast(room_code, {
             "type": "game_action",
             "user_id": user_id,
@@ -162,13 +393,9 @@ async def handle_room_message(room_code: str, user_id: int, data: dict, websocke
         }, exclude={websocket})
     
     elif message_type == "get_status":
-        # 获取游戏状态
-        game = db.query(Game).filter(Game.room_code == room_code).first()
-        if game:
-            await manager.send_personal_message({
-                "type": "game_status",
-                "status": game.status.value,
-                "current_round": game.current_round,
-                "current_phase": game.current_phase or "waiting"
-            }, websocket)
+        # 获取游戏状态（携带 version/epoch 时只返回增量）
+        await manager.send_personal_message(
+            await get_room_status(room_code, db, _int_param(data.get("version")), data.get("epoch")),
+            websocket
+        )
 
@@ -0,0 +1,199 @@
+"""
+断线续传与增量状态同步
+
+- ReplayLog：房间广播按房间编号（消息字段 room_seq，不同于游戏日志自身的 seq）并保留最近的若干条，
+  客户端带 ?since=<room_seq>&epoch=<epoch> 重连时只补发错过的消息；
+  缓冲区不足以覆盖时返回 None，由调用方改发完整状态。
+- StateTracker：房间状态（阶段、轮次、存活集合、日志序号）按版本号记录变化，
+  get_status 携带已知版本时只返回增量。
+
+编号与版本只在本进程内有效，epoch 区分进程（重启或重连到其他 worker 时 epoch 不同，回退为完整同步）。
+私密消息（如查验结果）不进入补发缓冲区。
+"""
+import uuid
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+EPOCH = uuid.uuid4().hex[:8]
+
+# 状态字段中按值比较的标量字段
+STATUS_FIELDS = ("status", "current_phase", "current_round", "log_seq")
+
+_NO_USERS: FrozenSet[int] = frozenset()
+
+
+class _ReplayEntry:
+    """一条已编号的房间广播"""
+    __slots__ = ("seq", "message", "text", "excluded")
+
+    def __init__(self, seq: int, message: dict, text: str, excluded: FrozenSet[int]):
+        self.seq = seq
+        self.message = message
+        self.text = text
+        self.excluded = excluded  # 广播时被排除的用户（如聊天发送者），补发时同样跳过
+
+
+class ReplayLog:
+    """每个房间最近 capacity 条广播的环形缓冲区"""
+
+    def __init__(self, capacity: int, epoch: str = EPOCH):
+        self.capacity = capacity
+        self.epoch = epoch
+        self.rooms: Dict[str, Deque[_ReplayEntry]] = {}
+        self.last_seq: Dict[str, int] = {}
+        self.replayed = 0
+        self.resyncs = 0
+
+    def open(self, room_code: str):
+        """开始为房间记录广播（已存在时保留原有记录）"""
+        if room_code not in self.rooms:
+            self.rooms[room_code] = deque(maxlen=self.capacity)
+            self.last_seq.setdefault(room_code, 0)
+
+    def drop(self, room_code: str):
+        self.rooms.pop(room_code, None)
+        self.last_seq.pop(room_code, None)
+
+    def is_open(self, room_code: str) -> bool:
+        return room_code in self.rooms
+
+    def stamp(self, room_code: str, message: dict, encode, excluded: Iterable[int] = ()) -> Tuple[dict, str]:
+        """为广播编号并记录，返回 (带 room_seq 的消息, 编码结果)；房间未开启记录时原样编码"""
+        entries = self.rooms.get(room_code)
+        if entries is None:
+            return message, encode(message)
+        seq = self.last_seq[room_code] + 1
+        self.last_seq[room_code] = seq
+        message = {**message, "room_seq": seq}
+        text = encode(message)
+        entries.append(_ReplayEntry(seq, message, text, frozenset(excluded) if excluded else _NO_USERS))
+        return message, text
+
+    def since(self, room_code: str, seq: int, epoch: Optional[str], user_id: int) -> Optional[List[_ReplayEntry]]:
+        """客户端已收到 seq 及之前的广播时需要补发的记录；无法补齐时返回 None"""
+        entries = self.rooms.get(room_code)
+        last = self.last_seq.get(room_code, 0)
+        if entries is None or (epoch is not None and epoch != self.epoch) or seq > last:
+            self.resyncs += 1
+            return None
+        if seq == last:
+            return []
+        first = entries[0].seq if entries else last + 1
+        if seq + 1 < first:
+            self.resyncs += 1
+            return None
+        missed = [entry for entry in entries if entry.seq > seq and user_id not in entry.excluded]
+        self.replayed += len(missed)
+        return missed
+
+    def metrics(self) -> dict:
+        return {
+            "epoch": self.epoch,
+            "rooms": len(self.rooms),
+            "buffered_messages": sum(len(entries) for entries in self.rooms.values()),
+            "replayed_messages": self.replayed,
+            "resyncs": self.resyncs,
+        }
+
+
+def merge_deltas(deltas: Iterable[dict]) -> dict:
+    """合并连续的状态增量：标量取最新值，存活集合的增删相互抵消"""
+    merged: dict = {}
+    added: Dict[int, None] = {}
+    removed: Dict[int, None] = {}
+    for delta in deltas:
+        for key in STATUS_FIELDS:
+            if key in delta:
+                merged[key] = delta[key]
+        for player_id in delta.get("alive_added", ()):
+            if removed.pop(player_id, 0) is None:
+                continue
+            added[player_id] = None
+        for player_id in delta.get("alive_removed", ()):
+            if added.pop(player_id, 0) is None:
+                continue
+            removed[player_id] = None
+    if added:
+        merged["alive_added"] = sorted(added)
+    if removed:
+        merged["alive_removed"] = sorted(removed)
+    return merged
+
+
+class _RoomState:
+    __slots__ = ("version", "view", "history")
+
+    def __init__(self, history: int):
+        self.version = 0
+        self.view: Optional[dict] = None
+        self.history: Deque[Tuple[int, dict]] = deque(maxlen=history)  # [(版本, 相对上一版本的增量)]
+
+
+class StateTracker:
+    """房间状态版本：每次观察到状态变化时版本加一并记录增量"""
+
+    def __init__(self, history: int = 64, epoch: str = EPOCH):
+        self.history = history
+        self.epoch = epoch
+        self.rooms: Dict[str, _RoomState] = {}
+
+    def drop(self, room_code: str):
+        self.rooms.pop(room_code, None)
+
+    def update(self, room_code: str, view: dict) -> int:
+        """记录房间当前状态（status、current_phase、current_round、log_seq 与 alive 集合），返回版本号"""
+        state = self.rooms.get(room_code)
+        if state is None:
+            state = self.rooms[room_code] = _RoomState(self.history)
+        old = state.view
+        if old is None:
+            delta = {key: view[key] for key in STATUS_FIELDS}
+            delta["alive_added"] = sorted(view["alive"])
+        else:
+            delta = {key: view[key] for key in STATUS_FIELDS if view[key] != old[key]}
+            if view["alive"] != old["alive"]:
+                added = view["alive"] - old["alive"]
+                removed = old["alive"] - view["alive"]
+                if added:
+                    delta["alive_added"] = sorted(added)
+                if removed:
+                    delta["alive_removed"] = sorted(removed)
+            if not delta:
+                return state.version
+        state.version += 1
+        state.view = view
+        state.history.append((state.version, delta))
+        return state.version
+
+    def status(self, room_code: str, view: dict, version: Optional[int] = None,
+               epoch: Optional[str] = None) -> dict:
+        """game_status 消息：客户端已知版本仍在历史范围内时只返回增量，否则返回完整状态"""
+        current = self.update(room_code, view)
+        message = {"type": "game_status", "epoch": self.epoch, "version": current}
+        history = self.rooms[room_code].history
+        if version is not None and epoch == self.epoch and history and history[0][0] - 1 <= version <= current:
+            message["since"] = version
+            message.update(merge_deltas(delta for v, delta in history if v > version))
+            return message
+        message["full"] = True
+        message.update({key: view[key] for key in STATUS_FIELDS})
+        message["alive_players"] = sorted(view["alive"])
+        return message
+
+
+def merge_status(old: dict, new: dict) -> dict:
+    """合并同一连接尚未发送的两条 game_status（出站队列合并用）"""
+    if new.get("full") or new.get("epoch") != old.get("epoch"):
+        return new
+    if old.get("full"):
+        if new.get("since") != old.get("version"):
+            return new
+        merged = {**old, **{key: new[key] for key in STATUS_FIELDS if key in new}, "version": new["version"]}
+        alive = set(old["alive_players"]) | set(new.get("alive_added", ()))
+        merged["alive_players"] = sorted(alive - set(new.get("alive_removed", ())))
+        return merged
+    if new.get("since") != old.get("version"):
+        # 新增量基于更早或相同的版本，已覆盖旧增量
+        return new
+    merged = merge_deltas((old, new))
+    return {"type": "game_status", "epoch": new["epoch"], "version": new["version"], "since": old["since"], **merged}
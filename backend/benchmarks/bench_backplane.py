@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""跨 worker 广播基准：经背板发布后，所有 worker 上的连接收到消息的延迟
+
+用法: python benchmarks/bench_backplane.py --workers 4 --players 12 --rooms 100
+      python benchmarks/bench_backplane.py --backend redis   # 需要可连接的 Redis（见 app/core/config.py）
+同一进程内用多个 ConnectionManager 模拟多个 worker，玩家轮流分布在各 worker 上。
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.websocket.backplane import LocalBackplane, LocalHub, RedisBackplane
+from app.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """记录最近一次收到消息的时间"""
+
+    def __init__(self):
+        self.received = 0
+        self.last_at = 0.0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        self.received += 1
+        self.last_at = time.perf_counter()
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def make_backplane(backend: str, hub: LocalHub):
+    if backend == "local":
+        return LocalBackplane(hub)
+    return RedisBackplane()
+
+
+async def run(args):
+    hub = LocalHub()
+    workers = [ConnectionManager() for _ in range(args.workers)]
+    for worker in workers:
+        await worker.start_backplane(make_backplane(args.backend, hub))
+
+    rooms = {}
+    for room in range(args.rooms):
+        room_code = f"BENCH{room}"
+        sockets = []
+        for player in range(args.players):
+            websocket = FakeWebSocket()
+            worker = workers[player % args.workers]
+            worker.add_connection(websocket, room_code, player + 1)
+            if len(worker.active_connections[room_code]) == 1:
+                await worker.backplane.subscribe(room_code)
+            sockets.append(websocket)
+        rooms[room_code] = sockets
+    await asyncio.sleep(0.2)  # 等待订阅生效
+
+    message = {"type": "game_log", "round": 1, "phase": "night", "message": "💀 夜晚结束，1 名玩家死亡"}
+    latencies = []
+    started_all = time.perf_counter()
+    for _ in range(args.repeat):
+        for room_code, sockets in rooms.items():
+            expected = [websocket.received + 1 for websocket in sockets]
+            started = time.perf_counter()
+            await workers[0].broadcast(room_code, message)
+            while any(websocket.received < count for websocket, count in zip(sockets, expected)):
+                await asyncio.sleep(0)
+            latencies.append((max(websocket.last_at for websocket in sockets) - started) * 1e6)
+    elapsed = time.perf_counter() - started_all
+
+    latencies.sort()
+    print(f"背板: {args.backend}  worker: {args.workers}  房间: {args.rooms}  每房间玩家: {args.players}")
+    print(f"广播次数: {len(latencies)}  吞吐: {len(latencies) / elapsed:.0f} 次/秒")
+    print(f"全房间送达延迟(us): 中位数 {statistics.median(latencies):.1f}  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:.1f}  最大 {latencies[-1]:.1f}")
+    print(f"每次广播发布: {workers[0].backplane.published // len(latencies)} 条")
+
+    for worker in workers:
+        for websocket in list(worker.queues):
+            worker.disconnect(websocket)
+        await worker.stop_backplane()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="跨 worker 广播基准")
+    parser.add_argument("--backend", choices=["local", "redis"], default="local")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--rooms", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""批量引擎基准：BatchGameEngine 与逐局 GameEngine 的吞吐对比，以及同一种子下的结果一致性检查
+
+用法: python benchmarks/bench_batch_engine.py --games 20000 --players 12 --mode both
+speed 模式用随机策略各跑 --games 局，输出局/秒（两者的随机策略使用不同的随机源，胜率只应大致相近）。
+parity 模式按同一批种子分配角色，把批量引擎随机策略生成的行动与投票矩阵逐局喂给对应的 GameEngine，
+每一步断言角色、死亡玩家、预言家查验、投票出局、胜负与轮数完全一致，不一致时退出码为 1。
+"""
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from app.services.batch_engine import (
+    ACTION_NONE, ACTION_SAVE, ACTION_TYPES, ROLE_CODES, WINNER_NAMES, WINNER_NONE, BatchGameEngine,
+    random_night_actions, random_votes, simulate_batch,
+)
+from app.services.game_engine import GameEngine
+from app.services.simulator import run_chunk
+
+ACTION_NAMES = {code: name for name, code in ACTION_TYPES.items()}
+
+
+class ParityError(AssertionError):
+    """批量引擎与 GameEngine 的结果不一致"""
+
+
+def expect(condition: bool, seed: int, round_num: int, what: str, batch_value, engine_value):
+    if not condition:
+        raise ParityError(f"seed={seed} round={round_num} {what}: batch={batch_value} engine={engine_value}")
+
+
+def apply_night(engine: GameEngine, action_types: np.ndarray, targets: np.ndarray) -> dict:
+    """把一局的行动矩阵行转换为 GameEngine 行动并结算"""
+    for column, code in enumerate(action_types.tolist()):
+        if code == ACTION_NONE:
+            continue
+        target_id = int(targets[column]) or None
+        data = {"use_antidote": True} if code == ACTION_SAVE else None
+        engine.record_night_action(column + 1, ACTION_NAMES[code], target_id, data)
+    return engine.process_night_actions()
+
+
+def apply_votes(engine: GameEngine, votes: np.ndarray):
+    """0 表示未投票，-1 表示弃权"""
+    engine.start_day()
+    for column, target_id in enumerate(votes.tolist()):
+        if target_id != 0:
+            engine.record_vote(column + 1, target_id)
+    return engine.process_voting()
+
+
+def check_parity(seeds: list, player_count: int, max_rounds: int) -> int:
+    """按步调一致推进批量引擎与逐局引擎并逐步比较，返回比较过的轮数"""
+    batch = BatchGameEngine(len(seeds), player_count)
+    batch.assign_roles(seeds)
+    engines = []
+    for game, seed in enumerate(seeds):
+        engine = GameEngine(seed, player_count, rng=random.Random(seed), journaling=False)
+        engine.assign_roles(list(range(1, player_count + 1)))
+        roles = [ROLE_CODES[engine.roles[pid]] for pid in range(1, player_count + 1)]
+        expect(roles == batch.roles[game].tolist(), seed, 0, "roles", batch.roles[game].tolist(), roles)
+        engines.append(engine)
+
+    rng = np.random.default_rng(seeds[0] if seeds else 0)
+    winners = np.zeros(len(seeds), dtype=np.int8)
+    compared = 0
+    while batch.current_round < max_rounds:
+        running = winners == WINNER_NONE
+        if not running.any():
+            break
+        batch.start_night()
+
+        action_types, targets = random_night_actions(batch, rng)
+        action_types[~running] = ACTION_NONE
+        night = batch.process_night_actions(action_types, targets)
+        night_winners = np.where(running, batch.check_winner(), winners)
+
+        voting = night_winners == WINNER_NONE
+        votes = random_votes(batch, rng)
+        votes[~voting] = 0
+        eliminated = batch.process_voting(votes)
+        winners = np.where(voting, batch.check_winner(), night_winners)
+
+        for game in np.nonzero(running)[0].tolist():
+            engine, seed, round_num = engines[game], seeds[game], batch.current_round
+            engine.start_night()
+            result = apply_night(engine, action_types[game], targets[game])
+            killed = (np.nonzero(night["killed"][game])[0] + 1).tolist()
+            expect(killed == sorted(set(result["killed"])), seed, round_num, "night killed",
+                   killed, result["killed"])
+            seer_target = int(night["seer_target"][game])
+            seer_result = result["seer_result"]
+            expect(seer_target == (seer_result["target_id"] if seer_result else 0), seed, round_num,
+                   "seer target", seer_target, seer_result)
+            if seer_result:
+                expect(bool(night["seer_is_werewolf"][game]) == seer_result["is_werewolf"], seed, round_num,
+                       "seer result", night["seer_is_werewolf"][game], seer_result)
+            expect(bool(night["saved"][game]) == result["saved"], seed, round_num, "saved",
+                   night["saved"][game], result["saved"])
+
+            winner = engine.check_winner()
+            if winner is None:
+                out = apply_votes(engine, votes[game])
+                expect(int(eliminated[game]) == (out or 0), seed, round_num, "eliminated", eliminated[game], out)
+                winner = engine.check_winner()
+            expect(WINNER_NAMES[int(winners[game])] == winner, seed, round_num, "winner",
+                   WINNER_NAMES[int(winners[game])], winner)
+            alive = (np.nonzero(batch.alive[game])[0] + 1).tolist()
+            expect(alive == sorted(engine.alive_players), seed, round_num, "alive", alive, sorted(engine.alive_players))
+            compared += 1
+    return compared
+
+
+def measure_speed(args):
+    seeds = list(range(args.seed, args.seed + args.games))
+    started = time.perf_counter()
+    result = simulate_batch(seeds, args.players, args.max_rounds)
+    batch_elapsed = time.perf_counter() - started
+    objects = run_chunk(args.seed, args.games, args.players, "random", args.max_rounds)
+
+    print(f"{'engine':<8}{'seconds':>10}{'games/s':>12}{'werewolves':>12}{'villagers':>11}{'draw':>6}")
+    for name, wins, elapsed in (("object", objects["wins"], objects["elapsed"]),
+                                ("batch", result["wins"], batch_elapsed)):
+        print(f"{name:<8}{elapsed:>10.2f}{args.games / elapsed:>12.0f}"
+              f"{wins['werewolves']:>12}{wins['villagers']:>11}{wins['draw']:>6}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--max-rounds", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mode", choices=["speed", "parity", "both"], default="both")
+    args = parser.parse_args()
+
+    print(f"games={args.games} players={args.players} seed={args.seed}")
+    if args.mode in ("speed", "both"):
+        measure_speed(args)
+    if args.mode in ("parity", "both"):
+        started = time.perf_counter()
+        try:
+            compared = check_parity(list(range(args.seed, args.seed + args.games)), args.players, args.max_rounds)
+        except ParityError as exc:
+            print(f"parity FAILED: {exc}")
+            sys.exit(1)
+        print(f"parity OK: {args.games} games, {compared} rounds compared in {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""合并帧基准：大量房间同时结算夜晚时，逐条发送与按 tick 合并发送的帧数与耗时
+
+用法: python benchmarks/bench_batching.py --rooms 2000 --players 12 --burst 5 --tick-ms 15
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """统计收到的帧数；每帧模拟一次固定的系统调用开销"""
+
+    def __init__(self, frame_cost: float):
+        self.frame_cost = frame_cost
+        self.frames = 0
+        self.bytes = 0
+
+    async def send_text(self, text: str):
+        deadline = time.perf_counter() + self.frame_cost
+        while time.perf_counter() < deadline:
+            pass
+        self.frames += 1
+        self.bytes += len(text)
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def burst_messages(room: int, burst: int) -> list:
+    """一次夜晚结算产生的消息：若干条日志 + 阶段变化"""
+    messages = [
+        {"type": "game_log", "round": 2, "phase": "night", "message": f"💀 夜晚结束，1 名玩家死亡 #{i}", "seq": i}
+        for i in range(burst - 1)
+    ]
+    messages.append({"type": "phase_change", "event": "night_resolved", "phase": "night", "round": 2, "killed": [room]})
+    return messages
+
+
+async def measure(args, batching: bool):
+    manager = ConnectionManager(batch_tick_ms=args.tick_ms)
+    sockets = []
+    for room in range(args.rooms):
+        for player in range(args.players):
+            websocket = FakeWebSocket(args.frame_cost_us / 1e6)
+            manager.add_connection(websocket, f"ROOM{room}", player + 1, batching=batching)
+            sockets.append(websocket)
+
+    started = time.perf_counter()
+    for room in range(args.rooms):
+        for message in burst_messages(room, args.burst):
+            await manager.broadcast(f"ROOM{room}", message)
+    expected = args.rooms * args.players * args.burst
+    while sum(queue.sent for queue in manager.queues.values()) < expected:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - started
+
+    frames = sum(websocket.frames for websocket in sockets)
+    total_bytes = sum(websocket.bytes for websocket in sockets)
+    for websocket in sockets:
+        manager.disconnect(websocket)
+    return frames, total_bytes, elapsed
+
+
+async def run(args):
+    print(f"房间: {args.rooms}  每房间玩家: {args.players}  每次结算消息: {args.burst}  tick: {args.tick_ms}ms")
+    print(f"{'模式':>6} {'帧数':>10} {'字节':>12} {'全部送达(ms)':>14}")
+    for label, batching in (("逐条", False), ("合并", True)):
+        frames, total_bytes, elapsed = await measure(args, batching)
+        print(f"{label:>6} {frames:>10} {total_bytes:>12} {elapsed * 1000:>14.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="合并帧基准")
+    parser.add_argument("--rooms", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--burst", type=int, default=5)
+    parser.add_argument("--tick-ms", type=int, default=15)
+    parser.add_argument("--frame-cost-us", type=float, default=5.0, help="模拟每帧的发送开销（微秒）")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
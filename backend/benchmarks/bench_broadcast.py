@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""房间广播基准：广播延迟与房间人数、慢连接数量的关系
+
+用法: python benchmarks/bench_broadcast.py --sizes 10 100 1000 --slow 0 1 5
+对比逐个 await send_json 的旧实现（sequential）与编码一次、写入各连接出站队列的 ConnectionManager
+（统计正常连接收到全部消息的平均每条耗时）。
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.websocket.manager import ConnectionManager
+
+
+class FakeWebSocket:
+    """模拟 WebSocket：慢连接每次发送耗时 delay 秒"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.sent = 0
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.sent += 1
+
+    async def send_json(self, data: dict):
+        await self.send_text(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+MESSAGE = {
+    "type": "game_log",
+    "round": 3,
+    "phase": "day",
+    "message": "🗳️ 投票结束，玩家 12 被投票出局（7 票）",
+    "timestamp": "2024-01-01T12:00:00",
+    "seq": 128,
+}
+
+
+def build_room(size: int, slow: int, delay: float) -> dict:
+    return {FakeWebSocket(delay if i < slow else 0.0): i for i in range(size)}
+
+
+async def sequential_broadcast(connections: dict, message: dict):
+    """旧实现：逐个连接 send_json"""
+    for websocket in connections:
+        await websocket.send_json(message)
+
+
+async def measure(size: int, slow: int, delay: float, timeout: float, queue_size: int, repeat: int):
+    connections = build_room(size, slow, delay)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await sequential_broadcast(connections, MESSAGE)
+    sequential_ms = (time.perf_counter() - started) / repeat * 1000
+
+    # 出站队列：broadcast 只入队，统计所有正常连接收到全部消息的耗时
+    manager = ConnectionManager(send_timeout=timeout, queue_size=queue_size)
+    connections = build_room(size, slow, delay)
+    for websocket, user_id in connections.items():
+        manager.add_connection(websocket, "BENCH", user_id)
+    fast = [websocket for websocket in connections if not websocket.delay]
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await manager.broadcast("BENCH", MESSAGE)
+        await asyncio.sleep(0)  # 让写任务运行（模拟消息陆续到达）
+    while any(websocket.sent < repeat and websocket in manager.queues for websocket in fast):
+        await asyncio.sleep(0)
+    queued_ms = (time.perf_counter() - started) / repeat * 1000
+    evicted = manager.metrics()["evicted_connections"]
+    for websocket in list(connections):
+        manager.disconnect(websocket, "BENCH")
+    return sequential_ms, queued_ms, evicted
+
+
+async def run(args):
+    print(f"{'人数':>6} {'慢连接':>6} {'逐个发送(ms)':>14} {'出站队列(ms)':>14} {'断开慢连接':>10}")
+    for size in args.sizes:
+        for slow in args.slow:
+            if slow > size:
+                continue
+            sequential_ms, queued_ms, evicted = await measure(size, slow, args.delay, args.timeout,
+                                                              args.queue_size, args.repeat)
+            print(f"{size:>6} {slow:>6} {sequential_ms:>14.2f} {queued_ms:>14.2f} {evicted:>10}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="房间广播基准")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--slow", type=int, nargs="+", default=[0, 1, 5])
+    parser.add_argument("--delay", type=float, default=0.05, help="慢连接单次发送耗时（秒）")
+    parser.add_argument("--timeout", type=float, default=0.02, help="单次发送超时（秒）")
+    parser.add_argument("--queue-size", type=int, default=8, help="单个连接出站队列上限")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
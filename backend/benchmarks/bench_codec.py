@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""WebSocket 编码基准：JSON 与 msgpack（werewolf.msgpack.v1）每局字节数与每条消息的编解码耗时
+
+用法: python benchmarks/bench_codec.py --players 12 --games 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.game_engine import GameEngine
+from app.services.simulator import RandomPolicy
+from app.websocket.codec import JSON_CODEC, MSGPACK_CODEC
+
+
+def game_messages(seed: int, players: int) -> list:
+    """按服务端推送顺序构造一局游戏中单个玩家收到的消息"""
+    rng = random.Random(seed)
+    policy = RandomPolicy()
+    engine = GameEngine(seed, players, rng=rng, journaling=False)
+    engine.assign_roles(list(range(1, players + 1)))
+    messages = [{"type": "game_started", "room_code": "ABC123"}]
+    last_seq = 0
+
+    def flush_logs():
+        nonlocal last_seq
+        logs = engine.get_logs_since(last_seq)
+        last_seq = engine.game_log.last_seq
+        messages.extend(logs)
+
+    winner = None
+    while engine.current_round < 50 and winner is None:
+        engine.start_night()
+        flush_logs()
+        messages.append({"type": "phase_change", "event": "night_started", "phase": "night", "round": engine.current_round})
+        for pid in list(engine.alive_players):
+            action = policy.night_action(engine, pid, engine.roles.get(pid), rng)
+            if action:
+                engine.record_night_action(pid, action[0], action[1], action[2])
+        result = engine.process_night_actions()
+        flush_logs()
+        messages.append({"type": "phase_change", "event": "night_resolved", "phase": "night",
+                         "round": engine.current_round, "killed": result["killed"]})
+        winner = engine.check_winner()
+        if winner:
+            break
+
+        engine.start_day()
+        flush_logs()
+        for pid in list(engine.alive_players):
+            engine.record_speech(pid, f"玩家{pid}", "我是好人，昨晚的死者很可疑，建议大家投给发言最差的人")
+            target = policy.vote(engine, pid, engine.roles.get(pid), rng)
+            engine.record_vote(pid, target)
+            messages.append({"type": "game_action", "user_id": pid, "action": "vote", "data": {"target_id": target}})
+        messages.append({"type": "vote_tally", "round": engine.current_round,
+                         "changes": [[t, c] for t, c in engine.tally.counts.items()],
+                         "leaders": engine.tally.leaders(), "max_votes": engine.tally.max_votes,
+                         "voted": len(engine.tally)})
+        eliminated = engine.process_voting()
+        flush_logs()
+        messages.append({"type": "phase_change", "event": "voting_resolved", "phase": "day",
+                         "round": engine.current_round, "eliminated": eliminated})
+        winner = engine.check_winner()
+    flush_logs()
+    messages.append({"type": "game_over", "winner": winner})
+    # 断线重连时的完整日志同步（大消息，msgpack 帧会压缩）
+    messages.append({"type": "game_status", "logs": engine.get_all_logs()})
+    return messages
+
+
+def measure(codec, messages: list, repeat: int):
+    frames = [codec.frame(codec.encode(message)) for message in messages]
+    total_bytes = sum(len(frame) for frame in frames)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            codec.frame(codec.encode(message))
+    encode_us = (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for frame in frames:
+            codec.decode(frame)
+    decode_us = (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+    return total_bytes, encode_us, decode_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WebSocket 编码基准")
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    games = [game_messages(seed, args.players) for seed in range(args.games)]
+    messages = [message for game in games for message in game]
+    print(f"{args.games} 局，{args.players} 人，平均每局 {len(messages) / args.games:.0f} 条消息")
+    print(f"{'编码':>8} {'每局字节':>10} {'编码(us/条)':>12} {'解码(us/条)':>12}")
+    for codec in (JSON_CODEC, MSGPACK_CODEC):
+        total_bytes, encode_us, decode_us = measure(codec, messages, args.repeat)
+        print(f"{codec.name:>8} {total_bytes / args.games:>10.0f} {encode_us:>12.2f} {decode_us:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
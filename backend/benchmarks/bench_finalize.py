@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""对局结算基准：逐局逐人写入与结算队列分批写入的吞吐（局/秒）对比
+
+用法: python benchmarks/bench_finalize.py --games 2000 --players 12 --users 5000 --batch-sizes 50,200
+在临时 SQLite 数据库上结算 --games 局已结束的对局（随机对局，玩家从 --users 个账号中抽取）。
+row 模式每局一个事务，逐个玩家读取并更新战绩（结算队列之前的做法）；batch 模式使用 GameFinalizer。
+--db-latency-ms 在驱动执行每条语句时模拟网络往返。
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_tmpdir = tempfile.mkdtemp(prefix="werewolf-finalize-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/finalize.db"
+
+from sqlalchemy import event, func
+
+from app.core.database import AsyncSessionLocal, Base, SessionLocal, async_engine, engine
+from app.models.game import Game, GameRecord, GameStatus
+from app.models.user import User
+from app.services.game_engine import GameEngine
+from app.services.game_finalizer import GameFinalizer, winning_players
+from app.services.simulator import RandomPolicy, play_game
+
+
+def install_db_latency(latency: float):
+    """每条语句执行时在驱动所在线程上等待 latency 秒"""
+    if latency <= 0:
+        return
+
+    def wait(statement):
+        time.sleep(latency)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def on_async_connect(dbapi_connection, connection_record):
+        dbapi_connection.run_async(lambda connection: connection.set_trace_callback(wait))
+
+
+def seed_users(users: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add_all([User(username=f"fin{i}", email=f"fin{i}@example.com", hashed_password="-")
+                    for i in range(users)])
+        db.commit()
+        return [user_id for (user_id,) in db.query(User.id).order_by(User.id)]
+    finally:
+        db.close()
+
+
+def finished_games(count: int, players: int, user_ids: list, rng: random.Random) -> list:
+    """建房并在内存中跑完对局，返回 [(room_code, engine)]"""
+    db = SessionLocal()
+    try:
+        games = [Game(room_code=f"F{rng.getrandbits(40):010x}", room_name="finalize", owner_id=user_ids[0],
+                      status=GameStatus.PLAYING, started_at=func.now()) for _ in range(count)]
+        db.add_all(games)
+        db.commit()
+        game_ids = [(game.room_code, game.id) for game in games]
+    finally:
+        db.close()
+    result = []
+    policy = RandomPolicy()
+    for room_code, game_id in game_ids:
+        game_rng = random.Random(rng.random())
+        engine = GameEngine(game_id, players, rng=game_rng, journaling=False)
+        engine.assign_roles(rng.sample(user_ids, players))
+        play_game(engine, policy, game_rng)
+        result.append((room_code, engine))
+    return result
+
+
+async def finalize_row_by_row(games: list):
+    """结算队列之前的做法：每局一个事务，逐个玩家读取并更新战绩"""
+    for room_code, engine in games:
+        async with AsyncSessionLocal() as db:
+            game = await db.get(Game, engine.game_id)
+            game.status = GameStatus.FINISHED
+            game.finished_at = func.now()
+            db.add(GameRecord(game_id=engine.game_id, winner=engine.winner, rounds=engine.current_round,
+                              game_log=engine.get_all_logs()))
+            winners = set(winning_players(engine))
+            for player_id in engine.roles:
+                user = await db.get(User, player_id)
+                user.total_games = (user.total_games or 0) + 1
+                user.win_games = (user.win_games or 0) + (player_id in winners)
+                user.win_rate = user.win_games / user.total_games
+            await db.commit()
+
+
+async def finalize_batched(games: list, batch_size: int):
+    finalizer = GameFinalizer(interval=1.0, batch_size=batch_size, max_attempts=1)
+    for room_code, engine in games:
+        finalizer.submit(room_code, engine)
+    await finalizer.drain()
+    assert finalizer.finalized == len(games), finalizer.metrics()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--games", type=int, default=2000)
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--batch-sizes", default="50,200", help="逗号分隔的每批局数")
+    parser.add_argument("--db-latency-ms", type=float, default=0.0, help="模拟每条语句的数据库往返")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    install_db_latency(args.db_latency_ms / 1000)
+    rng = random.Random(args.seed)
+    user_ids = seed_users(max(args.users, args.players))
+    modes = [("row", None)] + [(f"batch={size}", int(size)) for size in args.batch_sizes.split(",")]
+
+    print(f"games={args.games} players={args.players} users={args.users} db_latency={args.db_latency_ms}ms")
+    print(f"{'mode':<12}{'seconds':>10}{'games/s':>10}")
+    for name, batch_size in modes:
+        games = finished_games(args.games, args.players, user_ids, rng)
+        started = time.perf_counter()
+        if batch_size is None:
+            await finalize_row_by_row(games)
+        else:
+            await finalize_batched(games, batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"{name:<12}{elapsed:>10.2f}{len(games) / elapsed:>10.0f}")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
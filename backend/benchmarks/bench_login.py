@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""登录吞吐基准：并发登录时 bcrypt 在事件循环上执行与在工作线程池中执行的对比
+
+用法: python benchmarks/bench_login.py --clients 16 --duration 5 --rounds 12
+在临时 SQLite 数据库上启动进程内 uvicorn，--clients 个客户端循环 POST /api/auth/login，
+同时以固定间隔请求 GET /health 并探测事件循环延迟。
+inline 模式把密码任务直接放在事件循环上执行（迁移前的行为）；pool 模式使用 password_hasher。
+--max-pending 小于客户端数时可观察准入控制返回的 503。
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_tmpdir = tempfile.mkdtemp(prefix="werewolf-login-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/login.db"
+
+import httpx
+import uvicorn
+
+from app.core.database import Base, SessionLocal, async_engine, engine
+from app.core.password_hasher import password_hasher
+from app.core.security import pwd_context
+from app.main import app
+from app.models.user import User
+
+PASSWORD = "benchmark-password"
+
+
+def seed(users: int, rounds: int):
+    """所有账号共用同一个密码哈希（只计算一次）"""
+    Base.metadata.create_all(bind=engine)
+    hashed = pwd_context.handler("bcrypt").using(rounds=rounds).hash(PASSWORD)
+    db = SessionLocal()
+    try:
+        db.add_all([User(username=f"login{i}", email=f"login{i}@example.com", hashed_password=hashed)
+                    for i in range(users)])
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run_inline(fn, *args):
+    """迁移前的行为：bcrypt 直接在事件循环线程上执行"""
+    return fn(*args)
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+async def probe_lag(stop: asyncio.Event, interval: float, samples: list):
+    """按固定间隔 sleep，记录实际唤醒时间相对计划的滞后"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def login_client(client: httpx.AsyncClient, username: str, stop: asyncio.Event,
+                       latencies: list, rejected: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post("/api/auth/login", data={"username": username, "password": PASSWORD})
+        if response.status_code == 503:
+            rejected.append(1)
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+            continue
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def health_client(client: httpx.AsyncClient, stop: asyncio.Event, interval: float, latencies: list):
+    """与登录无关的轻量请求：衡量登录洪峰对其他接口的影响"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/health")
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def run_mode(mode: str, args) -> dict:
+    vars(password_hasher).pop("run", None)
+    if mode == "inline":
+        password_hasher.run = run_inline
+    password_hasher.max_pending = args.max_pending
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    # 预热一条异步连接，避免首次连接的建立计入测量
+    async with async_engine.connect():
+        pass
+
+    stop = asyncio.Event()
+    lag, logins, rejected, health = [], [], [], []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+        tasks = [asyncio.ensure_future(probe_lag(stop, 0.005, lag)),
+                 asyncio.ensure_future(health_client(client, stop, 0.02, health))]
+        tasks += [asyncio.ensure_future(login_client(client, f"login{i}", stop, logins, rejected))
+                  for i in range(args.clients)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    server.should_exit = True
+    await server_task
+    return {
+        "lag_p99": percentile(lag, 0.99), "lag_max": max(lag) * 1000,
+        "login_rps": len(logins) / args.duration, "login_p50": percentile(logins, 0.5),
+        "login_p99": percentile(logins, 0.99), "rejected": len(rejected),
+        "health_p50": percentile(health, 0.5), "health_p99": percentile(health, 0.99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=16, help="并发登录客户端数")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt 成本因子（与 passlib 默认一致）")
+    parser.add_argument("--max-pending", type=int, default=password_hasher.max_pending,
+                        help="密码任务排队上限（pool 模式）")
+    parser.add_argument("--mode", choices=["inline", "pool", "both"], default="both")
+    args = parser.parse_args()
+
+    seed(args.clients, args.rounds)
+    modes = ["inline", "pool"] if args.mode == "both" else [args.mode]
+
+    print(f"clients={args.clients} duration={args.duration}s rounds={args.rounds} "
+          f"workers={password_hasher.workers} max_pending={args.max_pending}")
+    print(f"{'mode':<8}{'loop lag p99/max (ms)':>23}{'login/s':>9}{'login p50/p99 (ms)':>21}"
+          f"{'503':>6}{'/health p50/p99 (ms)':>23}")
+    for mode in modes:
+        r = await run_mode(mode, args)
+        print(f"{mode:<8}{r['lag_p99']:>14.2f}/{r['lag_max']:<8.2f}{r['login_rps']:>9.1f}"
+              f"{r['login_p50']:>12.1f}/{r['login_p99']:<8.1f}{r['rejected']:>6}"
+              f"{r['health_p50']:>14.2f}/{r['health_p99']:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
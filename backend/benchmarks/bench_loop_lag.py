@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""事件循环延迟基准：并发 REST 请求与 WebSocket 聊天同时进行时，同步 Session 与 AsyncSession 的对比
+
+用法: python benchmarks/bench_loop_lag.py --clients 10 --sockets 100 --duration 5 --db-latency-ms 2
+在临时 SQLite 数据库上启动进程内 uvicorn；--db-latency-ms 在驱动执行每条语句时模拟网络往返
+（同步驱动在事件循环线程上等待，aiosqlite 在其工作线程上等待）。
+sync 模式用依赖覆盖把 REST 接口换回同步 Session 直接在事件循环上查询（迁移前的行为）；
+该模式下并发客户端超过同步连接池上限（默认 15）时，等待连接池会直接卡住事件循环直到超时。
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_tmpdir = tempfile.mkdtemp(prefix="werewolf-lag-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/lag.db"
+
+import httpx
+import uvicorn
+import websockets
+from sqlalchemy import event
+
+from app.core.database import Base, SessionLocal, async_engine, engine, get_async_db
+from app.core.security import create_access_token
+from app.main import app
+from app.models.game import Game
+from app.models.user import User
+
+
+class BlockingSession:
+    """迁移前的行为：同步 Session 的查询直接在事件循环上执行"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def scalar(self, statement):
+        return self.session.scalar(statement)
+
+    async def scalars(self, statement):
+        return self.session.scalars(statement)
+
+    async def get(self, entity, ident):
+        return self.session.get(entity, ident)
+
+    async def commit(self):
+        self.session.commit()
+
+    async def refresh(self, instance):
+        self.session.refresh(instance)
+
+    def add(self, instance):
+        self.session.add(instance)
+
+
+async def get_blocking_db():
+    db = SessionLocal()
+    try:
+        yield BlockingSession(db)
+    finally:
+        db.close()
+
+
+def install_db_latency(latency: float):
+    """每条语句执行时在驱动所在线程上等待 latency 秒"""
+    if latency <= 0:
+        return
+
+    def wait(statement):
+        time.sleep(latency)
+
+    @event.listens_for(engine, "connect")
+    def on_sync_connect(dbapi_connection, connection_record):
+        dbapi_connection.set_trace_callback(wait)
+
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def on_async_connect(dbapi_connection, connection_record):
+        dbapi_connection.run_async(lambda connection: connection.set_trace_callback(wait))
+
+
+def seed(users: int, rooms: int):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add_all([User(username=f"lag{i}", email=f"lag{i}@example.com", hashed_password="-")
+                    for i in range(users)])
+        db.flush()
+        owner_id = db.query(User.id).first()[0]
+        db.add_all([Game(room_code=f"L{i:05d}", room_name=f"lag {i}", owner_id=owner_id) for i in range(rooms)])
+        db.commit()
+        tokens = [create_access_token({"sub": user.username, "user_id": user.id})
+                  for user in db.query(User).order_by(User.id)]
+        room_codes = [code for (code,) in db.query(Game.room_code).order_by(Game.id)]
+        return tokens, room_codes
+    finally:
+        db.close()
+
+
+def percentile(values: list, fraction: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))] * 1000
+
+
+async def probe_lag(stop: asyncio.Event, interval: float, samples: list):
+    """按固定间隔 sleep，记录实际唤醒时间相对计划的滞后"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+
+async def rest_client(client: httpx.AsyncClient, token: str, stop: asyncio.Event, latencies: list):
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.get("/api/users/me", headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - started)
+
+
+async def chat_pair(sender, receiver, stop: asyncio.Event, interval: float, latencies: list):
+    """sender 发聊天，测量同房间 receiver 收到的延迟"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await sender.send('{"type": "chat", "message": "ping"}')
+        await receiver.recv()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(interval)
+
+
+async def run_mode(mode: str, args, tokens: list, room_codes: list) -> dict:
+    app.dependency_overrides.clear()
+    if mode == "sync":
+        app.dependency_overrides[get_async_db] = get_blocking_db
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           ws_ping_interval=None))
+    server_task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    # 先建立一条异步连接：基准追加的连接事件首次执行时持有线程锁，并发的首次连接会在事件循环上互相等待
+    # （应用关闭时会 dispose 连接池，因此每轮都要预热）
+    async with async_engine.connect():
+        pass
+
+    # 每个房间两条连接：一条发送，一条接收
+    pairs = []
+    for i in range(args.sockets // 2):
+        url = f"ws://127.0.0.1:{port}/ws/room/{room_codes[i]}?token="
+        sender = await websockets.connect(url + tokens[2 * i], ping_interval=None)
+        receiver = await websockets.connect(url + tokens[2 * i + 1], ping_interval=None)
+        await sender.recv()  # connected
+        await receiver.recv()  # connected
+        await sender.recv()  # player_joined
+        pairs.append((sender, receiver))
+
+    stop = asyncio.Event()
+    lag, rest, chat = [], [], []
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+        tasks = [asyncio.ensure_future(probe_lag(stop, 0.005, lag))]
+        tasks += [asyncio.ensure_future(rest_client(client, tokens[i % len(tokens)], stop, rest))
+                  for i in range(args.clients)]
+        tasks += [asyncio.ensure_future(chat_pair(sender, receiver, stop, 0.1, chat)) for sender, receiver in pairs]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    for sender, receiver in pairs:
+        await sender.close()
+        await receiver.close()
+    server.should_exit = True
+    await server_task
+    return {
+        "lag_p50": percentile(lag, 0.5), "lag_p99": percentile(lag, 0.99), "lag_max": max(lag) * 1000,
+        "rest_rps": len(rest) / args.duration, "rest_p99": percentile(rest, 0.99),
+        "chat_p50": percentile(chat, 0.5), "chat_p99": percentile(chat, 0.99),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=10, help="并发 REST 客户端数")
+    parser.add_argument("--sockets", type=int, default=100, help="WebSocket 连接数（两两一个房间）")
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--db-latency-ms", type=float, default=2.0, help="模拟每条语句的数据库往返")
+    parser.add_argument("--mode", choices=["sync", "async", "both"], default="both")
+    args = parser.parse_args()
+
+    install_db_latency(args.db_latency_ms / 1000)
+    tokens, room_codes = seed(max(args.sockets, args.clients, 2), max(args.sockets // 2, 1))
+    modes = ["sync", "async"] if args.mode == "both" else [args.mode]
+
+    print(f"clients={args.clients} sockets={args.sockets} duration={args.duration}s "
+          f"db_latency={args.db_latency_ms}ms")
+    print(f"{'mode':<6}{'loop lag p50/p99/max (ms)':>28}{'REST req/s':>12}{'REST p99 (ms)':>15}"
+          f"{'chat p50/p99 (ms)':>20}")
+    for mode in modes:
+        r = await run_mode(mode, args, tokens, room_codes)
+        print(f"{mode:<6}{r['lag_p50']:>10.2f}/{r['lag_p99']:.2f}/{r['lag_max']:<8.2f}"
+              f"{r['rest_rps']:>12.0f}{r['rest_p99']:>15.2f}{r['chat_p50']:>11.2f}/{r['chat_p99']:.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
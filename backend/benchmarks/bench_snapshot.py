@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""GameEngine 快照基准：快照大小与编解码延迟
+
+用法: python benchmarks/bench_snapshot.py --players 12 --speeches 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.game_engine import GameEngine, Role
+
+
+def build_engine(players: int, speeches: int) -> GameEngine:
+    """构造一局进行到第 2 夜的游戏"""
+    engine = GameEngine(1, players, rng=random.Random(0))
+    engine.assign_roles(list(range(1, players + 1)))
+    engine.start_night()
+    werewolf = engine.state.first_alive(Role.WEREWOLF)
+    engine.record_night_action(werewolf, "kill", next(pid for pid in engine.alive_players if pid != werewolf))
+    engine.process_night_actions()
+    engine.start_day()
+    alive = sorted(engine.alive_players)
+    for i in range(speeches):
+        pid = alive[i % len(alive)]
+        engine.record_speech(pid, f"玩家{pid}", f"我觉得{alive[(i + 1) % len(alive)]}号玩家很可疑，第{i}次发言")
+    for pid in alive:
+        engine.record_vote(pid, alive[0])
+    engine.process_voting()
+    engine.start_night()
+    engine.record_night_action(werewolf, "kill", alive[-1])
+    return engine
+
+
+def measure(func, repeat: int) -> float:
+    """返回单次调用的平均耗时（微秒）"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - started) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GameEngine 快照基准")
+    parser.add_argument("--players", type=int, default=12)
+    parser.add_argument("--speeches", type=int, nargs="+", default=[0, 50, 200, 1000])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'发言数':>8} {'快照字节':>10} {'编码(us)':>10} {'解码(us)':>10}")
+    for speeches in args.speeches:
+        engine = build_engine(args.players, speeches)
+        data = engine.snapshot()
+        encode_us = measure(engine.snapshot, args.repeat)
+        decode_us = measure(lambda: GameEngine.restore(data), args.repeat)
+        print(f"{speeches:>8} {len(data):>10} {encode_us:>10.1f} {decode_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""长连接浸泡测试：大量空闲 WebSocket 连接在线时，REST 接口的延迟与数据库连接池占用
+
+用法: python benchmarks/bench_ws_soak.py --sockets 2000 --rooms 200 --requests 200
+在临时 SQLite 数据库上启动进程内 uvicorn，先测空载时 GET /api/rooms/{room_code} 的延迟，
+再建立 --sockets 个空闲连接后重测。WebSocket 持有数据库会话时，连接池耗尽会使 REST 请求超时。
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+_tmpdir = tempfile.mkdtemp(prefix="werewolf-soak-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_tmpdir}/soak.db"
+
+import httpx
+import uvicorn
+import websockets
+
+from app.core.database import Base, SessionLocal, engine
+from app.core.security import create_access_token
+from app.main import app
+from app.models.game import Game
+from app.models.user import User
+
+
+def seed(users: int, rooms: int):
+    """直接写库创建用户与房间（跳过 bcrypt），返回 ([(user_id, token)], [room_code])"""
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        db.add_all([User(username=f"soak{i}", email=f"soak{i}@example.com", hashed_password="-")
+                    for i in range(users)])
+        db.flush()
+        owner_id = db.query(User.id).first()[0]
+        db.add_all([Game(room_code=f"S{i:05d}", room_name=f"soak {i}", owner_id=owner_id) for i in range(rooms)])
+        db.commit()
+        accounts = [(user.id, create_access_token({"sub": user.username, "user_id": user.id}))
+                    for user in db.query(User).order_by(User.id)]
+        room_codes = [code for (code,) in db.query(Game.room_code).order_by(Game.id)]
+        return accounts, room_codes
+    finally:
+        db.close()
+
+
+async def measure_rest(base_url: str, room_codes: list, requests: int, timeout: float) -> dict:
+    latencies, failures = [], 0
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+        for i in range(requests):
+            started = time.perf_counter()
+            try:
+                response = await client.get(f"/api/rooms/{room_codes[i % len(room_codes)]}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError:
+                failures += 1
+    latencies.sort()
+    return {
+        "ok": len(latencies),
+        "failed": failures,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000 if latencies else None,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else None,
+    }
+
+
+async def open_socket(ws_url: str, semaphore: asyncio.Semaphore):
+    async with semaphore:
+        connection = await websockets.connect(ws_url, open_timeout=30, ping_interval=None)
+        await connection.recv()  # connected
+        return connection
+
+
+def report(title: str, result: dict):
+    if result["ok"]:
+        print(f"{title:<22}ok={result['ok']:<5} failed={result['failed']:<5} p50={result['p50_ms']:.2f}ms "
+              f"p99={result['p99_ms']:.2f}ms mean={result['mean_ms']:.2f}ms")
+    else:
+        print(f"{title:<22}ok=0     failed={result['failed']}")
+
+
+def pool_status() -> str:
+    pool = engine.pool
+    checked_out = pool.checkedout() if hasattr(pool, "checkedout") else "n/a"
+    return f"checked_out={checked_out}  {pool.status()}"
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sockets", type=int, default=2000)
+    parser.add_argument("--rooms", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=5.0, help="单个 REST 请求超时（秒）")
+    args = parser.parse_args()
+
+    accounts, room_codes = seed(args.sockets, args.rooms)
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning",
+                                           ws_ping_interval=None))
+    server_task = asyncio.ensure_future(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    base_url = f"http://127.0.0.1:{port}"
+
+    print(f"sockets={args.sockets} rooms={args.rooms} requests={args.requests}")
+    report("idle server", await measure_rest(base_url, room_codes, args.requests, args.timeout))
+
+    started = time.perf_counter()
+    semaphore = asyncio.Semaphore(200)
+    connections = await asyncio.gather(*(
+        open_socket(f"ws://127.0.0.1:{port}/ws/room/{room_codes[i % len(room_codes)]}?token={token}", semaphore)
+        for i, (_, token) in enumerate(accounts)
+    ))
+    print(f"opened {len(connections)} sockets in {time.perf_counter() - started:.1f}s; pool: {pool_status()}")
+
+    report(f"{len(connections)} idle sockets",
+           await measure_rest(base_url, room_codes, args.requests, args.timeout))
+    print(f"pool after requests: {pool_status()}")
+
+    await asyncio.gather(*(connection.close() for connection in connections))
+    server.should_exit = True
+    await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
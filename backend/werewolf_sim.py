@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+"""werewolf-sim：无界面自博弈模拟器入口
+
+用法: python werewolf_sim.py --games 100000 --players 12 --policy random
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app.services.simulator import main
+
+if __name__ == "__main__":
+    main()
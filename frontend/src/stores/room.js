@@ -6,6 +6,9 @@ export const useRoomStore = defineStore('room', () => {
   const rooms = ref([])
   const currentRoom = ref(null)
   const wsConnection = ref(null)
+  // 断线续传：已收到的最后一条房间广播，重连时服务端只补发错过的消息
+  const resume = { roomCode: null, epoch: null, roomSeq: 0 }
+  let reconnectTimer = null
   
   async function fetchRooms() {
     try {
@@ -54,29 +57,62 @@ export const useRoomStore = defineStore('room', () => {
   }
   
   function connectWebSocket(roomCode, token) {
-    const wsUrl = `ws://localhost:8000/ws/room/${roomCode}?token=${token}`
-    wsConnection.value = new WebSocket(wsUrl)
+    if (resume.roomCode !== roomCode) {
+      Object.assign(resume, { roomCode, epoch: null, roomSeq: 0 })
+    }
+    // batch=1：支持服务端按 tick 合并的消息帧；since/epoch：断线重连时只补发错过的消息
+    let wsUrl = `ws://localhost:8000/ws/room/${roomCode}?token=${token}&batch=1`
+    if (resume.epoch) {
+      wsUrl += `&since=${resume.roomSeq}&epoch=${resume.epoch}`
+    }
+    const ws = new WebSocket(wsUrl)
+    wsConnection.value = ws
     
-    wsConnection.value.onopen = () => {
+    ws.onopen = () => {
       console.log('WebSocket连接已建立')
     }
     
-    wsConnection.value.onerror = (error) => {
+    ws.onerror = (error) => {
       console.error('WebSocket错误:', error)
     }
     
-    wsConnection.value.onclose = () => {
+    ws.onclose = (event) => {
       console.log('WebSocket连接已关闭')
+      // 非主动断开（且不是认证/房间错误）时自动重连，沿用页面设置的消息处理函数
+      if (wsConnection.value === ws && event.code !== 1008) {
+        reconnectTimer = setTimeout(() => {
+          connectWebSocket(roomCode, token).onmessage = ws.onmessage
+        }, 2000)
+      }
     }
     
-    return wsConnection.value
+    return ws
   }
   
   function disconnectWebSocket() {
+    clearTimeout(reconnectTimer)
     if (wsConnection.value) {
-      wsConnection.value.close()
+      const ws = wsConnection.value
       wsConnection.value = null
+      ws.close()
+    }
+  }
+  
+  // 解析服务端消息帧，合并帧 {"type": "batch", "messages": [...]} 展开为多条消息
+  function parseMessages(raw) {
+    const data = JSON.parse(raw)
+    const messages = data.type === 'batch' ? data.messages : [data]
+    for (const message of messages) {
+      if (message.type === 'connected') {
+        resume.epoch = message.epoch
+        if (!message.resumed) {
+          resume.roomSeq = message.room_seq
+        }
+      } else if (message.room_seq > resume.roomSeq) {
+        resume.roomSeq = message.room_seq
+      }
     }
+    return messages
   }
   
   function sendMessage(message) {
@@ -95,6 +131,7 @@ export const useRoomStore = defineStore('room', () => {
     getRoom,
     connectWebSocket,
     disconnectWebSocket,
+    parseMessages,
     sendMessage
   }
 })